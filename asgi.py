@@ -0,0 +1,269 @@
+import io
+import sys
+from urllib.parse import parse_qs
+
+from asgiref.wsgi import WsgiToAsgi
+from flask import abort, current_app, render_template, request, request_started
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from werkzeug.exceptions import HTTPException
+
+import dbpool
+import queries
+import search
+from app import create_app
+from cache import detail_cache
+from models import db, Venue, Artist, Show
+from views import genre_filters
+from views.shows import listing_filters
+
+#----------------------------------------------------------------------------#
+# ASGI serving mode.
+#
+#   uvicorn --factory asgi:create_asgi_app --workers 4
+#
+# The read pages (/venues, /artists, /shows, the venue and artist pages and
+# both searches) run as coroutines on an asyncio engine (asyncpg by
+# default, see dbpool.async_engine_options), so a worker waiting on the
+# database goes on serving other requests. They run the same query steps
+# as the Flask views (queries.query_steps) and render inside a Flask
+# request context, so the before/after_request hooks, error pages, cache
+# and templates are shared. Every other request, and /shows?stream=1, is
+# handed to the Flask app in a thread through asgiref's WsgiToAsgi.
+#
+# Needs asgiref, asyncpg (or psycopg 3) and an ASGI server such as uvicorn.
+#----------------------------------------------------------------------------#
+
+
+async def run(session, query, *args, **kwargs):
+    # Drives a query_steps generator on the AsyncSession.
+    steps = query.steps(*args, **kwargs)
+    try:
+        statement = next(steps)
+        while True:
+            statement = steps.send(await session.execute(statement))
+    except StopIteration as stop:
+        return stop.value
+
+
+#  Views
+#  ----------------------------------------------------------------
+#
+# Each mirrors the view of the same endpoint in views/.
+
+async def venues(session):
+    genres, match = genre_filters()
+    return render_template('pages/venues.html', areas=await run(session, queries.venue_areas, genres, match),
+                           facets=await run(session, queries.genre_counts, Venue, genres, match), genres=genres,
+                           match=match)
+
+
+async def search_venues(session):
+    search_venue = request.form.get('search_term', '')
+    genres, match = genre_filters()
+    response = await run(session, queries.search_results, Venue, Show.venue_id, search_venue,
+                         limit=request.values.get('limit', type=int), offset=request.values.get('offset', 0, type=int),
+                         genres=genres, match=match)
+    return render_template('pages/search_venues.html', results=response, search_term=search_venue, genres=genres,
+                           match=match)
+
+
+async def show_venue(session, venue_id):
+    upcoming_cursor = request.args.get('upcoming_cursor')
+    past_cursor = request.args.get('past_cursor')
+    if upcoming_cursor or past_cursor:
+        data = await run(session, queries.venue_detail, venue_id, upcoming_cursor, past_cursor)
+    else:
+        data = await detail_cache.get_or_build_async('venue:%d' % venue_id,
+                                                     lambda: run(session, queries.venue_detail, venue_id))
+    if data is None:
+        abort(404)
+    return render_template('pages/show_venue.html', venue=data)
+
+
+async def artists(session):
+    genres, match = genre_filters()
+    return render_template('pages/artists.html', artists=await run(session, queries.artist_list, genres, match),
+                           facets=await run(session, queries.genre_counts, Artist, genres, match), genres=genres,
+                           match=match)
+
+
+async def search_artists(session):
+    search_artist = request.form.get('search_term', '')
+    genres, match = genre_filters()
+    response = await run(session, queries.search_results, Artist, Show.artist_id, search_artist,
+                         limit=request.values.get('limit', type=int), offset=request.values.get('offset', 0, type=int),
+                         genres=genres, match=match)
+    return render_template('pages/search_artists.html', results=response, search_term=search_artist, genres=genres,
+                           match=match)
+
+
+async def show_artist(session, artist_id):
+    upcoming_cursor = request.args.get('upcoming_cursor')
+    past_cursor = request.args.get('past_cursor')
+    if upcoming_cursor or past_cursor:
+        data = await run(session, queries.artist_detail, artist_id, upcoming_cursor, past_cursor)
+    else:
+        data = await detail_cache.get_or_build_async('artist:%d' % artist_id,
+                                                     lambda: run(session, queries.artist_detail, artist_id))
+    if data is None:
+        abort(404)
+    return render_template('pages/show_artist.html', artist=data)
+
+
+async def shows(session):
+    filters, date_from, date_to = listing_filters()
+    query = queries.show_listing(upcoming='upcoming' in filters, date_from=date_from, date_to=date_to)
+    rows, next_cursor = await run(session, queries.listing_page, query, request.args.get('cursor'),
+                                  current_app.config['SHOWS_PAGE_SIZE'])
+    data = [queries.show_tile(row) for row in rows]
+    return render_template('pages/shows.html', shows=data, filters=filters, next_cursor=next_cursor)
+
+
+VIEWS = {
+    'venues.venues': venues,
+    'venues.search_venues': search_venues,
+    'venues.show_venue': show_venue,
+    'artists.artists': artists,
+    'artists.search_artists': search_artists,
+    'artists.show_artist': show_artist,
+    'shows.shows': shows,
+}
+
+
+#  ASGI application
+#  ----------------------------------------------------------------
+
+def build_environ(scope, body):
+    # The WSGI environ of an ASGI http scope, as asgiref builds it.
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf8').decode('latin1'),
+        'PATH_INFO': scope['path'].encode('utf8').decode('latin1'),
+        'QUERY_STRING': scope['query_string'].decode('ascii'),
+        'SERVER_PROTOCOL': 'HTTP/%s' % scope['http_version'],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    server = scope.get('server') or ('localhost', 80)
+    environ['SERVER_NAME'] = server[0]
+    environ['SERVER_PORT'] = str(server[1] or 80)
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin1')
+        if name == 'content-length':
+            key = 'CONTENT_LENGTH'
+        elif name == 'content-type':
+            key = 'CONTENT_TYPE'
+        else:
+            key = 'HTTP_' + name.upper().replace('-', '_')
+        value = value.decode('latin1')
+        environ[key] = environ[key] + ',' + value if key in environ else value
+    return environ
+
+
+async def read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        if message['type'] != 'http.request':
+            break
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            break
+    return b''.join(chunks)
+
+
+class AsyncApp(object):
+
+    def __init__(self, app):
+        self.app = app
+        self.wsgi = WsgiToAsgi(app)
+        self.engine = create_async_engine(dbpool.async_database_url(app.config),
+                                          **dbpool.async_engine_options(app.config))
+        self.sessions = async_sessionmaker(self.engine, expire_on_commit=False)
+        # The engine events run on the sync_engine behind the async one.
+        dbpool.install(self.engine.sync_engine, app.config)
+        for name in ('sql_profiler', 'metrics'):
+            if name in app.extensions:
+                app.extensions[name].watch(self.engine.sync_engine)
+        app.extensions['async_engine'] = self.engine
+        if app.config['FULL_TEXT_SEARCH']:
+            # The searches look this up on the sync engine; do it now, so
+            # that the first one doesn't block the event loop on it.
+            with app.app_context():
+                search.trigram_available(db.engine)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        endpoint, args = self.match(scope)
+        if endpoint is None:
+            return await self.wsgi(scope, receive, send)
+        environ = build_environ(scope, await read_body(receive))
+        response = await self.dispatch(environ, VIEWS[endpoint], args)
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': [(name.lower().encode('latin1'), value.encode('latin1'))
+                        for name, value in response.headers.items()],
+        })
+        body = b'' if scope['method'] == 'HEAD' else response.get_data()
+        await send({'type': 'http.response.body', 'body': body})
+        response.close()
+
+    def match(self, scope):
+        # (endpoint, view arguments) for a request one of VIEWS serves,
+        # otherwise (None, None).
+        if scope['type'] != 'http':
+            return None, None
+        try:
+            rule, args = self.app.url_map.bind_to_environ(build_environ(scope, b'')).match(return_rule=True)
+        except HTTPException:
+            return None, None
+        if rule.endpoint not in VIEWS:
+            return None, None
+        if rule.endpoint == 'shows.shows' and parse_qs(scope['query_string'].decode('latin1')).get('stream'):
+            return None, None
+        return rule.endpoint, args
+
+    async def dispatch(self, environ, view, args):
+        # Flask.wsgi_app and full_dispatch_request with an awaited view.
+        app = self.app
+        ctx = app.request_context(environ)
+        error = None
+        ctx.push()
+        try:
+            try:
+                async with self.sessions() as session:
+                    request_started.send(app, _async_wrapper=app.ensure_sync)
+                    rv = app.preprocess_request()
+                    if rv is None:
+                        rv = await view(session, **args)
+            except Exception as e:
+                rv = app.handle_user_exception(e)
+            return app.finalize_request(rv)
+        except Exception as e:
+            error = e
+            return app.handle_exception(e)
+        finally:
+            ctx.pop(error)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.engine.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+def create_asgi_app(config='config'):
+    return AsyncApp(create_app(config))
@@ -0,0 +1,14 @@
+"""Benchmarks, run against the database in config.py (or $DATABASE_URL).
+
+    python -m benchmarks.seed --reset        synthetic catalogue
+    python -m benchmarks.routes -o a.json    time every route
+    python -m benchmarks.compare a.json b.json
+    python -m benchmarks.datetime_filter
+    python -m benchmarks.export
+    python -m benchmarks.metrics
+    python -m benchmarks.venue_directory
+
+The app relies on PostgreSQL features (arrays, tsvector, FILTER, triggers),
+so there is no SQLite stand-in: point DATABASE_URL at a scratch Postgres
+database before seeding, as --reset empties the tables.
+"""
@@ -0,0 +1,103 @@
+"""Venue availability searches.
+
+    python -m benchmarks.availability [-n 20]
+
+Times scheduling.availability, the query behind /api/v1/availability, for
+a few searches: the whole catalogue and one city, over one, seven and 31
+days, with and without a genre. It compares each with the way a client
+answers the question today: list the venues, then read each one's shows
+over the window (one query per venue, as the venue pages do) and work out
+the gaps. Both are checked to return the same slots.
+"""
+import argparse
+import statistics
+import time
+from datetime import date, datetime, timedelta
+
+from flask import current_app
+
+from app import create_app
+from benchmarks.routes import benchmark_config
+from models import db, Venue, Show
+import scheduling
+
+
+def per_venue(first_day, last_day, city=None, state=None, genre=None, length=scheduling.DEFAULT_LENGTH,
+              limit=50, offset=0):
+    opens, closes = (timedelta(hours=hours) for hours in current_app.config['BOOKING_HOURS'])
+    now = datetime.today()
+    query = db.session.query(Venue)
+    if city is not None:
+        query = query.filter(Venue.city == city)
+    if state is not None:
+        query = query.filter(Venue.state == state)
+    data = []
+    for venue in query.order_by(Venue.name, Venue.id):
+        if genre is not None and genre not in venue.genres:
+            continue
+        first = datetime.combine(first_day, datetime.min.time())
+        shows = db.session.query(Show.start_time, Show.end_time).filter(
+            Show.venue_id == venue.id, Show.start_time < datetime.combine(last_day, datetime.min.time()) + closes,
+            Show.end_time > first + opens).order_by(Show.start_time).all()
+        free = []
+        day = first_day
+        while day <= last_day:
+            start = max(datetime.combine(day, datetime.min.time()) + opens, now)
+            end = datetime.combine(day, datetime.min.time()) + closes
+            for show_start, show_end in shows:
+                if show_end <= start or show_start >= end:
+                    continue
+                if show_start - start >= length:
+                    free.append({'start': start, 'end': show_start})
+                start = max(start, show_end)
+            if end - start >= length:
+                free.append({'start': start, 'end': end})
+            day += timedelta(days=1)
+        if free:
+            data.append({'venue_id': venue.id, 'venue_name': venue.name, 'city': venue.city, 'state': venue.state,
+                         'genres': venue.genres, 'free': free})
+    return data[offset:offset + limit]
+
+
+def timed(fn, number):
+    result = fn()
+    timings = []
+    for _ in range(number):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return result, statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', '--number', type=int, default=20)
+    args = parser.parse_args()
+
+    app = create_app(benchmark_config(cold=True))
+    app.logger.disabled = True
+    with app.app_context():
+        city, state = db.session.query(Venue.city, Venue.state).group_by(Venue.city, Venue.state) \
+            .order_by(db.func.count().desc()).first()
+        print('%d venues, %d shows; busiest city %s, %s' % (
+            db.session.query(Venue).count(), db.session.query(Show).count(), city, state))
+        first_day = date.today() + timedelta(days=7)
+        searches = [
+            ('all venues', {}, 1),
+            ('all venues', {}, 7),
+            ('%s' % city, {'city': city, 'state': state}, 1),
+            ('%s' % city, {'city': city, 'state': state}, 7),
+            ('%s' % city, {'city': city, 'state': state}, 31),
+            ('%s, Jazz' % city, {'city': city, 'state': state, 'genre': 'Jazz'}, 7),
+        ]
+        print('%-24s %5s %12s %12s' % ('search', 'days', 'query', 'per venue'))
+        for name, filters, days in searches:
+            last_day = first_day + timedelta(days=days - 1)
+            expected, slow = timed(lambda: per_venue(first_day, last_day, **filters), max(args.number // 10, 1))
+            data, fast = timed(lambda: scheduling.availability(first_day, last_day, **filters), args.number)
+            assert data == expected, name
+            print('%-24s %5d %9.1f ms %9.1f ms' % (name, days, fast, slow))
+
+
+if __name__ == '__main__':
+    main()
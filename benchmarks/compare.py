@@ -0,0 +1,59 @@
+"""Compare two benchmarks.routes result files.
+
+    python -m benchmarks.compare before.json after.json [--threshold 10]
+
+Prints the change in p50/p90 latency, queries and rows for every route,
+and exits with status 1 when a route got slower than --threshold percent
+and --min-ms at p50, or issues more queries, so it can gate a change in CI.
+"""
+import argparse
+import json
+import sys
+
+
+def change(before, after):
+    if not before:
+        return 0.0
+    return (after - before) / before * 100
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('before')
+    parser.add_argument('after')
+    parser.add_argument('--threshold', type=float, default=10.0, help='Allowed p50 slowdown in percent.')
+    parser.add_argument('--min-ms', type=float, default=1.0, help='Ignore p50 slowdowns smaller than this.')
+    args = parser.parse_args()
+
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+    if before['dataset'] != after['dataset']:
+        print('warning: different datasets %s / %s' % (before['dataset'], after['dataset']))
+    print('%s -> %s' % (before.get('revision'), after.get('revision')))
+
+    regressions = []
+    print('%-48s %17s %17s %11s %15s' % ('route', 'p50 ms', 'p90 ms', 'queries', 'rows'))
+    for name in sorted(set(before['routes']) | set(after['routes'])):
+        old, new = before['routes'].get(name), after['routes'].get(name)
+        if old is None or new is None:
+            print('%-48s %s' % (name, 'added' if old is None else 'removed'))
+            continue
+        p50 = change(old['p50'], new['p50'])
+        flag = ''
+        slower = p50 > args.threshold and new['p50'] - old['p50'] > args.min_ms
+        if slower or new['queries'] > old['queries']:
+            regressions.append(name)
+            flag = '  <-- regression'
+        print('%-48s %8.2f %+7.1f%% %8.2f %+7.1f%% %5d -> %-3d %7d -> %-5d%s' % (
+            name, new['p50'], p50, new['p90'], change(old['p90'], new['p90']),
+            old['queries'], new['queries'], old['rows'], new['rows'], flag))
+
+    if regressions:
+        print('%d regression(s)' % len(regressions))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""Scheduling conflict checks against the GiST exclusion indexes.
+
+    python -m benchmarks.conflicts [-n 2000] [--seed 0]
+
+Times scheduling.find_conflicts, the query behind /api/v1/conflicts and
+the create show form, for random two hour slots at random venues and
+artists on the evenings of existing shows, so that most of them clash
+with something. Then the same check as a plain (venue_id, start_time)
+scan, as it would be without the slot indexes, and the cost of inserting a
+show under the constraints.
+"""
+import argparse
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from app import create_app
+from benchmarks.routes import benchmark_config
+from models import db, Venue, Artist, Show
+import scheduling
+
+
+def btree_query():
+    # The same rows found through the (venue_id, start_time) and (artist_id,
+    # start_time) btree indexes, which can bound the overlap test from one
+    # side only.
+    parts = [db.select(db.literal(clash).label('clash'), Show.id, Show.start_time, Show.end_time,
+                       Show.venue_id, Show.artist_id).where(
+        foreign_key == db.bindparam(clash + '_id'), Show.start_time < db.bindparam('end_time'),
+        Show.end_time > db.bindparam('start_time'))
+        for clash, foreign_key in (('venue', Show.venue_id), ('artist', Show.artist_id))]
+    shows = db.union_all(*parts).subquery()
+    return db.select(shows.c.id, Venue.name, Artist.name) \
+        .join(Venue, Venue.id == shows.c.venue_id).join(Artist, Artist.id == shows.c.artist_id)
+
+
+def percentiles(timings):
+    cuts = statistics.quantiles(timings, n=100)
+    return statistics.median(timings), cuts[98]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', '--number', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    app = create_app(benchmark_config(cold=True))
+    app.logger.disabled = True
+    with app.app_context():
+        venue_ids = [venue_id for venue_id, in db.session.query(Venue.id)]
+        artist_ids = [artist_id for artist_id, in db.session.query(Artist.id)]
+        last = db.session.query(db.func.max(Show.start_time)).scalar()
+        print('%d venues, %d artists, %d shows' % (len(venue_ids), len(artist_ids), db.session.query(Show).count()))
+
+        # Slots at the venue or with the artist of an existing show, on its
+        # evening, so that a good share of them clash.
+        shows = db.session.query(Show.venue_id, Show.artist_id, Show.start_time).order_by(db.func.random()) \
+            .limit(args.number).all()
+        probes = []
+        for venue_id, artist_id, start_time in shows:
+            start_time = start_time.replace(hour=rng.choice([18, 19, 20, 21, 22]), minute=rng.choice([0, 30]))
+            if rng.random() < 0.5:
+                venue_id = rng.choice(venue_ids)
+            else:
+                artist_id = rng.choice(artist_ids)
+            probes.append((venue_id, artist_id, start_time, start_time + scheduling.DEFAULT_LENGTH))
+
+        query = btree_query()
+
+        def without_slot_index(venue_id, artist_id, start_time, end_time):
+            return db.session.execute(query, {'venue_id': venue_id, 'artist_id': artist_id,
+                                              'start_time': start_time, 'end_time': end_time}).all()
+
+        for name, fn in (('find_conflicts', scheduling.find_conflicts), ('without slot index', without_slot_index)):
+            timings, clashes = [], 0
+            for probe in probes:
+                start = time.perf_counter()
+                rows = fn(*probe)
+                timings.append((time.perf_counter() - start) * 1000)
+                clashes += bool(rows)
+            median, p99 = percentiles(timings)
+            print('%-20s %8.3f ms median %8.3f ms p99  (%d of %d clash)' % (name, median, p99, clashes, len(probes)))
+
+        # Inserts past the seeded dates, one per venue, so none is refused.
+        timings = []
+        start_time = last + timedelta(days=30)
+        for venue_id in venue_ids[:min(len(venue_ids), 500)]:
+            start = time.perf_counter()
+            with db.session.begin_nested():
+                db.session.add(Show(venue_id=venue_id, artist_id=rng.choice(artist_ids), start_time=start_time))
+            timings.append((time.perf_counter() - start) * 1000)
+            start_time += scheduling.DEFAULT_LENGTH
+        db.session.rollback()
+        median, p99 = percentiles(timings)
+        print('%-20s %8.3f ms median %8.3f ms p99' % ('insert', median, p99))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+"""Per-call cost of the `datetime` Jinja filter.
+
+    python -m benchmarks.datetime_filter
+
+"before" is the filter as it used to be called: the view formats the show
+time with strftime, the filter re-parses it with dateutil and babel
+compiles the pattern again. "after" is the current filter given the
+datetime object directly.
+"""
+import timeit
+from datetime import datetime
+
+import babel.dates
+import dateutil.parser
+
+from filters import format_datetime
+
+FORMAT = "EEEE MMMM, d, y 'at' h:mma"
+
+
+def before(value):
+    date = dateutil.parser.parse(value.strftime("%Y-%m-%dT%H:%M:%f"))
+    return babel.dates.format_datetime(date, FORMAT)
+
+
+def after(value):
+    return format_datetime(value, 'full')
+
+
+def main(number=20000):
+    value = datetime(2026, 10, 18, 20, 30)
+    assert before(value) == after(value)
+    for name, fn in (('before', before), ('after', after)):
+        best = min(timeit.repeat(lambda: fn(value), number=number, repeat=5))
+        print('%-6s %6.2f us/call' % (name, best / number * 1e6))
+
+
+if __name__ == '__main__':
+    main()
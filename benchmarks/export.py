@@ -0,0 +1,75 @@
+"""Throughput and memory of the bulk export.
+
+    python -m benchmarks.export [--kind shows] [--batch-size 2000]
+
+Exports a table from the configured database to a null sink in each
+format and reports rows/sec and the peak Python heap (tracemalloc). "all
+rows" is the old approach for comparison: load the table with one query
+and serialize it, so its peak grows with the table while the streamed
+exports stay at a batch's worth.
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from app import create_app
+from models import db
+import exporter
+
+
+class NullSink(object):
+
+    def __init__(self):
+        self.bytes = 0
+
+    def write(self, data):
+        self.bytes += len(data)
+
+
+def all_rows(kind, sink):
+    model, columns = exporter.EXPORTS[kind]
+    rows = db.session.query(*[getattr(model, column) for column in columns]).order_by(model.id).all()
+    for row in rows:
+        sink.write(exporter.orjson.dumps(dict(zip(columns, row))) + b'\n')
+
+
+def measure(name, fn, count):
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print('%-10s %10.0f rows/s %8.1f MB peak' % (name, count / elapsed, peak / 1024 / 1024))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--kind', default='shows', choices=sorted(exporter.EXPORTS))
+    parser.add_argument('--batch-size', type=int, default=2000)
+    args = parser.parse_args()
+
+    with create_app().app_context():
+        model = exporter.EXPORTS[args.kind][0]
+        count = db.session.query(model).count()
+        print('%s: %d rows, batch size %d' % (args.kind, count, args.batch_size))
+        for fmt in ('jsonl', 'csv'):
+            measure(fmt, lambda: exporter.write_export(args.kind, fmt, NullSink(), args.batch_size), count)
+            db.session.rollback()
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            print('parquet    skipped, pyarrow is not installed')
+        else:
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, 'export.parquet')
+                measure('parquet', lambda: exporter.write_export(args.kind, 'parquet', path, args.batch_size), count)
+            db.session.rollback()
+        if exporter.orjson is not None:
+            measure('all rows', lambda: all_rows(args.kind, NullSink()), count)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""Genre filters and facet counts.
+
+    python -m benchmarks.genres [-n 20]
+
+Times the genre filters of the venue and artist listings: one genre, two
+genres that must all be listed (contains, @>) and two of which any will do
+(overlaps, &&). Each is timed through the GIN index on the genres array
+and as the same test written with ANY(), which no index can answer. Then
+the per-genre counts for a facet sidebar, as one aggregate and as a count
+query per genre.
+"""
+import argparse
+import statistics
+import time
+
+from app import create_app
+from benchmarks.routes import benchmark_config
+from benchmarks.seed import GENRES
+from models import db, Venue, Artist
+import queries
+
+FILTERS = [
+    (('Jazz',), 'all'),
+    (('Jazz', 'Blues'), 'all'),
+    (('Jazz', 'Blues'), 'any'),
+]
+
+
+def with_any(model, genres, match):
+    # genre = ANY(genres) for each genre, and-ed or or-ed together.
+    conditions = [db.any_(model.genres) == genre for genre in genres]
+    condition = db.and_(*conditions) if match == 'all' else db.or_(*conditions)
+    return db.session.execute(db.select(model.id, model.name).where(condition).order_by(model.id)).all()
+
+
+def with_index(model, genres, match):
+    return db.session.execute(db.select(model.id, model.name).where(
+        queries.genre_filter(model, genres, match)).order_by(model.id)).all()
+
+
+def count_per_genre(model):
+    counts = []
+    for genre in GENRES:
+        count = db.session.query(db.func.count(model.id)).filter(queries.genre_filter(model, (genre,))).scalar()
+        if count:
+            counts.append({'genre': genre, 'count': count})
+    return sorted(counts, key=lambda row: (-row['count'], row['genre']))
+
+
+def timed(fn, number):
+    fn()
+    timings = []
+    for _ in range(number):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', '--number', type=int, default=20)
+    args = parser.parse_args()
+
+    app = create_app(benchmark_config(cold=True))
+    app.logger.disabled = True
+    with app.app_context():
+        print('%-8s %-22s %8s %12s %12s' % ('table', 'filter', 'rows', 'GIN', 'ANY()'))
+        for model in (Venue, Artist):
+            for genres, match in FILTERS:
+                rows = with_index(model, genres, match)
+                assert rows == with_any(model, genres, match)
+                indexed = timed(lambda: with_index(model, genres, match), args.number)
+                scanned = timed(lambda: with_any(model, genres, match), args.number)
+                print('%-8s %-22s %8d %9.2f ms %9.2f ms' % (
+                    model.__tablename__, ('%s ' % match) + ','.join(genres), len(rows), indexed, scanned))
+
+        print()
+        print('%-8s %-22s %12s %12s' % ('table', 'facets', 'aggregate', 'per genre'))
+        for model in (Venue, Artist):
+            assert queries.genre_counts(model) == count_per_genre(model)
+            aggregate = timed(lambda: queries.genre_counts(model), args.number)
+            per_genre = timed(lambda: count_per_genre(model), args.number)
+            print('%-8s %-22s %9.2f ms %9.2f ms' % (model.__tablename__, 'all rows', aggregate, per_genre))
+            # The sidebar of a filtered listing counts only the matching rows.
+            aggregate = timed(lambda: queries.genre_counts(model, ('Jazz',)), args.number)
+            print('%-8s %-22s %9.2f ms' % (model.__tablename__, 'all Jazz', aggregate))
+
+
+if __name__ == '__main__':
+    main()
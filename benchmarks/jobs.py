@@ -0,0 +1,111 @@
+"""Background job queue.
+
+    python -m benchmarks.jobs [-n 2000] [--workers 1,2,4]
+
+Times what queueing a job adds to a request (one INSERT and its commit),
+next to running the directory refresh it stands for inline. Then drains
+-n jobs that each insert one row, with 1, 2 and 4 worker processes sharing
+the queue, and checks that every job ran exactly once. The jobs it queues,
+and the table they write to, are deleted afterwards.
+"""
+import argparse
+import multiprocessing
+import statistics
+import time
+
+from app import create_app
+from benchmarks.routes import benchmark_config
+from directory import refresh_directory
+from models import db, Job
+import jobs
+
+RUNS = 'JobBenchmarkRun'
+
+
+@jobs.handler('benchmark')
+def benchmark_job(n):
+    db.session.execute(db.text('INSERT INTO "%s" (n) VALUES (:n)' % RUNS), {'n': n})
+    db.session.commit()
+
+
+def percentiles(timings):
+    cuts = statistics.quantiles(timings, n=100)
+    return statistics.median(timings), cuts[98]
+
+
+def timed(fn, number):
+    timings = []
+    for _ in range(number):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return percentiles(timings)
+
+
+def settings():
+    config = benchmark_config(cold=True)
+    # Only the benchmark's jobs.
+    config.JOB_SCHEDULE = {}
+    return config
+
+
+def drain():
+    app = create_app(settings())
+    app.logger.disabled = True
+    with app.app_context():
+        jobs.work(burst=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', '--number', type=int, default=2000)
+    parser.add_argument('--workers', default='1,2,4', help='Worker process counts to try.')
+    args = parser.parse_args()
+
+    app = create_app(settings())
+    app.logger.disabled = True
+    with app.app_context():
+        db.session.execute(db.text('CREATE UNLOGGED TABLE "%s" (n integer NOT NULL)' % RUNS))
+        db.session.commit()
+        try:
+            def enqueue(key=None):
+                jobs.enqueue('benchmark', {'n': 0}, key=key, delay=3600)
+                db.session.commit()
+
+            print('%-28s %8.2f ms median %8.2f ms p99' % ('enqueue', *timed(enqueue, 500)))
+            print('%-28s %8.2f ms median %8.2f ms p99' % ('enqueue, folded by key', *timed(
+                lambda: enqueue('benchmark'), 500)))
+            print('%-28s %8.2f ms median %8.2f ms p99' % ('refresh directory inline', *timed(
+                lambda: refresh_directory(wait=True), 20)))
+            db.session.execute(db.delete(Job).where(Job.kind == 'benchmark'))
+            db.session.commit()
+
+            for workers in [int(count) for count in args.workers.split(',')]:
+                db.session.execute(db.insert(Job), [
+                    {'kind': 'benchmark', 'payload': {'n': n}, 'max_attempts': 1} for n in range(args.number)])
+                db.session.commit()
+                start = time.perf_counter()
+                processes = [multiprocessing.Process(target=drain) for _ in range(workers)]
+                for process in processes:
+                    process.start()
+                for process in processes:
+                    process.join()
+                seconds = time.perf_counter() - start
+                runs, distinct = db.session.execute(db.text(
+                    'SELECT count(*), count(DISTINCT n) FROM "%s"' % RUNS)).one()
+                done = db.session.query(Job).filter(Job.kind == 'benchmark', Job.status == 'done',
+                                                    Job.attempts == 1).count()
+                assert runs == distinct == done == args.number, (runs, distinct, done)
+                print('%d workers: %d jobs in %.2f s, %.0f jobs/s' % (workers, runs, seconds, runs / seconds))
+                db.session.execute(db.text('TRUNCATE "%s"' % RUNS))
+                db.session.execute(db.delete(Job).where(Job.kind == 'benchmark'))
+                db.session.commit()
+        finally:
+            db.session.rollback()
+            db.session.execute(db.delete(Job).where(Job.kind == 'benchmark'))
+            db.session.execute(db.text('DROP TABLE IF EXISTS "%s"' % RUNS))
+            db.session.commit()
+
+
+if __name__ == '__main__':
+    main()
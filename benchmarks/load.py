@@ -0,0 +1,155 @@
+"""Load test a running server: throughput and latency by concurrency.
+
+    python -m benchmarks.load http://127.0.0.1:8000 [-c 1,8,32] [-d 10] [--venue-id 1 --artist-id 1]
+
+Start the server first, once per serving mode with the same number of
+worker processes:
+
+    gunicorn -w 2 'app:create_app()'                          # WSGI
+    uvicorn --factory asgi:create_asgi_app --workers 2        # ASGI
+
+For each concurrency level that many clients send the read pages in turn
+(/venues, /artists, /shows, a venue and an artist page and both searches)
+for -d seconds, each keeping one HTTP/1.1 connection open for as long as
+the server allows. It reports requests per second, latency percentiles
+(ms) and non-2xx responses. Uses only the standard library, so the client
+costs as little as possible; on a small machine it still shares the CPU
+with the server, so compare modes on the same machine only.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from urllib.parse import urlencode, urlsplit
+
+
+def read_pages(venue_id, artist_id):
+    # (method, path, form body)
+    return [
+        ('GET', '/venues', None),
+        ('GET', '/artists', None),
+        ('GET', '/shows', None),
+        ('GET', '/shows?upcoming=1', None),
+        ('GET', '/venues/%d' % venue_id, None),
+        ('GET', '/artists/%d' % artist_id, None),
+        ('POST', '/venues/search', urlencode({'search_term': 'blue'}).encode()),
+        ('POST', '/artists/search', urlencode({'search_term': 'the'}).encode()),
+    ]
+
+
+class Client(object):
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = self.writer = None
+
+    async def request(self, method, path, body):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        head = '%s %s HTTP/1.1\r\nHost: %s\r\n' % (method, path, self.host)
+        if body is not None:
+            head += 'Content-Type: application/x-www-form-urlencoded\r\nContent-Length: %d\r\n' % len(body)
+        self.writer.write(head.encode('latin1') + b'\r\n' + (body or b''))
+        status = int((await self.reader.readline()).split()[1])
+        length, chunked, close = None, False, False
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b''):
+                break
+            name, _, value = line.decode('latin1').partition(':')
+            name, value = name.strip().lower(), value.strip().lower()
+            if name == 'content-length':
+                length = int(value)
+            elif name == 'transfer-encoding':
+                chunked = 'chunked' in value
+            elif name == 'connection':
+                close = value == 'close'
+        if chunked:
+            while True:
+                size = int((await self.reader.readline()).split(b';')[0], 16)
+                await self.reader.readexactly(size + 2)
+                if size == 0:
+                    break
+        elif length is not None:
+            await self.reader.readexactly(length)
+        else:
+            await self.reader.read()
+            close = True
+        if close:
+            self.close()
+        return status
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.reader = self.writer = None
+
+
+async def client_loop(client, pages, offset, deadline, timings, errors):
+    i = offset
+    while time.perf_counter() < deadline:
+        method, path, body = pages[i % len(pages)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            status = await client.request(method, path, body)
+        except (OSError, asyncio.IncompleteReadError, ValueError, IndexError):
+            client.close()
+            errors.append(None)
+            continue
+        timings.append((time.perf_counter() - start) * 1000)
+        if not 200 <= status < 300:
+            errors.append(status)
+    client.close()
+
+
+async def run_level(host, port, pages, concurrency, duration):
+    timings, errors = [], []
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*[client_loop(Client(host, port), pages, n, deadline, timings, errors)
+                           for n in range(concurrency)])
+    elapsed = time.perf_counter() - start
+    percentiles = statistics.quantiles(timings, n=100) if len(timings) > 1 else [0.0] * 99
+    return {
+        'concurrency': concurrency,
+        'requests': len(timings),
+        'rps': len(timings) / elapsed,
+        'p50': percentiles[49],
+        'p90': percentiles[89],
+        'p99': percentiles[98],
+        'errors': len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('url', help='Base URL of the running server.')
+    parser.add_argument('-c', '--concurrency', default='1,8,32', help='Comma-separated client counts.')
+    parser.add_argument('-d', '--duration', type=float, default=10, help='Seconds per concurrency level.')
+    parser.add_argument('--warmup', type=float, default=2, help='Seconds of load before measuring.')
+    parser.add_argument('--venue-id', type=int, default=1)
+    parser.add_argument('--artist-id', type=int, default=1)
+    parser.add_argument('-o', '--output', help='Save the results as JSON.')
+    args = parser.parse_args()
+
+    url = urlsplit(args.url)
+    host, port = url.hostname, url.port or 80
+    pages = read_pages(args.venue_id, args.artist_id)
+    levels = [int(level) for level in args.concurrency.split(',')]
+    asyncio.run(run_level(host, port, pages, max(levels), args.warmup))
+    results = []
+    print('%6s %9s %9s %9s %9s %7s' % ('conc', 'req/s', 'p50 ms', 'p90 ms', 'p99 ms', 'errors'))
+    for concurrency in levels:
+        result = asyncio.run(run_level(host, port, pages, concurrency, args.duration))
+        results.append(result)
+        print('%(concurrency)6d %(rps)9.1f %(p50)9.1f %(p90)9.1f %(p99)9.1f %(errors)7d' % result)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'url': args.url, 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Request hot-path cost of the Prometheus metrics.
+
+    python -m benchmarks.metrics [-n 20000] [--budget 75]
+
+"hooks" times what metrics.py adds to one request, called directly: the
+before/after_request hooks, three counted statements and one pool
+checkout. "request" serves / (no queries) through the test client with
+the metrics on and off and takes the difference of the medians, as a
+cross-check that includes Flask's dispatch. Unless PROMETHEUS_MULTIPROC_DIR
+is already set it runs in multiprocess mode against a temporary directory,
+as under gunicorn. Exits non-zero when the hooks cost more than --budget
+microseconds.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+if 'PROMETHEUS_MULTIPROC_DIR' not in os.environ:
+    # prometheus_client picks its storage when it is first imported.
+    os.environ['PROMETHEUS_MULTIPROC_DIR'] = tempfile.mkdtemp(prefix='fyyur-metrics-')
+
+from flask import Response
+
+from app import create_app
+from benchmarks.routes import benchmark_config
+import metrics
+
+BUDGET_US = 75
+
+
+def app_with_metrics(enabled):
+    settings = benchmark_config(cold=False)
+    settings.METRICS_ENABLED = enabled
+    settings.SQL_PROFILE_ENABLED = False
+    app = create_app(settings)
+    app.logger.disabled = True
+    return app
+
+
+def time_hooks(app, number):
+    recorder = app.extensions['metrics']
+    response = Response('ok')
+    timings = []
+    with app.test_request_context('/venues/1'):
+        for _ in range(number):
+            start = time.perf_counter()
+            recorder.on_wait(0.0001, False)
+            recorder.on_checkout(None, None, None)
+            recorder.before_request()
+            for _ in range(3):
+                recorder.after_cursor_execute(None, None, None, None, None, False)
+            recorder.after_request(response)
+            recorder.on_checkin(None, None)
+            timings.append((time.perf_counter() - start) * 1e6)
+    return statistics.median(timings), statistics.quantiles(timings, n=100)[98]
+
+
+def time_requests(clients, number):
+    timings = {name: [] for name in clients}
+    for _ in range(number):
+        for name, client in clients.items():
+            start = time.perf_counter()
+            client.get('/').get_data()
+            timings[name].append((time.perf_counter() - start) * 1e6)
+    return {name: statistics.median(values) for name, values in timings.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', '--number', type=int, default=20000, help='Iterations of the hooks.')
+    parser.add_argument('--budget', type=float, default=BUDGET_US, help='Allowed microseconds per request.')
+    args = parser.parse_args()
+    if metrics.prometheus_client is None:
+        sys.exit('prometheus_client is not installed')
+
+    on, off = app_with_metrics(True), app_with_metrics(False)
+    print('multiprocess mode: %s' % metrics.multiprocess_mode())
+    time_hooks(on, 1000)
+    median, p99 = time_hooks(on, args.number)
+    print('hooks      %7.1f us median %7.1f us p99' % (median, p99))
+    clients = {'on': on.test_client(), 'off': off.test_client()}
+    time_requests(clients, 200)
+    medians = time_requests(clients, max(args.number // 20, 100))
+    print('request    %7.1f us with metrics, %7.1f us without (%+.1f us)' % (
+        medians['on'], medians['off'], medians['on'] - medians['off']))
+    if median > args.budget:
+        print('over the %.0f us budget' % args.budget)
+        sys.exit(1)
+    print('within the %.0f us budget' % args.budget)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""Nearest venue and radius searches.
+
+    python -m benchmarks.nearby [-n 500] [--seed 0]
+
+Times geo.nearest_venues and geo.venues_within, the queries behind
+/api/v1/venues/nearby, from random points: half of them near a venue, the
+rest anywhere in the continental US, where the nearest venue may be far
+away. Then the same searches as a scan that measures the distance to every
+venue, as they would run without the location index; both are checked to
+return the same venues.
+"""
+import argparse
+import random
+import statistics
+import time
+
+from flask import current_app
+
+from app import create_app
+from benchmarks.routes import benchmark_config
+from models import db, Venue
+import geo
+
+SEARCHES = [
+    ('nearest 10', None, 10),
+    ('nearest 50', None, 50),
+    ('within 5 km', 5, 50),
+    ('within 25 km', 25, 50),
+    ('within 100 km', 100, 50),
+]
+
+
+def scan_query():
+    distance = geo.distance_km()
+    label = distance.label('distance')
+    return db.select(Venue.id, Venue.name, Venue.city, Venue.state, Venue.address, Venue.genres, Venue.latitude,
+                     Venue.longitude, label) \
+        .where(Venue.latitude.isnot(None), distance <= db.bindparam('radius', type_=db.Float)) \
+        .order_by(label, Venue.id).limit(db.bindparam('limit'))
+
+
+def percentiles(timings):
+    cuts = statistics.quantiles(timings, n=100)
+    return statistics.median(timings), cuts[98]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', '--number', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    app = create_app(benchmark_config(cold=True))
+    app.logger.disabled = True
+    with app.app_context():
+        positions = db.session.query(Venue.latitude, Venue.longitude).filter(Venue.latitude.isnot(None)) \
+            .order_by(db.func.random()).limit(args.number // 2).all()
+        print('%d venues, %d with coordinates' % (
+            db.session.query(Venue).count(), db.session.query(Venue).filter(Venue.latitude.isnot(None)).count()))
+        points = [(latitude + rng.uniform(-0.05, 0.05), longitude + rng.uniform(-0.05, 0.05))
+                  for latitude, longitude in positions]
+        points += [(rng.uniform(25, 49), rng.uniform(-124, -67)) for _ in range(args.number - len(points))]
+
+        query = scan_query()
+
+        def scan(latitude, longitude, radius, limit):
+            rows = db.session.execute(query, {'latitude': latitude, 'longitude': longitude,
+                                              'radius': radius or geo.MAX_DISTANCE_KM, 'limit': limit}).all()
+            return geo.venue_data(rows)
+
+        def indexed(latitude, longitude, radius, limit):
+            if radius is None:
+                return geo.nearest_venues(latitude, longitude, limit)
+            return geo.venues_within(latitude, longitude, radius, limit)
+
+        assert current_app.config['NEARBY_RESULTS_LIMIT'] >= max(limit for _, _, limit in SEARCHES)
+        print('%-14s %21s %21s %8s' % ('search', 'index p50 / p99', 'scan p50 / p99', 'venues'))
+        for name, radius, limit in SEARCHES:
+            indexed_timings, scan_timings, found = [], [], 0
+            for number, (latitude, longitude) in enumerate(points):
+                start = time.perf_counter()
+                data = indexed(latitude, longitude, radius, limit)
+                indexed_timings.append((time.perf_counter() - start) * 1000)
+                found += len(data)
+                # The scan reads every venue; one point in ten is enough.
+                if number % 10 == 0:
+                    start = time.perf_counter()
+                    expected = scan(latitude, longitude, radius, limit)
+                    scan_timings.append((time.perf_counter() - start) * 1000)
+                    assert [row['venue_id'] for row in data] == [row['venue_id'] for row in expected], name
+            print('%-14s %8.2f / %7.2f ms %8.2f / %7.2f ms %8.1f' % (
+                name, *percentiles(indexed_timings), *percentiles(scan_timings), found / len(points)))
+
+
+if __name__ == '__main__':
+    main()
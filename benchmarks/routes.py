@@ -0,0 +1,165 @@
+"""Time every route of the app.
+
+    python -m benchmarks.routes [-n 50] [--cold] [-o results.json]
+
+Requests go through the Flask test client against the configured database,
+so the numbers cover routing, queries and rendering but not the network.
+For each route it records latency percentiles (ms), and the queries issued
+and rows fetched by one request. --cold turns the detail and fragment
+caches off. Results are printed and, with -o, saved for benchmarks.compare.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import time
+
+from sqlalchemy import event
+
+import config
+from app import create_app
+from models import db, Venue, Artist, Show
+from benchmarks.seed import WORDS
+
+# Routes that write, and routes whose cost is the size of the whole table.
+SKIP = {'static', 'venues.create_venue_submission', 'venues.delete_venue', 'venues.edit_venue_submission',
+        'artists.create_artist_submission', 'artists.edit_artist_submission', 'shows.create_show_submission',
+        'api.export'}
+
+# Extra variants of routes whose query string changes the work done
+# (/shows?stream=1 is left out: it renders the whole table).
+VARIANTS = [
+    ('GET', '/shows?upcoming=1', None),
+    ('GET', '/api/v1/shows?upcoming=1', None),
+]
+
+
+class QueryCounter(object):
+
+    def __init__(self, engine):
+        self.queries = 0
+        self.rows = 0
+        event.listen(engine, 'after_cursor_execute', self.after_cursor_execute)
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.queries += 1
+        if cursor.description is not None and cursor.rowcount > 0:
+            self.rows += cursor.rowcount
+
+    def reset(self):
+        self.queries = self.rows = 0
+
+
+def sample_ids():
+    # The venue and artist with the most shows, so detail pages have
+    # something to paginate.
+    venue_id = db.session.query(Show.venue_id).group_by(Show.venue_id).order_by(db.func.count().desc()).limit(1).scalar()
+    artist_id = db.session.query(Show.artist_id).group_by(Show.artist_id).order_by(db.func.count().desc()).limit(1).scalar()
+    return {
+        'venue_id': venue_id or db.session.query(db.func.min(Venue.id)).scalar(),
+        'artist_id': artist_id or db.session.query(db.func.min(Artist.id)).scalar(),
+    }
+
+
+def requests_for(app, ids):
+    # A word that benchmarks.seed puts in venue and artist names.
+    search_term = WORDS[0]
+    for rule in sorted(app.url_map.iter_rules(), key=lambda rule: rule.rule):
+        if rule.endpoint in SKIP:
+            continue
+        if any(argument not in ids for argument in rule.arguments):
+            continue
+        path = rule.build({argument: ids[argument] for argument in rule.arguments})[1]
+        if 'GET' in rule.methods:
+            if rule.rule.startswith('/api/v1/search/'):
+                path += '?q=' + search_term
+            yield 'GET', path, None
+        elif 'POST' in rule.methods and rule.endpoint in ('venues.search_venues', 'artists.search_artists'):
+            yield 'POST', path, {'search_term': search_term}
+    for variant in VARIANTS:
+        yield variant
+
+
+def time_route(client, counter, method, path, data, number):
+    response = client.open(path, method=method, data=data)
+    response.get_data()
+    counter.reset()
+    response = client.open(path, method=method, data=data)
+    response.get_data()
+    queries, rows = counter.queries, counter.rows
+    timings = []
+    for _ in range(number):
+        start = time.perf_counter()
+        response = client.open(path, method=method, data=data)
+        response.get_data()
+        timings.append((time.perf_counter() - start) * 1000)
+    percentiles = statistics.quantiles(timings, n=100, method='inclusive')
+    return {
+        'status': response.status_code,
+        'p50': round(percentiles[49], 3),
+        'p90': round(percentiles[89], 3),
+        'p99': round(percentiles[98], 3),
+        'mean': round(statistics.mean(timings), 3),
+        'queries': queries,
+        'rows': rows,
+    }
+
+
+def benchmark_config(cold):
+    # config.py with debug off, and optionally without caches.
+    settings = type('BenchmarkConfig', (), {name: getattr(config, name) for name in dir(config) if name.isupper()})
+    settings.DEBUG = False
+    # Keep the runs' logging out of the checked-in error.log.
+    settings.LOG_FILE = None
+    if cold:
+        settings.CACHE_TTL = 0
+        settings.FRAGMENT_CACHE_ENABLED = False
+    return settings
+
+
+def revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', '--number', type=int, default=50, help='Timed requests per route.')
+    parser.add_argument('--cold', action='store_true', help='Disable the detail and fragment caches.')
+    parser.add_argument('-o', '--output', help='Save the results as JSON.')
+    args = parser.parse_args()
+    if args.number < 2:
+        parser.error('--number must be at least 2')
+
+    app = create_app(benchmark_config(args.cold))
+    app.logger.disabled = True
+    with app.app_context():
+        counter = QueryCounter(db.engine)
+        ids = sample_ids()
+        dataset = {
+            'venues': db.session.query(Venue).count(),
+            'artists': db.session.query(Artist).count(),
+            'shows': db.session.query(Show).count(),
+        }
+        db.session.remove()
+        requests = list(requests_for(app, ids))
+    client = app.test_client()
+
+    results = {}
+    print('%-48s %6s %9s %9s %9s %8s %8s' % ('route', 'status', 'p50 ms', 'p90 ms', 'p99 ms', 'queries', 'rows'))
+    for method, path, data in requests:
+        name = '%s %s' % (method, path)
+        results[name] = result = time_route(client, counter, method, path, data, args.number)
+        print('%-48s %6d %9.2f %9.2f %9.2f %8d %8d' % (
+            name, result['status'], result['p50'], result['p90'], result['p99'], result['queries'], result['rows']))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'revision': revision(), 'cold': args.cold, 'number': args.number, 'dataset': dataset,
+                       'ids': ids, 'routes': results}, f, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
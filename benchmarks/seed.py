@@ -0,0 +1,201 @@
+"""Seed a synthetic catalogue.
+
+    python -m benchmarks.seed --reset [--venues 1000] [--cities 25]
+                                      [--artists 2000] [--shows 50000]
+
+Venues are spread over the cities with a long tail (a few big cities hold
+most of them), and shows favour popular venues and artists the same way,
+so some detail pages have thousands of shows and most have a handful.
+Show times fall between a year ago and six months ahead, in the evening,
+more often at weekends, and never double-book a venue or an artist. Venues
+are placed within 25 km of their city's centre in the gazetteer. The
+same --seed always produces the same data.
+"""
+import argparse
+import math
+import random
+import re
+from datetime import datetime, timedelta
+
+from app import create_app
+from models import db, Venue, Artist, Show
+from importer import copy_rows
+import geo
+
+CITIES = [
+    ('New York', 'NY'), ('Los Angeles', 'CA'), ('Chicago', 'IL'), ('Houston', 'TX'), ('Phoenix', 'AZ'),
+    ('Philadelphia', 'PA'), ('San Antonio', 'TX'), ('San Diego', 'CA'), ('Dallas', 'TX'), ('Austin', 'TX'),
+    ('Jacksonville', 'FL'), ('San Francisco', 'CA'), ('Columbus', 'OH'), ('Charlotte', 'NC'), ('Seattle', 'WA'),
+    ('Denver', 'CO'), ('Washington', 'DC'), ('Boston', 'MA'), ('Nashville', 'TN'), ('Detroit', 'MI'),
+    ('Portland', 'OR'), ('Las Vegas', 'NV'), ('Memphis', 'TN'), ('Louisville', 'KY'), ('Baltimore', 'MD'),
+    ('Milwaukee', 'WI'), ('Albuquerque', 'NM'), ('Atlanta', 'GA'), ('Kansas City', 'MO'), ('Miami', 'FL'),
+]
+
+GENRES = ['Alternative', 'Blues', 'Classical', 'Country', 'Electronic', 'Folk', 'Funk', 'Hip-Hop', 'Heavy Metal',
+          'Instrumental', 'Jazz', 'Musical Theatre', 'Pop', 'Punk', 'R&B', 'Reggae', 'Rock n Roll', 'Soul', 'Other']
+
+WORDS = ['Blue', 'Red', 'Velvet', 'Golden', 'Electric', 'Midnight', 'Silver', 'Lucky', 'Iron', 'Wild', 'Neon',
+         'Crystal', 'Rusty', 'Hollow', 'Northern', 'Echo', 'Paper', 'Broken', 'Little', 'Grand']
+VENUE_NOUNS = ['Room', 'Hall', 'Lounge', 'Tavern', 'Theatre', 'Club', 'Cellar', 'Garden', 'Ballroom', 'Saloon']
+ARTIST_NOUNS = ['Owls', 'Rivers', 'Machines', 'Sisters', 'Kings', 'Ghosts', 'Hearts', 'Wolves', 'Lights', 'Trio']
+
+
+def cities(count):
+    names = list(CITIES[:count])
+    for i in range(len(names), count):
+        city, state = CITIES[i % len(CITIES)]
+        names.append(('%s %d' % (city, i // len(CITIES) + 1), state))
+    return names
+
+
+def zipf_weights(count, s=1.1):
+    return [1.0 / (rank + 1) ** s for rank in range(count)]
+
+
+def phone(rng):
+    return '%03d%03d%04d' % (rng.randint(200, 999), rng.randint(200, 999), rng.randint(0, 9999))
+
+
+def centres(rng, city_names):
+    # {(city, state): (latitude, longitude)}. The numbered copies of a city
+    # are put up to 200 km from the original.
+    coordinates = {}
+    for city, state in city_names:
+        latitude, longitude = geo.locate(re.sub(r' \d+$', '', city), state)
+        if city not in dict(CITIES):
+            latitude, longitude = scatter(rng, latitude, longitude, 200)
+        coordinates[(city, state)] = (latitude, longitude)
+    return coordinates
+
+
+def scatter(rng, latitude, longitude, radius):
+    # A point up to `radius` km away, uniform over the disc.
+    distance = radius * math.sqrt(rng.random())
+    bearing = rng.uniform(0, 2 * math.pi)
+    latitude += distance * math.cos(bearing) / 111.2
+    longitude += distance * math.sin(bearing) / (111.2 * math.cos(math.radians(latitude)))
+    return round(latitude, 6), round(longitude, 6)
+
+
+def venues(rng, count, city_names, coordinates_rng):
+    # Coordinates are drawn from their own generator so that adding them
+    # left the rest of the data as it was.
+    city_list = rng.choices(city_names, weights=zipf_weights(len(city_names)), k=count)
+    city_centres = centres(coordinates_rng, city_names)
+    for i, (city, state) in enumerate(city_list, 1):
+        name = '%s %s %d' % (rng.choice(WORDS), rng.choice(VENUE_NOUNS), i)
+        latitude, longitude = scatter(coordinates_rng, *city_centres[(city, state)], 25)
+        yield {
+            'name': name, 'city': city, 'state': state,
+            'address': '%d %s St' % (rng.randint(1, 9999), rng.choice(WORDS)),
+            'phone': phone(rng), 'genres': rng.sample(GENRES, rng.randint(1, 4)),
+            'image_link': 'https://images.example.com/venues/%d.jpg' % i,
+            'facebook_link': 'https://www.facebook.com/venue%d' % i,
+            'website': 'https://venue%d.example.com' % i if rng.random() < 0.7 else None,
+            'seeking_talent': rng.random() < 0.3,
+            'seeking_description': 'Looking for local acts.' if rng.random() < 0.3 else None,
+            'latitude': latitude, 'longitude': longitude,
+        }
+
+
+def artists(rng, count, city_names):
+    for i in range(1, count + 1):
+        city, state = rng.choice(city_names)
+        yield {
+            'name': 'The %s %s %d' % (rng.choice(WORDS), rng.choice(ARTIST_NOUNS), i), 'city': city, 'state': state,
+            'phone': phone(rng), 'genres': rng.sample(GENRES, rng.randint(1, 3)),
+            'image_link': 'https://images.example.com/artists/%d.jpg' % i,
+            'facebook_link': 'https://www.facebook.com/artist%d' % i if rng.random() < 0.8 else None,
+            'website': 'https://artist%d.example.com' % i if rng.random() < 0.5 else None,
+            'seeking_venue': rng.random() < 0.4,
+            'seeking_description': 'Booking a tour.' if rng.random() < 0.3 else None,
+        }
+
+
+def shows(rng, count, venue_ids, artist_ids, now):
+    # Popularity ranks are shuffled so the busy venues and artists aren't
+    # simply the lowest ids.
+    venue_ids = rng.sample(venue_ids, len(venue_ids))
+    artist_ids = rng.sample(artist_ids, len(artist_ids))
+    venue_weights = zipf_weights(len(venue_ids), 0.9)
+    artist_weights = zipf_weights(len(artist_ids), 0.9)
+    start = now - timedelta(days=365)
+    # Shows start on the half hour between 18:00 and 23:30 and last the
+    # default two hours, so they overlap when they are on the same evening
+    # less than four half hours apart. A pick that would double-book its
+    # venue or artist is drawn again.
+    booked = set()
+    draws = 0
+    remaining = count
+    while remaining:
+        draws += remaining
+        if draws > count * 20:
+            raise ValueError('not enough free evenings for %d shows; add venues or artists' % count)
+        venue_picks = rng.choices(venue_ids, weights=venue_weights, k=remaining)
+        artist_picks = rng.choices(artist_ids, weights=artist_weights, k=remaining)
+        for venue_id, artist_id in zip(venue_picks, artist_picks):
+            day = start + timedelta(days=rng.randint(0, 545))
+            if day.weekday() < 4 and rng.random() < 0.5:
+                day += timedelta(days=4 - day.weekday() + rng.randint(0, 2))
+            hour = rng.choice([18, 19, 20, 20, 21, 21, 22, 23])
+            minute = rng.choice([0, 0, 0, 30])
+            half = (hour - 18) * 2 + minute // 30
+            evening = day.date()
+            if any(('venue', venue_id, evening, other) in booked or ('artist', artist_id, evening, other) in booked
+                   for other in range(half - 3, half + 4)):
+                continue
+            booked.add(('venue', venue_id, evening, half))
+            booked.add(('artist', artist_id, evening, half))
+            remaining -= 1
+            yield {
+                'venue_id': venue_id, 'artist_id': artist_id,
+                'start_time': day.replace(hour=hour, minute=minute, second=0, microsecond=0),
+            }
+
+
+def load(model, rows, batch_size=5000):
+    rows = iter(rows)
+    columns = None
+    while True:
+        batch = [row for _, row in zip(range(batch_size), rows)]
+        if not batch:
+            return
+        columns = columns or list(batch[0])
+        copy_rows(model, columns, batch)
+
+
+def seed(venue_count=1000, city_count=25, artist_count=2000, show_count=50000, seed=0):
+    rng = random.Random(seed)
+    now = datetime.today()
+    city_names = cities(city_count)
+    load(Venue, venues(rng, venue_count, city_names, random.Random('positions %d' % seed)))
+    load(Artist, artists(rng, artist_count, city_names))
+    venue_ids = [venue_id for venue_id, in db.session.query(Venue.id).order_by(Venue.id)]
+    artist_ids = [artist_id for artist_id, in db.session.query(Artist.id).order_by(Artist.id)]
+    load(Show, shows(rng, show_count, venue_ids, artist_ids, now))
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--venues', type=int, default=1000)
+    parser.add_argument('--cities', type=int, default=25)
+    parser.add_argument('--artists', type=int, default=2000)
+    parser.add_argument('--shows', type=int, default=50000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--reset', action='store_true', help='Empty the Venue, Artist and Show tables first.')
+    args = parser.parse_args()
+
+    with create_app().app_context():
+        if args.reset:
+            db.session.execute(db.text('TRUNCATE "Show", "Venue", "Artist" RESTART IDENTITY CASCADE'))
+        elif db.session.query(Venue.id).first() is not None or db.session.query(Artist.id).first() is not None:
+            parser.error('the database already has venues or artists; use --reset to replace them')
+        seed(args.venues, args.cities, args.artists, args.shows, args.seed)
+        db.session.execute(db.text('ANALYZE "Venue", "Artist", "Show"'))
+        db.session.commit()
+        print('%d venues in %d cities, %d artists, %d shows' % (args.venues, args.cities, args.artists, args.shows))
+
+
+if __name__ == '__main__':
+    main()
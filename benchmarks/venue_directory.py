@@ -0,0 +1,88 @@
+"""The /venues directory: materialized view against the live queries.
+
+    python -m benchmarks.venue_directory [-n 50] [--burst 100]
+
+Times the query behind /venues three ways: the live aggregate over Show
+(a join and GROUP BY, as before the counters), the Venue rows with their
+show counters, and the VenueDirectory view. Then the cost of refreshing
+the view, concurrently and not, and how many refreshes a burst of writes
+asks for once debounced.
+"""
+import argparse
+import statistics
+import time
+from datetime import datetime
+
+from app import create_app
+from benchmarks.routes import benchmark_config
+from directory import DirectoryRefresher, refresh_directory
+from models import db, Venue, Show
+import queries
+
+
+def live_aggregate(now):
+    return db.session.query(
+        Venue.city, Venue.state, Venue.id, Venue.name, Venue.updated_at,
+        db.func.count(Show.id).filter(Show.start_time > now).label('num_upcoming_shows')
+    ).outerjoin(Show, Show.venue_id == Venue.id).group_by(
+        Venue.city, Venue.state, Venue.id, Venue.name
+    ).order_by(Venue.city, Venue.state, Venue.id).all()
+
+
+def counters(now):
+    return db.session.execute(queries.venue_rows(now)).all()
+
+
+def view(now):
+    return db.session.execute(queries.directory_rows(now)).all()
+
+
+def timed(fn, number):
+    fn()
+    timings = []
+    for _ in range(number):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), max(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', '--number', type=int, default=50)
+    parser.add_argument('--burst', type=int, default=100, help='Writes asking for a refresh in one burst.')
+    args = parser.parse_args()
+
+    settings = benchmark_config(cold=True)
+    settings.DIRECTORY_REFRESH_DELAY = 0.5
+    # Folds the burst below on the timer thread; benchmarks.jobs times the
+    # queue.
+    settings.JOB_QUEUE = False
+    app = create_app(settings)
+    app.logger.disabled = True
+    with app.app_context():
+        refresh_directory(wait=True)
+        now = datetime.today()
+        print('%d venues, %d shows' % (db.session.query(Venue).count(), db.session.query(Show).count()))
+        expected = [tuple(row) for row in live_aggregate(now)]
+        for name, fn in (('live aggregate', live_aggregate), ('counters', counters),
+                         ('view', view)):
+            assert [tuple(row) for row in fn(now)] == expected, name
+            median, worst = timed(lambda: fn(now), args.number)
+            print('%-16s %8.2f ms median %8.2f ms max' % (name, median, worst))
+        db.session.rollback()
+
+        for name, concurrently in (('refresh', False), ('refresh concurrently', True)):
+            median, worst = timed(lambda: refresh_directory(concurrently=concurrently, wait=True), 10)
+            print('%-20s %8.2f ms median %8.2f ms max' % (name, median, worst))
+
+        refresher = DirectoryRefresher()
+        refresher.init_app(app)
+        for _ in range(args.burst):
+            refresher.request_refresh(app)
+        time.sleep(settings.DIRECTORY_REFRESH_DELAY + 1)
+        print('%d refresh requests -> %d refresh' % (refresher.requests, refresher.refreshes))
+
+
+if __name__ == '__main__':
+    main()
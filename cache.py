@@ -0,0 +1,236 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from jinja2 import nodes
+from jinja2.ext import Extension
+
+#----------------------------------------------------------------------------#
+# Read-through cache for assembled page data.
+#
+# Backends store picklable values under string keys and treat a missing or
+# expired entry as None. MemoryCache is private to one worker process, so
+# a write only invalidates the worker that served it and the other workers
+# keep their copy until it expires; use RedisCache when several workers
+# must see invalidations immediately.
+#----------------------------------------------------------------------------#
+
+
+class MemoryCache(object):
+    # In-process LRU cache whose entries also expire `ttl` seconds after
+    # they were stored.
+
+    def __init__(self, maxsize=1024, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class RedisCache(object):
+    # Cache shared by every worker through a Redis server.
+
+    def __init__(self, client, ttl=60, prefix='fyyur:'):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        if value is None:
+            return None
+        return pickle.loads(value)
+
+    def set(self, key, value):
+        self.client.set(self.prefix + key, pickle.dumps(value), ex=self.ttl)
+
+    def delete(self, *keys):
+        if keys:
+            self.client.delete(*[self.prefix + key for key in keys])
+
+    def clear(self):
+        keys = list(self.client.scan_iter(self.prefix + '*'))
+        if keys:
+            self.client.delete(*keys)
+
+    def __len__(self):
+        return sum(1 for _ in self.client.scan_iter(self.prefix + '*'))
+
+
+class DetailCache(object):
+    # Counts hits and misses in front of a backend.
+
+    def __init__(self, backend=None):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        self.backend = make_backend(app.config)
+        app.extensions['detail_cache'] = self
+
+    def get_or_build(self, key, build):
+        value = self.backend.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        self.misses += 1
+        value = build()
+        if value is not None:
+            self.backend.set(key, value)
+        return value
+
+    async def get_or_build_async(self, key, build):
+        # The same with a coroutine function (asgi.py). The backend calls
+        # still block, which for RedisCache means a round trip each.
+        value = self.backend.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        self.misses += 1
+        value = await build()
+        if value is not None:
+            self.backend.set(key, value)
+        return value
+
+    def invalidate(self, *keys):
+        self.backend.delete(*keys)
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        return {
+            'backend': type(self.backend).__name__,
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self.backend),
+        }
+
+
+def make_backend(config):
+    if config['CACHE_BACKEND'] == 'redis':
+        import redis
+        return RedisCache(redis.Redis.from_url(config['CACHE_REDIS_URL']), ttl=config['CACHE_TTL'])
+    elif config['CACHE_BACKEND'] == 'memory':
+        return MemoryCache(maxsize=config['CACHE_MAXSIZE'], ttl=config['CACHE_TTL'])
+    raise ValueError('Unknown CACHE_BACKEND %r' % config['CACHE_BACKEND'])
+
+
+detail_cache = DetailCache()
+
+
+#----------------------------------------------------------------------------#
+# Rendered template fragments.
+#
+#   {% cache 'show:' ~ show.id, show.version %} ... {% endcache %}
+#
+# renders the block once and reuses the HTML for as long as the version is
+# unchanged. Each key holds only its latest version, and the least recently
+# used fragments are evicted once either the entry or the character budget
+# is exceeded.
+#----------------------------------------------------------------------------#
+
+
+class FragmentCache(object):
+
+    def __init__(self, maxsize=5000, max_chars=8 * 1024 * 1024):
+        self.maxsize = maxsize
+        self.max_chars = max_chars
+        self.chars = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._data.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, version, html):
+        if len(html) > self.max_chars:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.chars -= len(old[1])
+            self._data[key] = (version, html)
+            self.chars += len(html)
+            while len(self._data) > self.maxsize or self.chars > self.max_chars:
+                _, (_, evicted) = self._data.popitem(last=False)
+                self.chars -= len(evicted)
+                self.evictions += 1
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self._data),
+            'chars': self.chars,
+        }
+
+
+class FragmentCacheExtension(Extension):
+    tags = {'cache'}
+
+    def __init__(self, environment):
+        super(FragmentCacheExtension, self).__init__(environment)
+        environment.extend(fragment_cache=None)
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        parser.stream.expect('comma')
+        args.append(parser.parse_expression())
+        body = parser.parse_statements(['name:endcache'], drop_needle=True)
+        return nodes.CallBlock(self.call_method('_render', args), [], [], body).set_lineno(lineno)
+
+    def _render(self, key, version, caller):
+        cache = self.environment.fragment_cache
+        if cache is None:
+            return caller()
+        html = cache.get(key, version)
+        if html is None:
+            html = caller()
+            cache.set(key, version, html)
+        return html
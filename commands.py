@@ -0,0 +1,196 @@
+import json
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+#----------------------------------------------------------------------------#
+# `flask fyyur ...` maintenance commands.
+#----------------------------------------------------------------------------#
+
+cli = AppGroup('fyyur', help='Fyyur maintenance commands.')
+
+
+@cli.command('import')
+@click.argument('kind', type=click.Choice(['venues', 'artists', 'shows']))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), help='Defaults to the file extension.')
+@click.option('--batch-size', default=1000, show_default=True, help='Rows validated and loaded per transaction.')
+@click.option('--method', type=click.Choice(['copy', 'executemany']), default='copy', show_default=True)
+@click.option('--name', help='Checkpoint name. Defaults to the kind and the absolute path.')
+@click.option('--restart', is_flag=True, help='Ignore the saved checkpoint and start from the first row.')
+@click.option('--errors', 'errors_file', type=click.File('w'), help='Write rejected rows to this file as JSON lines.')
+def import_command(kind, path, fmt, batch_size, method, name, restart, errors_file):
+    """Load venues, artists or shows from a CSV or JSON-lines file.
+
+    Rerunning an interrupted import resumes after the last committed batch.
+    """
+    from cache import detail_cache
+    from directory import refresh_directory
+    from geo import geocode_venues
+    from importer import run_import
+
+    def on_error(number, errors):
+        if errors_file is not None:
+            errors_file.write(json.dumps({'row': number, 'errors': errors}) + '\n')
+        else:
+            click.echo('row %d: %s' % (number, '; '.join(
+                '%s: %s' % (field, ' '.join(messages)) for field, messages in errors.items())), err=True)
+
+    checkpoint = run_import(kind, path, fmt=fmt, batch_size=batch_size, method=method, name=name,
+                            restart=restart, on_error=on_error)
+    detail_cache.clear()
+    if kind == 'venues':
+        geocode_venues()
+    if kind != 'artists' and current_app.config['VENUE_DIRECTORY_VIEW']:
+        refresh_directory(wait=True)
+    click.echo('%s: %d rows read, %d imported, %d rejected.' % (
+        checkpoint.name, checkpoint.position, checkpoint.imported, checkpoint.rejected))
+
+
+@cli.command('export')
+@click.argument('kind', type=click.Choice(['venues', 'artists', 'shows']))
+@click.option('--format', 'fmt', type=click.Choice(['jsonl', 'csv', 'parquet']), default='jsonl', show_default=True)
+@click.option('--output', '-o', default='-', help='File to write. Defaults to stdout (not for Parquet).')
+@click.option('--batch-size', default=2000, show_default=True, help='Rows fetched per round trip.')
+def export_command(kind, fmt, output, batch_size):
+    """Write every venue, artist or show as JSON lines, CSV or Parquet."""
+    from exporter import write_export
+
+    if fmt == 'parquet':
+        if output == '-':
+            raise click.UsageError('Parquet needs --output.')
+        write_export(kind, fmt, output, batch_size)
+        return
+    with click.open_file(output, 'wb') as f:
+        write_export(kind, fmt, f, batch_size)
+
+
+@cli.command('rollover')
+def rollover_command():
+    """Move shows that have started to the venues' and artists' past counts.
+
+    `flask fyyur worker` runs it every JOB_SCHEDULE['rollover'] seconds;
+    without a worker, run it from cron. Listings correct for shows started
+    since the last run, at a small cost per affected row.
+    """
+    from counters import rollover
+    from directory import refresh_directory
+
+    changed = rollover()
+    if current_app.config['VENUE_DIRECTORY_VIEW']:
+        # Brings the view's next show times forward too, so fewer rows
+        # need correcting when /venues is read.
+        refresh_directory(wait=True)
+    click.echo('%d venues and %d artists updated.' % (changed['venues'], changed['artists']))
+
+
+@cli.command('refresh-directory')
+@click.option('--blocking', is_flag=True, help='Rebuild without CONCURRENTLY, locking out readers meanwhile.')
+def refresh_directory_command(blocking):
+    """Refresh the VenueDirectory view behind /venues."""
+    from directory import refresh_directory
+
+    refresh_directory(concurrently=not blocking, wait=True)
+    click.echo('VenueDirectory refreshed.')
+
+
+@cli.command('check-counters')
+@click.option('--fix', is_flag=True, help='Overwrite the counters that are wrong.')
+def check_counters_command(fix):
+    """Compare the venue and artist show counters with the Show table.
+
+    Exits with status 1 when a counter is wrong and --fix isn't given.
+    """
+    from counters import check_counters
+
+    mismatches = check_counters(fix=fix)
+    for kind, rows in mismatches.items():
+        for entity_id, stored, expected in rows:
+            click.echo('%s %d: upcoming/past/next show %s, expected %s' % (
+                kind[:-1], entity_id, format_counters(stored), format_counters(expected)))
+    total = sum(len(rows) for rows in mismatches.values())
+    if fix:
+        click.echo('%d counters fixed.' % total)
+    elif total:
+        raise click.exceptions.Exit(1)
+    else:
+        click.echo('All counters match.')
+
+
+@cli.command('legacy-overlaps')
+@click.option('--limit', default=50, show_default=True, help='Shows to list.')
+@click.option('--recheck', is_flag=True, help='Put the shows that no longer overlap back under the constraints.')
+def legacy_overlaps_command(limit, recheck):
+    """List the shows that overlapped others when double bookings were
+    first refused, and are still exempt.
+    """
+    from scheduling import legacy_overlaps, recheck_legacy
+
+    if recheck:
+        cleared, remaining = recheck_legacy()
+        click.echo('%d shows cleared, %d still overlap.' % (cleared, remaining))
+    for show, conflicts in legacy_overlaps(limit):
+        click.echo('show %d (venue %d, artist %d) %s - %s clashes with %s' % (
+            show.id, show.venue_id, show.artist_id, show.start_time.isoformat(), show.end_time.isoformat(),
+            ', '.join('show %d (%s)' % (conflict['show_id'], conflict['clash']) for conflict in conflicts) or 'nothing'))
+
+
+@cli.command('geocode')
+@click.option('--all', 'overwrite', is_flag=True, help='Geocode every venue, not only those without coordinates.')
+@click.option('--batch-size', default=1000, show_default=True, help='Venues updated per transaction.')
+def geocode_command(overwrite, batch_size):
+    """Fill in venue coordinates from the bundled gazetteer.
+
+    Lists the cities it has no position for.
+    """
+    from geo import geocode_venues
+
+    geocoded, missing = geocode_venues(overwrite=overwrite, batch_size=batch_size)
+    for (city, state), count in sorted(missing.items(), key=lambda item: (-item[1], item[0])):
+        click.echo('not in the gazetteer: %s, %s (%d venues)' % (city, state, count), err=True)
+    click.echo('%d venues geocoded, %d left without coordinates.' % (geocoded, sum(missing.values())))
+
+
+@cli.command('worker')
+@click.option('--burst', is_flag=True, help='Exit once no job is due instead of waiting for more.')
+@click.option('--poll-interval', type=float, help='Seconds between polls of an empty queue. '
+                                                  'Defaults to JOB_POLL_INTERVAL.')
+def worker_command(burst, poll_interval):
+    """Run background jobs until stopped.
+
+    Start as many as needed; they share the queue. SIGTERM or Ctrl-C lets
+    the job in hand finish first.
+    """
+    import signal
+    import threading
+    from jobs import work
+
+    stop = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda signum, frame: stop.set())
+    done = work(burst=burst, poll_interval=poll_interval, stop=stop)
+    click.echo('%d jobs run.' % done)
+
+
+@cli.command('jobs')
+@click.option('--retry-failed', is_flag=True, help='Queue the failed jobs again.')
+@click.option('--purge', is_flag=True, help='Delete the jobs finished more than JOB_RETENTION_DAYS ago.')
+def jobs_command(retry_failed, purge):
+    """Show the background job queue: jobs per kind and status."""
+    import jobs
+
+    if retry_failed:
+        click.echo('%d failed jobs queued again.' % jobs.retry_failed())
+    if purge:
+        click.echo('%d finished jobs deleted.' % jobs.purge_finished())
+    click.echo('%-20s %-8s %8s %8s %12s' % ('kind', 'status', 'jobs', 'due', 'oldest due'))
+    for row in jobs.queue_depth():
+        click.echo('%-20s %-8s %8d %8d %12s' % (
+            row['kind'], row['status'], row['jobs'], row['due'],
+            '%.1f s' % row['oldest_due_seconds'] if row['oldest_due_seconds'] is not None else '-'))
+
+
+def format_counters(counters):
+    upcoming, past, next_show_time = counters
+    return '%d/%d/%s' % (upcoming, past, next_show_time.isoformat() if next_show_time else '-')
@@ -5,9 +5,113 @@ basedir = os.path.abspath(os.path.dirname(__file__))
 
 # Enable debug mode.
 DEBUG = True
+# With debug off, the app logs to this file; None logs nowhere of its own.
+LOG_FILE = 'error.log'
+
+
+def env_flag(name, default):
+    return os.environ.get(name, '1' if default else '0').lower() in ('1', 'true', 'yes', 'on')
+
 
 # Connect to the database
+SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'postgresql://ragu@localhost:5432/fyyurapp')
+SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+# Connection pool, per worker process. Each gunicorn worker may open up to
+# DB_POOL_SIZE + DB_MAX_OVERFLOW connections; keep workers * that total
+# below the server's max_connections (or PgBouncer's pool size).
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+# Seconds to wait for a free connection before giving up.
+DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 30))
+# Replace connections older than this many seconds (-1 never).
+DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+# Test connections on checkout so a failover doesn't surface stale ones.
+DB_POOL_PRE_PING = env_flag('DB_POOL_PRE_PING', True)
+# Server-side statement timeout in milliseconds (0 disables).
+DB_STATEMENT_TIMEOUT = int(os.environ.get('DB_STATEMENT_TIMEOUT', 0))
+# Connecting through PgBouncer in transaction pooling mode.
+DB_PGBOUNCER = env_flag('DB_PGBOUNCER', False)
+
+# The asyncio engine of the ASGI app (asgi.py); by default DATABASE_URL
+# with the asyncpg driver. It has its own pool of the size above.
+ASYNC_DATABASE_URI = os.environ.get('ASYNC_DATABASE_URL')
+
+# Per-request SQL profiling (see profiling.py): the fraction of requests
+# that get a Server-Timing header and a log line, how many of their slowest
+# statements to report, and whether to append a panel to HTML pages.
+# Statements slower than SQL_SLOW_QUERY_MS are always logged.
+SQL_PROFILE_ENABLED = env_flag('SQL_PROFILE', True)
+SQL_PROFILE_SAMPLE_RATE = float(os.environ.get('SQL_PROFILE_SAMPLE_RATE', 1.0))
+SQL_PROFILE_TOP = 5
+SQL_PROFILE_PANEL = env_flag('SQL_PROFILE_PANEL', False)
+SQL_SLOW_QUERY_MS = float(os.environ.get('SQL_SLOW_QUERY_MS', 100))
+
+# Prometheus metrics at /metrics (see metrics.py); needs prometheus_client.
+# Under gunicorn also set PROMETHEUS_MULTIPROC_DIR so that all the workers'
+# values are added up.
+METRICS_ENABLED = env_flag('METRICS', True)
+
+# Maximum number of rows returned by one venue/artist search request.
+SEARCH_RESULTS_LIMIT = 50
+
+# Rank searches with the full-text/trigram indexes when pg_trgm is installed.
+FULL_TEXT_SEARCH = True
+
+# Shows listed per /shows page, and rows fetched per batch when streaming.
+SHOWS_PAGE_SIZE = 30
+SHOWS_STREAM_BATCH_SIZE = 500
+
+# Rows fetched per round trip when streaming /api/v1/export/<kind>.<fmt>.
+EXPORT_BATCH_SIZE = 2000
+
+# Upcoming and past shows listed per page on venue and artist pages.
+DETAIL_SHOWS_PAGE_SIZE = 10
+
+# The hours a venue can be booked each day, for /api/v1/availability; past
+# 24 runs into the next day (26 is 2am). Venues returned per request, and
+# the longest date window a request may cover.
+BOOKING_HOURS = (18, 26)
+AVAILABILITY_RESULTS_LIMIT = 50
+AVAILABILITY_MAX_DAYS = 31
+
+# Venues returned per /api/v1/venues/nearby request.
+NEARBY_RESULTS_LIMIT = 50
+
+# Serve /venues from the VenueDirectory materialized view (see
+# directory.py), refreshed this many seconds after a venue or show write so
+# that a burst of writes costs one refresh.
+VENUE_DIRECTORY_VIEW = env_flag('VENUE_DIRECTORY_VIEW', True)
+DIRECTORY_REFRESH_DELAY = float(os.environ.get('DIRECTORY_REFRESH_DELAY', 2.0))
+
+# Background jobs (see jobs.py), run by `flask fyyur worker`. Only turn
+# JOB_QUEUE on with a worker running: the web workers then queue venue
+# directory refreshes for it, and it runs the scheduled jobs. Off, they
+# refresh the directory on a timer thread of their own, and rollover runs
+# from cron.
+JOB_QUEUE = env_flag('JOB_QUEUE', False)
+# Seconds a worker sleeps when no job is due; seconds before a claimed job
+# that hasn't finished may be claimed again.
+JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL', 1.0))
+JOB_TIMEOUT = 300
+# Attempts per job, and the backoff before each retry: doubling from the
+# first delay up to the last (seconds).
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_DELAY = 10.0
+JOB_RETRY_MAX_DELAY = 3600.0
+# Jobs run every so many seconds, and days finished jobs are kept.
+JOB_SCHEDULE = {'rollover': 300, 'purge_jobs': 3600}
+JOB_RETENTION_DAYS = 7
 
+# Cache for assembled venue/artist page data: 'memory' keeps an LRU per
+# worker process, 'redis' shares one cache between all workers.
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'memory')
+CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+CACHE_MAXSIZE = 1024
+CACHE_TTL = 60
 
-# TODO IMPLEMENT DATABASE URL
-SQLALCHEMY_DATABASE_URI = 'postgresql://ragu@localhost:5432/fyyurapp'
+# Rendered-fragment cache for the /venues area blocks and /shows tiles,
+# bounded by entry count and total characters (least recently used first).
+FRAGMENT_CACHE_ENABLED = True
+FRAGMENT_CACHE_MAXSIZE = 5000
+FRAGMENT_CACHE_MAX_CHARS = 8 * 1024 * 1024
@@ -0,0 +1,77 @@
+from datetime import datetime
+
+from sqlalchemy import or_, update
+
+from models import db, Venue, Artist, Show, ShowRollover
+
+#----------------------------------------------------------------------------#
+# Upcoming/past show counters.
+#
+# Venue and Artist carry upcoming_shows_count, past_shows_count and
+# next_show_time, split at ShowRollover.rolled_at and kept up to date by
+# statement triggers on Show in the same transaction as the change (see
+# migration ac2faf284252). rollover() moves the split to the present;
+# queries.upcoming_shows_count() corrects for the shows that started since,
+# so listings are exact however long ago the last rollover ran.
+#----------------------------------------------------------------------------#
+
+ENTITIES = {'venues': (Venue, Show.venue_id), 'artists': (Artist, Show.artist_id)}
+
+
+def rollover(now=None):
+    # Returns the number of venues and artists whose counts changed.
+    now = now or datetime.today()
+    # Waits for transactions that are changing shows, and holds new ones
+    # back until the commit.
+    clock = db.session.query(ShowRollover).filter(ShowRollover.id == 1).with_for_update().one()
+    changed = dict.fromkeys(ENTITIES, 0)
+    if now > clock.rolled_at:
+        for kind, (model, foreign_key) in ENTITIES.items():
+            started = db.session.query(foreign_key.label('id'), db.func.count(Show.id).label('shows')).filter(
+                Show.start_time > clock.rolled_at, Show.start_time <= now).group_by(foreign_key).subquery()
+            next_show = db.session.query(db.func.min(Show.start_time)).filter(
+                foreign_key == model.id, Show.start_time > now).correlate(model).scalar_subquery()
+            result = db.session.execute(update(model).where(model.id == started.c.id).values(
+                upcoming_shows_count=model.upcoming_shows_count - started.c.shows,
+                past_shows_count=model.past_shows_count + started.c.shows,
+                next_show_time=next_show,
+            ).execution_options(synchronize_session=False))
+            changed[kind] = result.rowcount
+        clock.rolled_at = now
+    db.session.commit()
+    return changed
+
+
+def counter_mismatches(model, foreign_key, rolled_at):
+    # (id, stored, expected) for every row whose counters don't match Show,
+    # with (upcoming, past, next show time) as the values.
+    upcoming = db.func.count(Show.id).filter(Show.start_time > rolled_at)
+    past = db.func.count(Show.id).filter(Show.start_time <= rolled_at)
+    next_show = db.func.min(Show.start_time).filter(Show.start_time > rolled_at)
+    rows = db.session.query(
+        model.id, model.upcoming_shows_count, model.past_shows_count, model.next_show_time, upcoming, past, next_show
+    ).outerjoin(Show, foreign_key == model.id).group_by(model.id).having(or_(
+        model.upcoming_shows_count != upcoming,
+        model.past_shows_count != past,
+        model.next_show_time.is_distinct_from(next_show),
+    )).order_by(model.id)
+    return [(row[0], tuple(row[1:4]), tuple(row[4:])) for row in rows]
+
+
+def check_counters(fix=False):
+    # Returns {kind: [(id, stored, expected), ...]}; with fix the stored
+    # values are overwritten with the expected ones.
+    # The lock keeps shows from changing while they are counted.
+    rolled_at = db.session.query(ShowRollover.rolled_at).filter(ShowRollover.id == 1).with_for_update().scalar()
+    mismatches = {}
+    for kind, (model, foreign_key) in ENTITIES.items():
+        mismatches[kind] = counter_mismatches(model, foreign_key, rolled_at)
+        if fix and mismatches[kind]:
+            db.session.execute(update(model), [{
+                'id': entity_id,
+                'upcoming_shows_count': expected[0],
+                'past_shows_count': expected[1],
+                'next_show_time': expected[2],
+            } for entity_id, stored, expected in mismatches[kind]])
+    db.session.commit()
+    return mismatches
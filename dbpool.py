@@ -0,0 +1,168 @@
+import os
+import threading
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+#----------------------------------------------------------------------------#
+# SQLAlchemy engine pool settings and per-worker pool metrics.
+#----------------------------------------------------------------------------#
+
+
+class PoolMetrics(object):
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        # Callables taking (seconds, timed_out), called for every checkout.
+        self.wait_observers = []
+
+    def count(self, counter):
+        # The pool events fire on every thread that uses the pool.
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def record_wait(self, seconds, timed_out=False):
+        with self._lock:
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+            if timed_out:
+                self.timeouts += 1
+        for observer in self.wait_observers:
+            observer(seconds, timed_out)
+
+    def snapshot(self, pool):
+        with self._lock:
+            return {
+                'pid': os.getpid(),
+                'size': pool.size(),
+                'checked_out': pool.checkedout(),
+                'checked_in': pool.checkedin(),
+                'overflow': pool.overflow(),
+                'connects': self.connects,
+                'checkouts': self.checkouts,
+                'checkins': self.checkins,
+                'invalidations': self.invalidations,
+                'timeouts': self.timeouts,
+                'wait_seconds_total': self.wait_seconds_total,
+                'wait_seconds_max': self.wait_seconds_max,
+            }
+
+
+metrics = PoolMetrics()
+
+
+class MeteredPool(object):
+    # Records how long each checkout took, including time spent waiting for
+    # a free connection and the pre-ping.
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super(MeteredPool, self).connect()
+        except exc.TimeoutError:
+            metrics.record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        metrics.record_wait(time.perf_counter() - start)
+        return connection
+
+
+class MeteredQueuePool(MeteredPool, QueuePool):
+    pass
+
+
+class MeteredAsyncQueuePool(MeteredPool, AsyncAdaptedQueuePool):
+    pass
+
+
+def engine_options(config, poolclass=MeteredQueuePool):
+    options = {
+        'poolclass': poolclass,
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': config['DB_POOL_PRE_PING'],
+    }
+    connect_args = {}
+    if config['DB_PGBOUNCER']:
+        # PgBouncer in transaction mode hands each transaction to whichever
+        # server connection is free, so nothing may rely on session state:
+        # no server-side prepared statements and no startup parameters.
+        # psycopg2 never prepares; psycopg 3 must be told not to.
+        if make_url(config['SQLALCHEMY_DATABASE_URI']).drivername.endswith('+psycopg'):
+            connect_args['prepare_threshold'] = None
+    elif config['DB_STATEMENT_TIMEOUT']:
+        connect_args['options'] = '-c statement_timeout=%d' % config['DB_STATEMENT_TIMEOUT']
+    if connect_args:
+        options['connect_args'] = connect_args
+    return options
+
+
+def async_database_url(config):
+    # ASYNC_DATABASE_URL, or DATABASE_URL with the asyncpg driver.
+    if config['ASYNC_DATABASE_URI']:
+        url = make_url(config['ASYNC_DATABASE_URI'])
+    else:
+        url = make_url(config['SQLALCHEMY_DATABASE_URI']).set(drivername='postgresql+asyncpg')
+    if config['DB_PGBOUNCER'] and url.drivername.endswith('+asyncpg'):
+        # SQLAlchemy's own cache of asyncpg prepared statements.
+        url = url.update_query_dict({'prepared_statement_cache_size': '0'})
+    return url
+
+
+def async_engine_options(config):
+    # The same pool for create_async_engine. asyncpg takes the connection
+    # settings its own way: startup parameters in server_settings, and its
+    # statement cache off behind PgBouncer.
+    options = engine_options(config, poolclass=MeteredAsyncQueuePool)
+    if not (config['DB_PGBOUNCER'] and config['DB_STATEMENT_TIMEOUT']):
+        # Only the read pages run on it. Under READ COMMITTED each
+        # statement takes its own snapshot either way; without a
+        # transaction there is no BEGIN or ROLLBACK round trip, which
+        # asyncpg sends separately. (Behind PgBouncer the timeout is set
+        # per transaction, so it keeps them.)
+        options['isolation_level'] = 'AUTOCOMMIT'
+    if not async_database_url(config).drivername.endswith('+asyncpg'):
+        return options
+    options.pop('connect_args', None)
+    if config['DB_PGBOUNCER']:
+        options['connect_args'] = {'statement_cache_size': 0}
+    elif config['DB_STATEMENT_TIMEOUT']:
+        options['connect_args'] = {'server_settings': {'statement_timeout': str(config['DB_STATEMENT_TIMEOUT'])}}
+    return options
+
+
+def install(engine, config):
+    pool = engine.pool
+
+    @event.listens_for(pool, 'connect')
+    def on_connect(dbapi_connection, connection_record):
+        metrics.count('connects')
+
+    @event.listens_for(pool, 'checkout')
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        metrics.count('checkouts')
+
+    @event.listens_for(pool, 'checkin')
+    def on_checkin(dbapi_connection, connection_record):
+        metrics.count('checkins')
+
+    @event.listens_for(pool, 'invalidate')
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        metrics.count('invalidations')
+
+    if config['DB_PGBOUNCER'] and config['DB_STATEMENT_TIMEOUT']:
+        # Behind PgBouncer the timeout is set per transaction instead of
+        # once per connection.
+        @event.listens_for(engine, 'begin')
+        def on_begin(connection):
+            connection.exec_driver_sql('SET LOCAL statement_timeout = %d' % config['DB_STATEMENT_TIMEOUT'])
@@ -0,0 +1,96 @@
+import threading
+
+from flask import current_app
+from sqlalchemy import text
+
+from models import db
+
+#----------------------------------------------------------------------------#
+# The /venues directory, kept in the VenueDirectory materialized view
+# (migration 9c13e9c99f5f): each venue's city, state, name, updated_at and
+# show counters, with the rollover time the counters were split at.
+#
+# Writes that change it ask for a refresh after they commit. Each web
+# worker runs it on a timer thread DIRECTORY_REFRESH_DELAY seconds later,
+# folding its own writes into one REFRESH ... CONCURRENTLY, which lets
+# readers keep using the old contents meanwhile. With JOB_QUEUE on, the
+# refresh is queued as a job (see jobs.py) instead, under one key, so a
+# burst of writes from all the web workers is folded into one. Either way an
+# advisory lock stops two refreshes from running at the same time; a timer
+# that finds it taken tries again after the delay.
+#----------------------------------------------------------------------------#
+
+# pg_advisory_xact_lock key, shared by every worker.
+REFRESH_LOCK = 0x66797572
+
+
+def refresh_directory(concurrently=True, wait=False):
+    # Returns False when another refresh holds the lock and wait is off.
+    with db.engine.begin() as conn:
+        if wait:
+            conn.execute(text('SELECT pg_advisory_xact_lock(:key)'), {'key': REFRESH_LOCK})
+        elif not conn.execute(text('SELECT pg_try_advisory_xact_lock(:key)'), {'key': REFRESH_LOCK}).scalar():
+            return False
+        conn.execute(text('REFRESH MATERIALIZED VIEW %s"VenueDirectory"' % ('CONCURRENTLY ' if concurrently else '')))
+    return True
+
+
+class DirectoryRefresher(object):
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._timer = None
+        self.refreshes = 0
+        self.requests = 0
+
+    def init_app(self, app):
+        self.enabled = app.config['VENUE_DIRECTORY_VIEW']
+        self.queue = app.config['JOB_QUEUE']
+        self.delay = app.config['DIRECTORY_REFRESH_DELAY']
+        self.logger = app.logger.getChild('directory')
+        app.extensions['directory_refresher'] = self
+
+    def request_refresh(self, app=None):
+        if not self.enabled:
+            return
+        if self.queue:
+            self.enqueue_refresh()
+            return
+        app = app or current_app._get_current_object()
+        with self._lock:
+            self.requests += 1
+            if self._timer is None:
+                self._timer = threading.Timer(self.delay, self.run, (app,))
+                self._timer.daemon = True
+                self._timer.start()
+
+    def enqueue_refresh(self):
+        # The write has committed; losing the refresh only leaves /venues
+        # stale until the next one, so a failure is logged, not raised.
+        from jobs import enqueue
+        self.requests += 1
+        try:
+            enqueue('refresh_directory', key='directory', delay=self.delay)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            self.logger.exception('queueing a VenueDirectory refresh failed')
+
+    def run(self, app):
+        # A write committed from here on needs another refresh, so the
+        # timer is cleared before this one starts.
+        with self._lock:
+            self._timer = None
+        with app.app_context():
+            try:
+                refreshed = refresh_directory()
+            except Exception:
+                self.logger.exception('refreshing VenueDirectory failed')
+                return
+        if refreshed:
+            self.refreshes += 1
+        else:
+            self.request_refresh(app)
+
+
+directory_refresher = DirectoryRefresher()
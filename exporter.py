@@ -0,0 +1,109 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+from models import db, Venue, Artist, Show
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+#----------------------------------------------------------------------------#
+# Bulk export.
+#
+# Rows are read through a server-side cursor (yield_per) and written out one
+# batch at a time, so memory use depends on the batch size and not on the
+# size of the table. JSON lines and CSV are produced as a stream of chunks
+# that the HTTP endpoint and the `flask fyyur export` command both consume;
+# Parquet needs pyarrow and is only written to files.
+#----------------------------------------------------------------------------#
+
+EXPORTS = {
+    'venues': (Venue, ['id', 'name', 'city', 'state', 'address', 'phone', 'genres', 'image_link', 'facebook_link',
+                       'website', 'seeking_talent', 'seeking_description', 'latitude', 'longitude', 'updated_at']),
+    'artists': (Artist, ['id', 'name', 'city', 'state', 'phone', 'genres', 'image_link', 'facebook_link', 'website',
+                         'seeking_venue', 'seeking_description', 'updated_at']),
+    'shows': (Show, ['id', 'artist_id', 'venue_id', 'start_time', 'end_time', 'updated_at']),
+}
+
+FORMATS = ('jsonl', 'csv', 'parquet')
+
+
+def batches(kind, batch_size=2000):
+    # Lists of row tuples in id order, fetched `batch_size` at a time.
+    model, columns = EXPORTS[kind]
+    query = db.select(*[getattr(model, column) for column in columns]).order_by(model.id)
+    return db.session.execute(query.execution_options(yield_per=batch_size)).partitions()
+
+
+def jsonl_chunks(kind, batch_size=2000):
+    columns = EXPORTS[kind][1]
+    for rows in batches(kind, batch_size):
+        if orjson is not None:
+            yield b''.join(orjson.dumps(dict(zip(columns, row))) + b'\n' for row in rows)
+        else:
+            yield ''.join(json.dumps(dict(zip(columns, row)), separators=(',', ':'), default=datetime.isoformat) + '\n'
+                          for row in rows).encode()
+
+
+def csv_value(value):
+    if isinstance(value, list):
+        return ','.join(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def csv_chunks(kind, batch_size=2000):
+    columns = EXPORTS[kind][1]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in batches(kind, batch_size):
+        writer.writerows([csv_value(value) for value in row] for row in rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        # Header of an empty table.
+        yield buffer.getvalue().encode()
+
+
+CHUNKS = {'jsonl': jsonl_chunks, 'csv': csv_chunks}
+
+
+def write_parquet(kind, path, batch_size=2000):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    model, columns = EXPORTS[kind]
+    schema = pa.schema([(column, arrow_type(getattr(model, column).type, pa)) for column in columns])
+    with pq.ParquetWriter(path, schema) as writer:
+        for rows in batches(kind, batch_size):
+            writer.write_table(pa.Table.from_arrays([pa.array(values, type=field.type)
+                                                     for values, field in zip(zip(*rows), schema)], schema=schema))
+
+
+def arrow_type(column_type, pa):
+    if isinstance(column_type, db.ARRAY):
+        return pa.list_(pa.string())
+    if isinstance(column_type, db.Integer):
+        return pa.int64()
+    if isinstance(column_type, db.Float):
+        return pa.float64()
+    if isinstance(column_type, db.Boolean):
+        return pa.bool_()
+    if isinstance(column_type, db.DateTime):
+        return pa.timestamp('us')
+    return pa.string()
+
+
+def write_export(kind, fmt, output, batch_size=2000):
+    # `output` is a binary file object, or a path for Parquet.
+    if fmt == 'parquet':
+        write_parquet(kind, output, batch_size)
+        return
+    for chunk in CHUNKS[fmt](kind, batch_size):
+        output.write(chunk)
@@ -6,13 +6,19 @@ from fabric.contrib.console import confirm
 
 def test():
     with settings(warn_only=True):
-        result = local(
-            "python test_tasks.py -v && python test_users.py -v", capture=True
-        )
+        # Needs TEST_DATABASE_URL; see Tests in the README.
+        result = local("python -m pytest", capture=True)
     if result.failed and not confirm("Tests failed. Continue?"):
         abort("Aborted at user request.")
 
 
+def bench(baseline=None):
+    # Seed a scratch database first: python -m benchmarks.seed --reset
+    local("python -m benchmarks.routes -o bench.json")
+    if baseline:
+        local("python -m benchmarks.compare {} bench.json".format(baseline))
+
+
 def commit():
     message = raw_input("Enter a git commit message: ")
     local("git add . && git commit -am '{}'".format(message))
@@ -39,9 +45,7 @@ def heroku():
 
 
 def heroku_test():
-    local(
-        "heroku run python test_tasks.py -v && heroku run python test_users.py -v"
-    )
+    local("heroku run python -m pytest")
 
 
 def deploy():
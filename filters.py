@@ -0,0 +1,31 @@
+from datetime import datetime
+from functools import lru_cache
+
+#----------------------------------------------------------------------------#
+# Filters.
+#
+# babel and dateutil are imported on first use rather than at startup; CLI
+# commands and migrations never format a date.
+#----------------------------------------------------------------------------#
+
+
+@lru_cache(maxsize=None)
+def datetime_pattern(format, locale=None):
+    # Compiling a babel pattern and resolving its locale is most of the cost
+    # of formatting a date, so do it once per (format, locale).
+    import babel
+    import babel.dates
+    return babel.dates.parse_pattern(format), babel.Locale.parse(locale or babel.dates.LC_TIME)
+
+
+def format_datetime(value, format='medium', locale=None):
+    # Views pass datetime objects; strings are still accepted and parsed.
+    if not isinstance(value, datetime):
+        import dateutil.parser
+        value = dateutil.parser.parse(value)
+    if format == 'full':
+        format = "EEEE MMMM, d, y 'at' h:mma"
+    elif format == 'medium':
+        format = "EE MM, dd, y h:mma"
+    pattern, locale = datetime_pattern(format, locale)
+    return pattern.apply(value, locale)
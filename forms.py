@@ -1,9 +1,13 @@
 from datetime import datetime
 from flask_wtf import FlaskForm
 from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField, BooleanField, ValidationError
-from wtforms.validators import DataRequired, AnyOf, URL, Length
+from wtforms.validators import DataRequired, AnyOf, URL, Length, Optional
 import re
 
+# Show times: the first is how the form displays them; the form's
+# placeholder (no seconds), ISO 8601 and a bare date are accepted too.
+show_time_formats = ['%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%dT%H:%M', '%Y-%m-%d']
+
 state_choices = [
     ('AL', 'AL'),
     ('AK', 'AK'),
@@ -83,11 +87,11 @@ genres_choices = [
 
 class VenueForm(FlaskForm):
 
-    def validate_phone(self, form, field):
+    def validate_phone(self, field):
         if not re.search(r"^[0-9]{3}[0-9]{3}[0-9]{4}$", field.data):
             raise ValidationError("Invalid phone number.")
 
-    def validate_genres(self, form, field):
+    def validate_genres(self, field):
         genres_values = [choice[1] for choice in genres_choices]
         for value in field.data:
             if value not in genres_values:
@@ -131,11 +135,11 @@ class VenueForm(FlaskForm):
 
 class ArtistForm(FlaskForm):
 
-    def validate_phone(self, form, field):
+    def validate_phone(self, field):
         if not re.search(r"^[0-9]{3}[0-9]{3}[0-9]{4}$", field.data):
             raise ValidationError("Invalid phone number.")
     
-    def validate_genres(self, form, field):
+    def validate_genres(self, field):
         genres_values = [choice[1] for choice in genres_choices]
         for value in field.data:
             if value not in genres_values:
@@ -185,6 +189,17 @@ class ShowForm(FlaskForm):
     start_time = DateTimeField(
         'start_time',
         validators=[DataRequired()],
+        format=show_time_formats,
         default=datetime.today()
     )
+    # Two hours after the start when left empty.
+    end_time = DateTimeField(
+        'end_time',
+        validators=[Optional()],
+        format=show_time_formats
+    )
+
+    def validate_end_time(self, field):
+        if field.data is not None and self.start_time.data is not None and field.data <= self.start_time.data:
+            raise ValidationError('The end time must be after the start time.')
 
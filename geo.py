@@ -0,0 +1,190 @@
+import csv
+import math
+import os
+import re
+from functools import lru_cache
+
+from flask import current_app
+from sqlalchemy import update
+
+from models import db, Venue
+
+#----------------------------------------------------------------------------#
+# Venue locations.
+#
+# Venues carry a latitude and longitude, looked up by city and state in the
+# gazetteer bundled in data/gazetteer.csv, so geocoding needs no network
+# service. Its positions are city centres: venues geocoded from it share
+# their city's point until a precise one is given.
+#
+# Searches use the GiST index on Venue.location (migration d63eb3951be2),
+# the same coordinates as a core PostgreSQL point. Around the point searched
+# from, a box of latitudes and longitudes that holds every position within
+# the radius is looked up in the index; the great-circle distance of the
+# venues in it is then measured, and the ones beyond the radius dropped.
+# The index can also list venues nearest first, but by distance in degrees,
+# which isn't distance on the ground; a nearest venues search uses that
+# order only to choose its radius.
+#----------------------------------------------------------------------------#
+
+GAZETTEER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'gazetteer.csv')
+
+# Mean radius of the Earth, and the distance to the far side of it.
+EARTH_RADIUS_KM = 6371.0088
+MAX_DISTANCE_KM = math.pi * EARTH_RADIUS_KM
+
+
+
+#  Gazetteer
+#  ----------------------------------------------------------------
+
+def place_key(city, state):
+    # "St. Louis", "st louis" and "Saint Louis" are the same place.
+    city = re.sub(r'\s+', ' ', city.replace('.', ' ')).strip().casefold()
+    city = re.sub(r'^saint ', 'st ', city)
+    return city, state.strip().upper()
+
+
+@lru_cache(maxsize=None)
+def gazetteer(path=GAZETTEER):
+    # {place_key: (latitude, longitude)}
+    with open(path, newline='', encoding='utf-8') as f:
+        return {place_key(row['city'], row['state']): (float(row['latitude']), float(row['longitude']))
+                for row in csv.DictReader(f)}
+
+
+def locate(city, state):
+    # (latitude, longitude) of a city, or None when the gazetteer lacks it.
+    return gazetteer().get(place_key(city, state))
+
+
+def geocode_venues(overwrite=False, batch_size=1000):
+    # Fills in the coordinates of the venues that have none (every venue
+    # with overwrite) from the gazetteer, committing each batch. Returns the
+    # number geocoded and {(city, state): venues} for the places it lacks.
+    query = db.session.query(Venue.id, Venue.city, Venue.state).order_by(Venue.id)
+    if not overwrite:
+        query = query.filter(Venue.latitude.is_(None))
+    geocoded, missing, batch = 0, {}, []
+    for venue_id, city, state in query.all():
+        position = locate(city, state)
+        if position is None:
+            missing[(city, state)] = missing.get((city, state), 0) + 1
+            continue
+        batch.append({'id': venue_id, 'latitude': position[0], 'longitude': position[1]})
+        if len(batch) == batch_size:
+            db.session.execute(update(Venue), batch)
+            db.session.commit()
+            geocoded += len(batch)
+            batch = []
+    if batch:
+        db.session.execute(update(Venue), batch)
+        geocoded += len(batch)
+    db.session.commit()
+    return geocoded, missing
+
+
+#  Searches
+#  ----------------------------------------------------------------
+
+def bounding_boxes(latitude, longitude, radius):
+    # (west, south, east, north) boxes in degrees covering every position
+    # within `radius` km. A box that would cross the antimeridian is split
+    # in two; one that reaches a pole takes in every longitude.
+    angle = radius / EARTH_RADIUS_KM
+    south, north = latitude - math.degrees(angle), latitude + math.degrees(angle)
+    if south <= -90 or north >= 90:
+        return [(-180.0, max(south, -90.0), 180.0, min(north, 90.0))]
+    spread = math.degrees(math.asin(math.sin(angle) / math.cos(math.radians(latitude))))
+    west, east = longitude - spread, longitude + spread
+    if west < -180:
+        return [(west + 360, south, 180.0, north), (-180.0, south, east, north)]
+    if east > 180:
+        return [(west, south, 180.0, north), (-180.0, south, east - 360, north)]
+    return [(west, south, east, north)]
+
+
+def distance_km(columns=Venue):
+    # Haversine distance from (:latitude, :longitude) to the latitude and
+    # longitude in `columns`.
+    latitude = db.bindparam('latitude', type_=db.Float)
+    longitude = db.bindparam('longitude', type_=db.Float)
+    half_dlat = db.func.sin(db.func.radians(columns.latitude - latitude) / 2)
+    half_dlng = db.func.sin(db.func.radians(columns.longitude - longitude) / 2)
+    chord = half_dlat * half_dlat + db.func.cos(db.func.radians(latitude)) \
+        * db.func.cos(db.func.radians(columns.latitude)) * half_dlng * half_dlng
+    return 2 * EARTH_RADIUS_KM * db.func.asin(db.func.least(1.0, db.func.sqrt(chord)))
+
+
+@lru_cache(maxsize=None)
+def nearby_query(boxes=1):
+    # The venues within :radius km of (:latitude, :longitude), nearest
+    # first, found through the location index in `boxes` boxes (:west0,
+    # :south0, :east0, :north0, ...).
+    inside = [Venue.location.op('<@')(db.func.box(
+        db.func.point(db.bindparam('west%d' % i, type_=db.Float), db.bindparam('south%d' % i, type_=db.Float)),
+        db.func.point(db.bindparam('east%d' % i, type_=db.Float), db.bindparam('north%d' % i, type_=db.Float))))
+        for i in range(boxes)]
+    distance = distance_km()
+    label = distance.label('distance')
+    return db.select(Venue.id, Venue.name, Venue.city, Venue.state, Venue.address, Venue.genres, Venue.latitude,
+                     Venue.longitude, label) \
+        .where(db.or_(*inside), distance <= db.bindparam('radius', type_=db.Float)) \
+        .order_by(label, Venue.id).limit(db.bindparam('limit'))
+
+
+@lru_cache(maxsize=None)
+def nearest_radius_query():
+    # The distance to the farthest of the :limit venues nearest to
+    # (:latitude, :longitude) in degrees, read in that order from the
+    # location index. There are :limit venues within it, so it holds the
+    # :limit nearest on the ground too.
+    origin = db.func.point(db.bindparam('longitude', type_=db.Float), db.bindparam('latitude', type_=db.Float))
+    near = db.select(Venue.latitude, Venue.longitude).where(Venue.location.isnot(None)) \
+        .order_by(Venue.location.op('<->')(origin)).limit(db.bindparam('limit')).subquery()
+    return db.select(db.func.max(distance_km(near.c)))
+
+
+def nearby_rows(latitude, longitude, radius, limit):
+    boxes = bounding_boxes(latitude, longitude, radius)
+    params = {'latitude': latitude, 'longitude': longitude, 'radius': radius, 'limit': limit}
+    for i, (west, south, east, north) in enumerate(boxes):
+        params.update({'west%d' % i: west, 'south%d' % i: south, 'east%d' % i: east, 'north%d' % i: north})
+    return db.session.execute(nearby_query(len(boxes)), params).all()
+
+
+def venue_data(rows):
+    return [{
+        'venue_id': row.id,
+        'venue_name': row.name,
+        'city': row.city,
+        'state': row.state,
+        'address': row.address,
+        'genres': row.genres,
+        'latitude': row.latitude,
+        'longitude': row.longitude,
+        'distance_km': round(row.distance, 3),
+    } for row in rows]
+
+
+def clamp_limit(limit):
+    max_limit = current_app.config['NEARBY_RESULTS_LIMIT']
+    return max(min(limit or max_limit, max_limit), 1)
+
+
+def venues_within(latitude, longitude, radius, limit=None):
+    # The venues within `radius` km, nearest first.
+    return venue_data(nearby_rows(latitude, longitude, min(radius, MAX_DISTANCE_KM), clamp_limit(limit)))
+
+
+def nearest_venues(latitude, longitude, count=None):
+    # The `count` venues nearest to a point, however far.
+    count = clamp_limit(count)
+    radius = db.session.execute(nearest_radius_query(), {
+        'latitude': latitude, 'longitude': longitude, 'limit': count}).scalar()
+    if radius is None:
+        return []
+    # A little over, so that rounding in the box can't leave out the
+    # venue the radius was measured to.
+    radius = min(radius * (1 + 1e-9) + 1e-6, MAX_DISTANCE_KM)
+    return venue_data(nearby_rows(latitude, longitude, radius, count))
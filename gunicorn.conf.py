@@ -0,0 +1,27 @@
+import glob
+import os
+
+# Read by gunicorn from the working directory:
+#
+#     PROMETHEUS_MULTIPROC_DIR=/tmp/fyyur-metrics gunicorn -w 4 'app:create_app()'
+
+wsgi_app = 'app:create_app()'
+
+
+def on_starting(server):
+    # Values left by a previous run would be added to this one's.
+    path = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if path:
+        os.makedirs(path, exist_ok=True)
+        for filename in glob.glob(os.path.join(path, '*.db')):
+            os.remove(filename)
+
+
+def child_exit(server, worker):
+    # Stop counting a dead worker's in-flight requests and pool connections.
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        try:
+            from prometheus_client import multiprocess
+        except ImportError:
+            return
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,274 @@
+import csv
+import io
+import json
+import os
+from datetime import datetime
+from itertools import islice
+
+from sqlalchemy import exc
+from werkzeug.datastructures import MultiDict
+
+from models import db, Venue, Artist, Show, ImportCheckpoint
+
+#----------------------------------------------------------------------------#
+# Bulk import.
+#
+# Rows are read one at a time from a CSV or JSON-lines file, checked with the
+# same WTForms form the create pages use, and loaded in batches with COPY
+# (or a multi-row INSERT). Each batch commits together with the import's
+# ImportCheckpoint row, so rerunning an interrupted import skips exactly the
+# rows that were already loaded.
+#
+# CSV columns are the form field names; genres are comma separated. Shows
+# may name their artist and venue (artist_name, venue_name) instead of
+# giving their ids. Venues may carry the latitude and longitude an export
+# wrote; the ones without are geocoded after the import.
+#----------------------------------------------------------------------------#
+
+
+class Kind(object):
+
+    def __init__(self, model, form, columns, list_fields=(), bool_fields=(), float_fields=()):
+        # float_fields are loaded as they are given rather than through the
+        # form, which has no field for them.
+        self.model = model
+        self.form = form
+        self.columns = columns
+        self.list_fields = list_fields
+        self.bool_fields = bool_fields
+        self.float_fields = float_fields
+
+
+KINDS = {
+    'venues': Kind(Venue, 'VenueForm',
+                   ['name', 'city', 'state', 'address', 'phone', 'genres', 'image_link', 'facebook_link',
+                    'website', 'seeking_talent', 'seeking_description', 'latitude', 'longitude'],
+                   list_fields=('genres',), bool_fields=('seeking_talent',), float_fields=('latitude', 'longitude')),
+    'artists': Kind(Artist, 'ArtistForm',
+                    ['name', 'city', 'state', 'phone', 'genres', 'image_link', 'facebook_link', 'website',
+                     'seeking_venue', 'seeking_description'],
+                    list_fields=('genres',), bool_fields=('seeking_venue',)),
+    'shows': Kind(Show, 'ShowForm', ['artist_id', 'venue_id', 'start_time', 'end_time']),
+}
+
+FALSE_VALUES = ('', '0', 'f', 'false', 'n', 'no', 'off')
+
+
+def read_rows(path, fmt):
+    # (row number, dict) pairs; a JSON line that doesn't parse gives None.
+    with open(path, newline='', encoding='utf-8') as f:
+        if fmt == 'csv':
+            for number, row in enumerate(csv.DictReader(f), 1):
+                yield number, row
+            return
+        for number, line in enumerate(f, 1):
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield number, row if isinstance(row, dict) else None
+
+
+def to_formdata(kind, row):
+    data = MultiDict()
+    for key, value in row.items():
+        if value is None:
+            continue
+        if key in kind.list_fields:
+            if not isinstance(value, list):
+                value = [item.strip() for item in str(value).split(',') if item.strip()]
+            for item in value:
+                data.add(key, str(item))
+        elif key in kind.bool_fields:
+            if str(value).strip().lower() not in FALSE_VALUES:
+                data.add(key, 'y')
+        else:
+            data.add(key, str(value))
+    # A field missing from the form data would keep its default (ShowForm's
+    # start_time defaults to the current time); submit it empty instead.
+    for column in kind.columns:
+        if column not in data and column not in kind.list_fields:
+            data.add(column, '')
+    return data
+
+
+def resolve_references(rows):
+    # Fill in artist_id/venue_id from artist_name/venue_name, and check that
+    # the ids exist, with two queries per table for the whole batch.
+    errors = {}
+    for field, model in (('artist', Artist), ('venue', Venue)):
+        id_key, name_key = field + '_id', field + '_name'
+        names = {row[name_key] for number, row in rows if not row.get(id_key) and row.get(name_key)}
+        ids_by_name = {}
+        if names:
+            for name, entity_id in db.session.query(model.name, model.id).filter(model.name.in_(names)):
+                ids_by_name.setdefault(name, []).append(entity_id)
+        wanted = set()
+        for number, row in rows:
+            if not row.get(id_key) and row.get(name_key):
+                matches = ids_by_name.get(row[name_key], [])
+                if len(matches) != 1:
+                    errors.setdefault(number, {})[name_key] = [
+                        'No %s named %r.' % (field, row[name_key]) if not matches else
+                        'More than one %s is named %r.' % (field, row[name_key])]
+                    continue
+                row[id_key] = matches[0]
+            try:
+                row[id_key] = int(row[id_key]) if row.get(id_key) not in (None, '') else None
+            except (TypeError, ValueError):
+                errors.setdefault(number, {})[id_key] = ['Not a valid id.']
+                continue
+            if row[id_key] is not None:
+                wanted.add(row[id_key])
+        found = {entity_id for entity_id, in db.session.query(model.id).filter(model.id.in_(wanted))} if wanted else set()
+        for number, row in rows:
+            if row.get(id_key) is not None and row[id_key] not in found and number not in errors:
+                errors.setdefault(number, {})[id_key] = ['No %s with id %d.' % (field, row[id_key])]
+    return errors
+
+
+def validate(kind, rows):
+    # Split a batch into insertable values and {row number: field errors}.
+    import forms
+    form_class = getattr(forms, kind.form)
+    errors = {}
+    for number, row in rows:
+        if row is None:
+            errors[number] = {'row': ['Not a JSON object.']}
+    rows = [(number, row) for number, row in rows if row is not None]
+    if kind.model is Show:
+        errors.update(resolve_references(rows))
+    # Binding the fields is most of the cost of a form, so one instance is
+    # reused for the whole batch.
+    form = form_class(MultiDict(), meta={'csrf': False})
+    values = []
+    for number, row in rows:
+        if number in errors:
+            continue
+        form.process(to_formdata(kind, row))
+        if not form.validate():
+            errors[number] = form.errors
+            continue
+        value = {column: form[column].data for column in kind.columns if column not in kind.float_fields}
+        field_errors = {}
+        for column in kind.float_fields:
+            try:
+                value[column] = float(row[column]) if row.get(column) not in (None, '') else None
+            except (TypeError, ValueError):
+                field_errors[column] = ['Not a valid number.']
+        if field_errors:
+            errors[number] = field_errors
+            continue
+        values.append((number, value))
+    return values, errors
+
+
+#  Loading
+#  ----------------------------------------------------------------
+
+def copy_value(value):
+    # One field of COPY's csv format: unquoted empty is NULL, anything
+    # quoted is taken literally.
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (int, float)):
+        return str(value)
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    elif isinstance(value, list):
+        value = '{%s}' % ','.join('"%s"' % item.replace('\\', '\\\\').replace('"', '\\"') for item in value)
+    return '"%s"' % value.replace('"', '""')
+
+
+def copy_rows(model, columns, values):
+    data = ''.join(','.join(copy_value(row[column]) for column in columns) + '\n' for row in values)
+    sql = 'COPY "%s" (%s) FROM STDIN WITH (FORMAT csv)' % (model.__tablename__, ', '.join(columns))
+    cursor = db.session.connection().connection.driver_connection.cursor()
+    try:
+        if hasattr(cursor, 'copy_expert'):
+            # psycopg2
+            cursor.copy_expert(sql, io.StringIO(data))
+        else:
+            # psycopg 3
+            with cursor.copy(sql) as copy:
+                copy.write(data)
+    finally:
+        cursor.close()
+
+
+def insert_rows(kind, values, method):
+    rows = [row for number, row in values]
+    if method == 'copy':
+        copy_rows(kind.model, kind.columns, rows)
+    else:
+        db.session.execute(db.insert(kind.model), rows)
+
+
+def insert_one_by_one(kind, values, errors):
+    # Fallback when a whole batch was refused: load each row in its own
+    # savepoint to find the ones the database rejects.
+    loaded = 0
+    for number, row in values:
+        try:
+            with db.session.begin_nested():
+                db.session.execute(db.insert(kind.model).values(**row))
+            loaded += 1
+        except exc.DBAPIError as e:
+            errors[number] = {'row': [str(e.orig).strip().splitlines()[0]]}
+    return loaded
+
+
+def batches(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def run_import(kind_name, path, fmt=None, batch_size=1000, method='copy', name=None, restart=False,
+               on_error=None):
+    kind = KINDS[kind_name]
+    if fmt is None:
+        fmt = 'csv' if path.lower().endswith('.csv') else 'jsonl'
+    name = name or '%s:%s' % (kind_name, os.path.abspath(path))
+
+    checkpoint = db.session.get(ImportCheckpoint, name)
+    if checkpoint is None:
+        checkpoint = ImportCheckpoint(name=name, position=0, imported=0, rejected=0, finished=False)
+        db.session.add(checkpoint)
+    elif restart:
+        checkpoint.position = checkpoint.imported = checkpoint.rejected = 0
+        checkpoint.finished = False
+    db.session.commit()
+    if checkpoint.finished:
+        return checkpoint
+
+    rows = islice(read_rows(path, fmt), checkpoint.position, None)
+    for batch in batches(rows, batch_size):
+        values, errors = validate(kind, batch)
+        if values:
+            try:
+                insert_rows(kind, values, method)
+                loaded = len(values)
+            except (exc.DBAPIError, db.engine.dialect.loaded_dbapi.Error):
+                # COPY runs on the driver's cursor, so its errors arrive
+                # unwrapped.
+                db.session.rollback()
+                loaded = insert_one_by_one(kind, values, errors)
+        else:
+            loaded = 0
+        checkpoint.position = batch[-1][0]
+        checkpoint.imported += loaded
+        checkpoint.rejected += len(errors)
+        db.session.commit()
+        if on_error is not None:
+            for number in sorted(errors):
+                on_error(number, errors[number])
+
+    checkpoint.finished = True
+    db.session.commit()
+    return checkpoint
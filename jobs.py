@@ -0,0 +1,226 @@
+import os
+import random
+import socket
+import threading
+import traceback
+from datetime import timedelta
+
+from flask import current_app
+from sqlalchemy import delete, update
+from sqlalchemy.dialects.postgresql import insert
+
+from models import db, Job
+
+#----------------------------------------------------------------------------#
+# Background jobs.
+#
+# Work that needn't hold up a response is queued as a row in the Job table
+# (migration 4309b63aaca1) and run by `flask fyyur worker`. Any number of
+# workers can poll the table: each claims the next due job with SELECT ...
+# FOR UPDATE SKIP LOCKED, so they never wait on each other or take the same
+# job. A claim is committed at once and lasts JOB_TIMEOUT seconds; a job
+# whose worker died is claimed again when it lapses. A job that fails is
+# retried after an exponential backoff, up to its max_attempts, and then
+# left as failed with its last traceback.
+#
+# A job queued with a key is queued once however often it is asked for
+# before it first runs, which folds a burst of writes into one run. The
+# kinds in JOB_SCHEDULE queue their next run whenever one ends.
+#----------------------------------------------------------------------------#
+
+HANDLERS = {}
+
+PENDING = ('queued', 'running')
+
+
+def handler(kind):
+    # Registers fn(**payload) as the job of this kind.
+    def register(fn):
+        HANDLERS[kind] = fn
+        return fn
+    return register
+
+
+#  Queueing
+#  ----------------------------------------------------------------
+
+def enqueue(kind, payload=None, key=None, delay=0, max_attempts=None):
+    # Adds a job to the session's transaction: it is queued when the caller
+    # commits, and not at all if the transaction rolls back.
+    statement = insert(Job).values(
+        kind=kind, key=key, payload=payload or {},
+        max_attempts=max_attempts or current_app.config['JOB_MAX_ATTEMPTS'],
+        run_at=db.func.now() + timedelta(seconds=delay))
+    if key is not None:
+        statement = statement.on_conflict_do_nothing(
+            index_elements=['kind', 'key'], index_where=db.text("status = 'queued' AND attempts = 0"))
+    db.session.execute(statement)
+
+
+def schedule(after=None):
+    # Queues a run of each kind in JOB_SCHEDULE now, or of kind `after` one
+    # interval from now, unless one is already waiting.
+    for kind, interval in current_app.config['JOB_SCHEDULE'].items():
+        if interval and after in (None, kind):
+            enqueue(kind, key=kind, delay=interval if after is not None else 0)
+
+
+#  Running
+#  ----------------------------------------------------------------
+
+def claim(worker):
+    # The next due job, marked running for `worker`, or None.
+    due = db.select(Job.id).where(Job.status.in_(PENDING), Job.run_at <= db.func.now()) \
+        .order_by(Job.run_at, Job.id).limit(1).with_for_update(skip_locked=True).scalar_subquery()
+    job = db.session.execute(update(Job).where(Job.id == due).values(
+        status='running', attempts=Job.attempts + 1, worker=worker, started_at=db.func.now(),
+        run_at=db.func.now() + timedelta(seconds=current_app.config['JOB_TIMEOUT']),
+    ).returning(Job.id, Job.kind, Job.payload, Job.attempts, Job.max_attempts)).one_or_none()
+    db.session.commit()
+    return job
+
+
+def backoff(attempts):
+    # Seconds before the next attempt: doubling from JOB_RETRY_DELAY up to
+    # JOB_RETRY_MAX_DELAY, less up to half at random so that jobs that
+    # failed together don't all come back together.
+    delay = min(current_app.config['JOB_RETRY_DELAY'] * 2 ** (attempts - 1), current_app.config['JOB_RETRY_MAX_DELAY'])
+    return delay * random.uniform(0.5, 1.0)
+
+
+def finish(job, status, error=None, retry_in=None):
+    # Records the outcome of this claim of the job. Returns False when the
+    # claim had lapsed and the job was claimed again since: the later run's
+    # outcome stands, and it schedules the next run of its kind.
+    values = {'status': status, 'last_error': error}
+    if retry_in is not None:
+        values['run_at'] = db.func.now() + timedelta(seconds=retry_in)
+    else:
+        values['finished_at'] = db.func.now()
+    updated = db.session.execute(update(Job).where(
+        Job.id == job.id, Job.attempts == job.attempts).values(**values)).rowcount
+    if not updated:
+        db.session.rollback()
+        current_app.logger.getChild('jobs').warning(
+            'job %d (%s): attempt %d outlived its claim, which was taken again; its outcome is dropped',
+            job.id, job.kind, job.attempts)
+        return False
+    if retry_in is None and job.kind in current_app.config['JOB_SCHEDULE']:
+        schedule(after=job.kind)
+    db.session.commit()
+    return True
+
+
+def run_job(job):
+    # Returns True when the job succeeded.
+    logger = current_app.logger.getChild('jobs')
+    fn = HANDLERS.get(job.kind)
+    if fn is None:
+        finish(job, 'failed', 'No handler for %r jobs.' % job.kind)
+        logger.error('job %d: no handler for %r jobs', job.id, job.kind)
+        return False
+    if job.attempts > job.max_attempts:
+        # Its last claim lapsed: the worker died or the job ran too long.
+        finish(job, 'failed', 'Gave up after %d attempts; the last one never finished.' % job.max_attempts)
+        logger.error('job %d (%s) gave up: the last attempt never finished', job.id, job.kind)
+        return False
+    try:
+        fn(**job.payload)
+    except Exception:
+        db.session.rollback()
+        logger.exception('job %d (%s) failed, attempt %d of %d', job.id, job.kind, job.attempts, job.max_attempts)
+        if job.attempts < job.max_attempts:
+            finish(job, 'queued', traceback.format_exc(), retry_in=backoff(job.attempts))
+        else:
+            finish(job, 'failed', traceback.format_exc())
+        return False
+    finish(job, 'done')
+    return True
+
+
+def work(burst=False, poll_interval=None, stop=None):
+    # Runs jobs until `stop` (a threading.Event) is set, or with burst
+    # until none is due. Returns the number of jobs run.
+    stop = stop or threading.Event()
+    poll_interval = poll_interval if poll_interval is not None else current_app.config['JOB_POLL_INTERVAL']
+    worker = '%s:%d' % (socket.gethostname(), os.getpid())
+    schedule()
+    db.session.commit()
+    done = 0
+    while not stop.is_set():
+        job = claim(worker)
+        if job is None:
+            if burst:
+                break
+            stop.wait(poll_interval)
+            continue
+        run_job(job)
+        done += 1
+        # Each job starts on a fresh session.
+        db.session.remove()
+    return done
+
+
+#  Queue state
+#  ----------------------------------------------------------------
+
+def queue_depth(connection=None):
+    # Jobs per kind and status; for queued jobs, how many are due and how
+    # long the oldest due one has waited. Read on `connection` if given,
+    # otherwise on the session.
+    due = db.and_(Job.status == 'queued', Job.run_at <= db.func.now())
+    rows = (connection or db.session).execute(db.select(
+        Job.kind, Job.status, db.func.count(), db.func.count().filter(due),
+        db.func.extract('epoch', db.func.now() - db.func.min(Job.run_at).filter(due)),
+    ).group_by(Job.kind, Job.status).order_by(Job.kind, Job.status))
+    return [{
+        'kind': kind,
+        'status': status,
+        'jobs': jobs,
+        'due': due_jobs,
+        'oldest_due_seconds': float(waited) if waited is not None else None,
+    } for kind, status, jobs, due_jobs, waited in rows]
+
+
+def retry_failed(kind=None):
+    # Queues the failed jobs again, each with a fresh set of attempts.
+    query = update(Job).where(Job.status == 'failed')
+    if kind is not None:
+        query = query.where(Job.kind == kind)
+    count = db.session.execute(query.values(
+        status='queued', max_attempts=Job.attempts + current_app.config['JOB_MAX_ATTEMPTS'], run_at=db.func.now(),
+        finished_at=None)).rowcount
+    db.session.commit()
+    return count
+
+
+def purge_finished(days=None):
+    # Deletes the jobs that finished more than `days` ago.
+    days = days if days is not None else current_app.config['JOB_RETENTION_DAYS']
+    count = db.session.execute(delete(Job).where(
+        Job.status.in_(('done', 'failed')), Job.finished_at < db.func.now() - timedelta(days=days))).rowcount
+    db.session.commit()
+    return count
+
+
+#  Jobs
+#  ----------------------------------------------------------------
+
+@handler('refresh_directory')
+def refresh_directory_job():
+    from directory import refresh_directory
+    refresh_directory(wait=True)
+
+
+@handler('rollover')
+def rollover_job():
+    from counters import rollover
+    rollover()
+    if current_app.config['VENUE_DIRECTORY_VIEW']:
+        enqueue('refresh_directory', key='directory')
+        db.session.commit()
+
+
+@handler('purge_jobs')
+def purge_jobs_job():
+    purge_finished()
@@ -0,0 +1,220 @@
+import os
+import time
+
+from flask import current_app, g, got_request_exception, has_request_context, request
+from sqlalchemy import event, exc
+
+import dbpool
+
+try:
+    import prometheus_client
+    from prometheus_client import multiprocess
+except ImportError:
+    prometheus_client = None
+
+#----------------------------------------------------------------------------#
+# Prometheus metrics, served at /metrics.
+#
+# Requests are counted per endpoint (the URL rule, not the path, so ids
+# don't multiply the series), with a latency histogram, the number in
+# flight, status codes, exceptions and SQL statements issued. The pool
+# events of the engine feed the connection checkout metrics.
+#
+# Under gunicorn each worker keeps its own values, so set
+# PROMETHEUS_MULTIPROC_DIR to an empty directory before starting it:
+# prometheus_client then writes every worker's values to files there and
+# /metrics, whichever worker serves it, adds them all up. gunicorn.conf.py
+# empties the directory at startup and drops the live gauges of workers
+# that exit.
+#----------------------------------------------------------------------------#
+
+# Seconds; the slowest pages take a few hundred milliseconds.
+LATENCY_BUCKETS = (0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Seconds waited for a pooled connection, including the pre-ping.
+CHECKOUT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+# Milliseconds the job queue query may take before a scrape goes without
+# the job gauges.
+JOB_QUERY_TIMEOUT_MS = 2000
+
+
+def multiprocess_mode():
+    return 'PROMETHEUS_MULTIPROC_DIR' in os.environ or 'prometheus_multiproc_dir' in os.environ
+
+
+class RequestTiming(object):
+    __slots__ = ('start', 'queries')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+
+
+class JobCollector(object):
+    # The job queue's depth, read from the Job table when /metrics is
+    # scraped, so it is the same whichever worker answers. It is read on a
+    # connection of its own, so that its statement_timeout and any error
+    # stay out of the request's session. When the database can't answer,
+    # the scrape still serves the other metrics.
+
+    def collect(self):
+        from prometheus_client.core import GaugeMetricFamily
+        from models import db
+        import jobs
+        try:
+            with db.engine.connect() as connection:
+                connection.execute(db.text('SET LOCAL statement_timeout = %d' % JOB_QUERY_TIMEOUT_MS))
+                rows = jobs.queue_depth(connection)
+        except exc.SQLAlchemyError:
+            current_app.logger.getChild('metrics').exception('reading the job queue for /metrics failed')
+            return
+        depth = GaugeMetricFamily('fyyur_jobs', 'Background jobs by kind and status.', labels=['kind', 'status'])
+        due = GaugeMetricFamily('fyyur_jobs_due', 'Queued jobs that are due to run.', labels=['kind'])
+        lag = GaugeMetricFamily('fyyur_jobs_oldest_due_seconds', 'How long the oldest due job has waited.',
+                                labels=['kind'])
+        for row in rows:
+            depth.add_metric([row['kind'], row['status']], row['jobs'])
+            if row['status'] == 'queued':
+                due.add_metric([row['kind']], row['due'])
+                lag.add_metric([row['kind']], row['oldest_due_seconds'] or 0.0)
+        yield depth
+        yield due
+        yield lag
+
+
+class Metrics(object):
+
+    def init_app(self, app, engine):
+        if prometheus_client is None:
+            app.logger.warning('prometheus_client is not installed, /metrics is disabled')
+            return
+        # Each app gets its own registry so that building a second app in
+        # the same process doesn't register the metrics twice. In
+        # multiprocess mode the values live in the shared files instead
+        # and the registry is only used for rendering.
+        self.registry = prometheus_client.CollectorRegistry()
+        registry = None if multiprocess_mode() else self.registry
+        self.requests = prometheus_client.Counter(
+            'fyyur_requests', 'HTTP requests handled.',
+            ['endpoint', 'method', 'status'], registry=registry)
+        self.latency = prometheus_client.Histogram(
+            'fyyur_request_duration_seconds', 'Time to handle a request, up to the last byte of a streamed body.',
+            ['endpoint', 'method'], buckets=LATENCY_BUCKETS, registry=registry)
+        self.in_flight = prometheus_client.Gauge(
+            'fyyur_requests_in_flight', 'Requests being handled.',
+            registry=registry, multiprocess_mode='livesum')
+        self.exceptions = prometheus_client.Counter(
+            'fyyur_exceptions', 'Unhandled exceptions raised by requests.',
+            ['endpoint', 'type'], registry=registry)
+        self.queries = prometheus_client.Counter(
+            'fyyur_sql_queries', 'SQL statements issued while handling requests.',
+            ['endpoint'], registry=registry)
+        self.pool_connects = prometheus_client.Counter(
+            'fyyur_db_pool_connects', 'New database connections opened by the pool.', registry=registry)
+        self.pool_invalidations = prometheus_client.Counter(
+            'fyyur_db_pool_invalidations', 'Pooled connections discarded after an error.', registry=registry)
+        self.pool_timeouts = prometheus_client.Counter(
+            'fyyur_db_pool_timeouts', 'Checkouts that gave up waiting for a free connection.', registry=registry)
+        # Its _count is the number of checkouts.
+        self.pool_wait = prometheus_client.Histogram(
+            'fyyur_db_pool_checkout_seconds', 'Time to check a connection out of the pool.',
+            buckets=CHECKOUT_BUCKETS, registry=registry)
+        self.pool_checked_out = prometheus_client.Gauge(
+            'fyyur_db_pool_checked_out', 'Connections currently checked out.',
+            registry=registry, multiprocess_mode='livesum')
+        self.pool_size = prometheus_client.Gauge(
+            'fyyur_db_pool_size', 'Connections each pool keeps open (summed over workers).',
+            registry=registry, multiprocess_mode='livesum')
+        # labels() takes a lock and validates its arguments on every call;
+        # the children are looked up here instead.
+        self.children = {}
+        self.job_collector = JobCollector() if app.config['JOB_QUEUE'] else None
+        if self.job_collector is not None:
+            self.registry.register(self.job_collector)
+
+        self.watch(engine)
+        if self.on_wait not in dbpool.metrics.wait_observers:
+            dbpool.metrics.wait_observers.append(self.on_wait)
+        got_request_exception.connect(self.on_exception, app, weak=False)
+        app.before_request(self.before_request)
+        app.after_request(self.after_request)
+        app.extensions['metrics'] = self
+
+    def watch(self, engine):
+        # Also called for the sync_engine of asgi.py's async engine, whose
+        # pool adds to the same metrics.
+        pool = engine.pool
+        self.pool_size.inc(pool.size())
+        event.listen(pool, 'checkout', self.on_checkout)
+        event.listen(pool, 'checkin', self.on_checkin)
+        event.listen(pool, 'connect', self.on_connect)
+        event.listen(pool, 'invalidate', self.on_invalidate)
+        event.listen(engine, 'after_cursor_execute', self.after_cursor_execute)
+
+    def render(self):
+        if multiprocess_mode():
+            registry = prometheus_client.CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+            if self.job_collector is not None:
+                registry.register(self.job_collector)
+        else:
+            registry = self.registry
+        return prometheus_client.generate_latest(registry), prometheus_client.CONTENT_TYPE_LATEST
+
+    def on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        self.pool_checked_out.inc()
+
+    def on_checkin(self, dbapi_connection, connection_record):
+        self.pool_checked_out.dec()
+
+    def on_connect(self, dbapi_connection, connection_record):
+        self.pool_connects.inc()
+
+    def on_invalidate(self, dbapi_connection, connection_record, exception):
+        self.pool_invalidations.inc()
+
+    def on_wait(self, seconds, timed_out):
+        self.pool_wait.observe(seconds)
+        if timed_out:
+            self.pool_timeouts.inc()
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        timing = g.get('metrics_timing') if has_request_context() else None
+        if timing is not None:
+            timing.queries += 1
+
+    def on_exception(self, sender, exception, **extra):
+        self.exceptions.labels(request.endpoint or 'unmatched', type(exception).__name__).inc()
+
+    def before_request(self):
+        self.in_flight.inc()
+        g.metrics_timing = RequestTiming()
+
+    def after_request(self, response):
+        # Another before_request hook may have answered first.
+        timing = g.get('metrics_timing')
+        if timing is None:
+            return response
+        labels = (request.endpoint or 'unmatched', request.method, response.status_code)
+        if response.is_streamed:
+            # The body, and its queries, come after this point.
+            response.call_on_close(lambda: self.record(timing, *labels))
+        else:
+            self.record(timing, *labels)
+        return response
+
+    def record(self, timing, endpoint, method, status):
+        key = (endpoint, method, status)
+        children = self.children.get(key)
+        if children is None:
+            children = self.children[key] = (self.latency.labels(endpoint, method),
+                                             self.requests.labels(endpoint, method, status),
+                                             self.queries.labels(endpoint))
+        latency, requests, queries = children
+        latency.observe(time.perf_counter() - timing.start)
+        requests.inc()
+        if timing.queries:
+            queries.inc(timing.queries)
+        self.in_flight.dec()
+
+
+recorder = Metrics()
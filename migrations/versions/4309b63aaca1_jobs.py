@@ -0,0 +1,50 @@
+"""background job queue
+
+Revision ID: 4309b63aaca1
+Revises: d63eb3951be2
+Create Date: 2026-10-19 00:26:51.730114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '4309b63aaca1'
+down_revision = 'd63eb3951be2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('Job',
+    sa.Column('id', sa.BigInteger(), nullable=False),
+    sa.Column('kind', sa.String(length=60), nullable=False),
+    sa.Column('key', sa.String(length=200), nullable=True),
+    sa.Column('payload', postgresql.JSONB(), server_default='{}', nullable=False),
+    sa.Column('status', sa.String(length=10), server_default='queued', nullable=False),
+    sa.Column('attempts', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('max_attempts', sa.Integer(), nullable=False),
+    sa.Column('run_at', sa.DateTime(), server_default=sa.func.now(), nullable=False),
+    sa.Column('worker', sa.String(length=120), nullable=True),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.func.now(), nullable=False),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.CheckConstraint("status IN ('queued', 'running', 'done', 'failed')", name='Job_status'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    # The jobs a worker may claim, in the order it claims them. Finished
+    # jobs stay out of it, so it stays small however many are kept.
+    op.create_index('ix_Job_due', 'Job', ['run_at', 'id'], postgresql_where=sa.text("status IN ('queued', 'running')"))
+    # At most one job per kind and key waits for its first run, so that a
+    # burst of requests for the same work queues it once.
+    op.create_index('ux_Job_pending_key', 'Job', ['kind', 'key'], unique=True,
+                    postgresql_where=sa.text("status = 'queued' AND attempts = 0"))
+
+
+def downgrade():
+    op.drop_index('ux_Job_pending_key', table_name='Job')
+    op.drop_index('ix_Job_due', table_name='Job')
+    op.drop_table('Job')
@@ -0,0 +1,26 @@
+"""show slot index for availability searches
+
+Revision ID: 7048f87d72e6
+Revises: ba5eb47f7102
+Create Date: 2026-10-18 22:17:05.114208
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '7048f87d72e6'
+down_revision = 'ba5eb47f7102'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Every show's slot, legacy overlaps included, for searches that cover
+    # all the venues. The exclusion constraints' indexes lead with the venue.
+    # Carrying venue_id lets scheduling.availability read only the index.
+    op.execute('CREATE INDEX "ix_Show_slot" ON "Show" USING gist (slot) INCLUDE (venue_id);')
+
+
+def downgrade():
+    op.drop_index('ix_Show_slot', table_name='Show')
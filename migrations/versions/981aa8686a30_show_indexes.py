@@ -0,0 +1,27 @@
+"""show indexes
+
+Revision ID: 981aa8686a30
+Revises: b99a6c45c3d3
+Create Date: 2026-10-18 10:04:52.718330
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '981aa8686a30'
+down_revision = 'b99a6c45c3d3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_Show_venue_id_start_time', 'Show', ['venue_id', 'start_time'])
+    op.create_index('ix_Show_artist_id_start_time', 'Show', ['artist_id', 'start_time'])
+    op.create_index('ix_Show_start_time_id', 'Show', ['start_time', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_Show_start_time_id', table_name='Show')
+    op.drop_index('ix_Show_artist_id_start_time', table_name='Show')
+    op.drop_index('ix_Show_venue_id_start_time', table_name='Show')
@@ -0,0 +1,32 @@
+"""VenueDirectory materialized view
+
+Revision ID: 9c13e9c99f5f
+Revises: ac2faf284252
+Create Date: 2026-10-18 19:20:41.660735
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '9c13e9c99f5f'
+down_revision = 'ac2faf284252'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute('''
+        CREATE MATERIALIZED VIEW "VenueDirectory" AS
+        SELECT v.city, v.state, v.id AS venue_id, v.name, v.updated_at,
+               v.upcoming_shows_count, v.next_show_time, r.rolled_at
+        FROM "Venue" AS v CROSS JOIN "ShowRollover" AS r
+        WHERE r.id = 1;
+    ''')
+    # REFRESH ... CONCURRENTLY needs a unique index without a WHERE clause.
+    op.execute('CREATE UNIQUE INDEX "ix_VenueDirectory_venue_id" ON "VenueDirectory" (venue_id);')
+    op.execute('CREATE INDEX "ix_VenueDirectory_city_state" ON "VenueDirectory" (city, state, venue_id);')
+
+
+def downgrade():
+    op.execute('DROP MATERIALIZED VIEW "VenueDirectory";')
@@ -0,0 +1,115 @@
+"""upcoming/past show counters on Venue and Artist
+
+Revision ID: ac2faf284252
+Revises: 36dabf890480
+Create Date: 2026-10-18 18:52:10.318204
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'ac2faf284252'
+down_revision = '36dabf890480'
+branch_labels = None
+depends_on = None
+
+ENTITIES = (('Venue', 'venue_id'), ('Artist', 'artist_id'))
+
+# The shows a statement added (sign 1) and removed (sign -1). An UPDATE
+# counts only the rows whose venue, artist or start time changed.
+CHANGED = '(n.venue_id, n.artist_id, n.start_time) IS DISTINCT FROM (o.venue_id, o.artist_id, o.start_time)'
+DELTAS = {
+    'insert': 'SELECT venue_id, artist_id, start_time, 1 AS sign FROM new_shows',
+    'delete': 'SELECT venue_id, artist_id, start_time, -1 AS sign FROM old_shows',
+    'update': ('SELECT n.venue_id, n.artist_id, n.start_time, 1 AS sign FROM new_shows n JOIN old_shows o USING (id) '
+               'WHERE %s UNION ALL '
+               'SELECT o.venue_id, o.artist_id, o.start_time, -1 FROM old_shows o JOIN new_shows n USING (id) '
+               'WHERE %s' % (CHANGED, CHANGED)),
+}
+TRANSITIONS = {
+    'insert': 'NEW TABLE AS new_shows',
+    'delete': 'OLD TABLE AS old_shows',
+    'update': 'OLD TABLE AS old_shows NEW TABLE AS new_shows',
+}
+
+# Applies the deltas to one table. When an upcoming show goes the next
+# show time is looked up again from the (<fk>, start_time) index.
+APPLY = '''
+        WITH delta AS ({delta})
+        UPDATE "{table}" AS t SET
+            upcoming_shows_count = t.upcoming_shows_count + d.upcoming,
+            past_shows_count = t.past_shows_count + d.past,
+            next_show_time = CASE WHEN d.upcoming_removed
+                THEN (SELECT min(s.start_time) FROM "Show" AS s WHERE s.{fk} = t.id AND s.start_time > rolled)
+                ELSE LEAST(t.next_show_time, d.next_show_time) END
+        FROM (SELECT {fk} AS id,
+                     coalesce(sum(sign) FILTER (WHERE start_time > rolled), 0) AS upcoming,
+                     coalesce(sum(sign) FILTER (WHERE start_time <= rolled), 0) AS past,
+                     min(start_time) FILTER (WHERE sign > 0 AND start_time > rolled) AS next_show_time,
+                     coalesce(bool_or(sign < 0 AND start_time > rolled), false) AS upcoming_removed
+              FROM delta GROUP BY {fk}) AS d
+        WHERE t.id = d.id;'''
+
+BACKFILL = '''
+    UPDATE "{table}" AS t SET
+        upcoming_shows_count = d.upcoming,
+        past_shows_count = d.past,
+        next_show_time = d.next_show_time
+    FROM (SELECT {fk} AS id,
+                 count(*) FILTER (WHERE start_time > :rolled) AS upcoming,
+                 count(*) FILTER (WHERE start_time <= :rolled) AS past,
+                 min(start_time) FILTER (WHERE start_time > :rolled) AS next_show_time
+          FROM "Show" GROUP BY {fk}) AS d
+    WHERE t.id = d.id'''
+
+
+def upgrade():
+    for table, fk in ENTITIES:
+        op.add_column(table, sa.Column('upcoming_shows_count', sa.Integer(), server_default='0', nullable=False))
+        op.add_column(table, sa.Column('past_shows_count', sa.Integer(), server_default='0', nullable=False))
+        op.add_column(table, sa.Column('next_show_time', sa.DateTime(), nullable=True))
+    op.create_table('ShowRollover',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('rolled_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+    # No show may change between the backfill and the triggers.
+    op.execute('LOCK TABLE "Show" IN SHARE MODE')
+    # The app compares start times with its own local clock.
+    rolled = datetime.today()
+    op.get_bind().execute(sa.text('INSERT INTO "ShowRollover" (id, rolled_at) VALUES (1, :rolled)'), {'rolled': rolled})
+    for table, fk in ENTITIES:
+        op.get_bind().execute(sa.text(BACKFILL.format(table=table, fk=fk)), {'rolled': rolled})
+
+    for op_name, delta in DELTAS.items():
+        # FOR SHARE makes a rollover wait for the statement's transaction,
+        # and the statement wait for a rollover in progress.
+        op.execute('''
+            CREATE FUNCTION fyyur_show_counters_%s() RETURNS trigger AS $$
+            DECLARE
+                rolled timestamp;
+            BEGIN
+                SELECT rolled_at INTO rolled FROM "ShowRollover" WHERE id = 1 FOR SHARE;%s
+                RETURN NULL;
+            END
+            $$ LANGUAGE plpgsql;
+        ''' % (op_name, ''.join(APPLY.format(delta=delta, table=table, fk=fk) for table, fk in ENTITIES)))
+        op.execute('CREATE TRIGGER "Show_counters_%s" AFTER %s ON "Show" REFERENCING %s '
+                   'FOR EACH STATEMENT EXECUTE PROCEDURE fyyur_show_counters_%s();'
+                   % (op_name, op_name.upper(), TRANSITIONS[op_name], op_name))
+
+
+def downgrade():
+    for op_name in DELTAS:
+        op.execute('DROP TRIGGER "Show_counters_%s" ON "Show";' % op_name)
+        op.execute('DROP FUNCTION fyyur_show_counters_%s();' % op_name)
+    op.drop_table('ShowRollover')
+    for table, fk in reversed(ENTITIES):
+        op.drop_column(table, 'next_show_time')
+        op.drop_column(table, 'past_shows_count')
+        op.drop_column(table, 'upcoming_shows_count')
@@ -0,0 +1,72 @@
+"""search vectors and trigram indexes
+
+Revision ID: b99a6c45c3d3
+Revises: e61812d5a17b
+Create Date: 2026-10-18 09:12:31.402117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'b99a6c45c3d3'
+down_revision = 'e61812d5a17b'
+branch_labels = None
+depends_on = None
+
+
+def create_extension(name):
+    # Extensions are optional: skip them when the server doesn't ship them or
+    # the migrating role isn't allowed to create them.
+    conn = op.get_bind()
+    available = conn.execute(sa.text(
+        'SELECT 1 FROM pg_available_extensions WHERE name = :name'), {'name': name}).scalar()
+    if available is None:
+        return False
+    savepoint = conn.begin_nested()
+    try:
+        conn.execute(sa.text('CREATE EXTENSION IF NOT EXISTS ' + name))
+    except sa.exc.DBAPIError:
+        savepoint.rollback()
+        return False
+    savepoint.commit()
+    return True
+
+
+def upgrade():
+    op.add_column('Venue', sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True))
+    op.add_column('Artist', sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True))
+
+    op.execute('''
+        CREATE FUNCTION fyyur_search_vector_update() RETURNS trigger AS $$
+        BEGIN
+            NEW.search_vector :=
+                setweight(to_tsvector('simple', coalesce(NEW.name, '')), 'A') ||
+                setweight(to_tsvector('simple', coalesce(NEW.city, '')), 'B') ||
+                setweight(to_tsvector('simple', coalesce(array_to_string(NEW.genres, ' '), '')), 'C');
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql;
+    ''')
+    for table in ('Venue', 'Artist'):
+        op.execute('CREATE TRIGGER "%s_search_vector_update" BEFORE INSERT OR UPDATE OF name, city, genres '
+                   'ON "%s" FOR EACH ROW EXECUTE PROCEDURE fyyur_search_vector_update();' % (table, table))
+        # Fire the trigger once to backfill existing rows.
+        op.execute('UPDATE "%s" SET name = name;' % table)
+        op.create_index('ix_%s_search_vector' % table, table, ['search_vector'], postgresql_using='gin')
+
+    if create_extension('pg_trgm'):
+        op.execute('CREATE INDEX "ix_Venue_name_trgm" ON "Venue" USING gin (name gin_trgm_ops);')
+        op.execute('CREATE INDEX "ix_Artist_name_trgm" ON "Artist" USING gin (name gin_trgm_ops);')
+
+
+def downgrade():
+    op.execute('DROP INDEX IF EXISTS "ix_Artist_name_trgm";')
+    op.execute('DROP INDEX IF EXISTS "ix_Venue_name_trgm";')
+    for table in ('Artist', 'Venue'):
+        op.drop_index('ix_%s_search_vector' % table, table_name=table)
+        op.execute('DROP TRIGGER "%s_search_vector_update" ON "%s";' % (table, table))
+        op.drop_column(table, 'search_vector')
+    op.execute('DROP FUNCTION fyyur_search_vector_update();')
@@ -0,0 +1,77 @@
+"""show end times and double-booking constraints
+
+Revision ID: ba5eb47f7102
+Revises: 9c13e9c99f5f
+Create Date: 2026-10-18 21:04:37.581920
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'ba5eb47f7102'
+down_revision = '9c13e9c99f5f'
+branch_labels = None
+depends_on = None
+
+# Length of the existing shows, and of new ones inserted without an end time.
+DEFAULT_LENGTH = "interval '2 hours'"
+
+KEYS = (('venue', 'venue_id'), ('artist', 'artist_id'))
+
+
+def upgrade():
+    op.add_column('Show', sa.Column('end_time', sa.DateTime(), nullable=True))
+    op.execute('UPDATE "Show" SET end_time = start_time + %s' % DEFAULT_LENGTH)
+    op.alter_column('Show', 'end_time', nullable=False)
+    op.create_check_constraint('Show_end_after_start', 'Show', 'end_time > start_time')
+    # COPY, the importer and the forms may all leave the end time out.
+    op.execute('''
+        CREATE FUNCTION fyyur_show_default_end() RETURNS trigger AS $$
+        BEGIN
+            IF NEW.end_time IS NULL THEN
+                NEW.end_time := NEW.start_time + %s;
+            END IF;
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql;
+    ''' % DEFAULT_LENGTH)
+    op.execute('CREATE TRIGGER "Show_default_end" BEFORE INSERT OR UPDATE OF start_time, end_time ON "Show" '
+               'FOR EACH ROW EXECUTE PROCEDURE fyyur_show_default_end();')
+    op.execute('ALTER TABLE "Show" ADD COLUMN slot tsrange GENERATED ALWAYS AS (tsrange(start_time, end_time)) STORED')
+
+    # Shows that already overlap an earlier one at the same venue or with
+    # the same artist can't be put right here. They are marked and left out
+    # of the constraints; `flask fyyur legacy-overlaps` lists them.
+    op.add_column('Show', sa.Column('legacy_overlap', sa.Boolean(), server_default='false', nullable=False))
+    for name, fk in KEYS:
+        # Every slot is DEFAULT_LENGTH long at this point, which bounds the
+        # (<fk>, start_time) index scan.
+        op.execute('''
+            UPDATE "Show" AS s SET legacy_overlap = true
+            WHERE EXISTS (SELECT 1 FROM "Show" AS o
+                          WHERE o.{fk} = s.{fk} AND o.id < s.id
+                            AND o.start_time > s.start_time - {length} AND o.start_time < s.end_time)
+        '''.format(fk=fk, length=DEFAULT_LENGTH))
+
+    # Plain GiST has no equality for integers without btree_gist, but it has
+    # one for ranges: each id is compared as the one-point range [id, id].
+    for name, fk in KEYS:
+        op.execute('ALTER TABLE "Show" ADD CONSTRAINT "Show_{name}_slot_excl" EXCLUDE USING gist '
+                   "(int4range({fk}, {fk}, '[]') WITH =, slot WITH &&) WHERE (NOT legacy_overlap)"
+                   .format(name=name, fk=fk))
+        op.execute('CREATE INDEX "ix_Show_{name}_legacy_slot" ON "Show" USING gist '
+                   "(int4range({fk}, {fk}, '[]'), slot) WHERE legacy_overlap".format(name=name, fk=fk))
+
+
+def downgrade():
+    for name, fk in reversed(KEYS):
+        op.execute('DROP INDEX "ix_Show_%s_legacy_slot";' % name)
+        op.execute('ALTER TABLE "Show" DROP CONSTRAINT "Show_%s_slot_excl";' % name)
+    op.drop_column('Show', 'legacy_overlap')
+    op.drop_column('Show', 'slot')
+    op.execute('DROP TRIGGER "Show_default_end" ON "Show";')
+    op.execute('DROP FUNCTION fyyur_show_default_end();')
+    op.drop_constraint('Show_end_after_start', 'Show', type_='check')
+    op.drop_column('Show', 'end_time')
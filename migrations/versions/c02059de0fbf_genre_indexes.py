@@ -0,0 +1,26 @@
+"""genre indexes
+
+Revision ID: c02059de0fbf
+Revises: 7048f87d72e6
+Create Date: 2026-10-18 23:02:41.306517
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'c02059de0fbf'
+down_revision = '7048f87d72e6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # For the contains (@>) and overlaps (&&) genre filters.
+    op.create_index('ix_Venue_genres', 'Venue', ['genres'], postgresql_using='gin')
+    op.create_index('ix_Artist_genres', 'Artist', ['genres'], postgresql_using='gin')
+
+
+def downgrade():
+    op.drop_index('ix_Artist_genres', table_name='Artist')
+    op.drop_index('ix_Venue_genres', table_name='Venue')
@@ -0,0 +1,40 @@
+"""venue coordinates and location index
+
+Revision ID: d63eb3951be2
+Revises: c02059de0fbf
+Create Date: 2026-10-18 23:41:12.408331
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd63eb3951be2'
+down_revision = 'c02059de0fbf'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('Venue', sa.Column('latitude', sa.Float(), nullable=True))
+    op.add_column('Venue', sa.Column('longitude', sa.Float(), nullable=True))
+    op.create_check_constraint(
+        'Venue_coordinates', 'Venue',
+        '(latitude IS NULL) = (longitude IS NULL) AND latitude BETWEEN -90 AND 90 '
+        'AND longitude BETWEEN -180 AND 180')
+    # The core point type and its GiST operator class, so that neither
+    # PostGIS nor earthdistance has to be installed. geo.py bounds each
+    # search with a box the index can answer and measures the great-circle
+    # distance of the venues inside it.
+    op.execute('ALTER TABLE "Venue" ADD COLUMN location point '
+               'GENERATED ALWAYS AS (point(longitude, latitude)) STORED;')
+    op.execute('CREATE INDEX "ix_Venue_location" ON "Venue" USING gist (location);')
+
+
+def downgrade():
+    op.drop_index('ix_Venue_location', table_name='Venue')
+    op.drop_column('Venue', 'location')
+    op.drop_constraint('Venue_coordinates', 'Venue', type_='check')
+    op.drop_column('Venue', 'longitude')
+    op.drop_column('Venue', 'latitude')
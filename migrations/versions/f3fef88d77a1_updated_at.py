@@ -0,0 +1,38 @@
+"""updated_at columns
+
+Revision ID: f3fef88d77a1
+Revises: 981aa8686a30
+Create Date: 2026-10-18 11:26:07.551904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3fef88d77a1'
+down_revision = '981aa8686a30'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute('''
+        CREATE FUNCTION fyyur_touch_updated_at() RETURNS trigger AS $$
+        BEGIN
+            NEW.updated_at := now();
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql;
+    ''')
+    for table in ('Venue', 'Artist', 'Show'):
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(), server_default=sa.func.now(), nullable=False))
+        op.execute('CREATE TRIGGER "%s_touch_updated_at" BEFORE UPDATE ON "%s" '
+                   'FOR EACH ROW EXECUTE PROCEDURE fyyur_touch_updated_at();' % (table, table))
+
+
+def downgrade():
+    for table in ('Show', 'Artist', 'Venue'):
+        op.execute('DROP TRIGGER "%s_touch_updated_at" ON "%s";' % (table, table))
+        op.drop_column(table, 'updated_at')
+    op.execute('DROP FUNCTION fyyur_touch_updated_at();')
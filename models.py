@@ -0,0 +1,175 @@
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.dialects.postgresql import JSONB, TSRANGE, TSVECTOR
+from sqlalchemy.types import UserDefinedType
+
+db = SQLAlchemy()
+
+
+class Point(UserDefinedType):
+    # PostgreSQL's point, (x, y); only ever read in queries, never loaded.
+    cache_ok = True
+
+    def get_col_spec(self, **kw):
+        return 'POINT'
+
+
+#----------------------------------------------------------------------------#
+# Models.
+#----------------------------------------------------------------------------#
+
+
+class Venue(db.Model):
+    __tablename__ = 'Venue'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String, nullable=False)
+    city = db.Column(db.String(120), nullable=False)
+    state = db.Column(db.String(120), nullable=False)
+    address = db.Column(db.String(120), nullable=False)
+    phone = db.Column(db.String(120), nullable=False)
+    image_link = db.Column(db.String(500), nullable=False)
+    facebook_link = db.Column(db.String(120), nullable=False)
+    website = db.Column(db.String(120))
+    seeking_talent = db.Column(db.Boolean, nullable=False, default=False)
+    seeking_description = db.Column(db.String(120))
+    genres = db.Column(db.ARRAY(db.String()), nullable=False)
+    search_vector = db.deferred(db.Column(TSVECTOR))
+    updated_at = db.Column(db.DateTime, nullable=False, server_default=db.func.now())
+    # Kept by triggers on Show (migration ac2faf284252) as of
+    # ShowRollover.rolled_at: shows after it are upcoming, the rest past.
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, server_default='0')
+    past_shows_count = db.Column(db.Integer, nullable=False, server_default='0')
+    next_show_time = db.Column(db.DateTime)
+    # Filled in from the gazetteer (see geo.py) unless given. location is
+    # (longitude, latitude) as a point, for the GiST index.
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    location = db.deferred(db.Column(Point, db.Computed('point(longitude, latitude)')))
+    shows = db.relationship('Show', backref='Venue', lazy=True)
+
+    __table_args__ = (
+        db.Index('ix_Venue_genres', 'genres', postgresql_using='gin'),
+        db.Index('ix_Venue_location', 'location', postgresql_using='gist'),
+    )
+
+    def __repr__(self):
+        return f'<{self.id} {self.name}>'
+
+
+class Artist(db.Model):
+    __tablename__ = 'Artist'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String, nullable=False)
+    city = db.Column(db.String(120), nullable=False)
+    state = db.Column(db.String(120), nullable=False)
+    phone = db.Column(db.String(120), nullable=False)
+    genres = db.Column(db.ARRAY(db.String()), nullable=False)
+    image_link = db.Column(db.String(500), nullable=False)
+    facebook_link = db.Column(db.String(120), nullable=True)
+    website = db.Column(db.String(120))
+    seeking_venue = db.Column(db.Boolean, nullable=False, default=False)
+    seeking_description = db.Column(db.String(120))
+    search_vector = db.deferred(db.Column(TSVECTOR))
+    updated_at = db.Column(db.DateTime, nullable=False, server_default=db.func.now())
+    # Kept by triggers on Show (migration ac2faf284252) as of
+    # ShowRollover.rolled_at: shows after it are upcoming, the rest past.
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, server_default='0')
+    past_shows_count = db.Column(db.Integer, nullable=False, server_default='0')
+    next_show_time = db.Column(db.DateTime)
+    shows = db.relationship('Show', backref='Artist', lazy=True)
+
+    __table_args__ = (
+        db.Index('ix_Artist_genres', 'genres', postgresql_using='gin'),
+    )
+
+
+class Show(db.Model):
+    __tablename__ = 'Show'
+
+    id = db.Column(db.Integer, primary_key=True)
+    start_time = db.Column(db.DateTime, nullable=False)
+    # Filled in by a trigger (migration ba5eb47f7102) when left out.
+    end_time = db.Column(db.DateTime, nullable=False)
+    artist_id = db.Column(db.Integer, db.ForeignKey(
+        'Artist.id'), nullable=False)
+    venue_id = db.Column(db.Integer, db.ForeignKey('Venue.id'), nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False, server_default=db.func.now())
+    # [start_time, end_time), which exclusion constraints keep from
+    # overlapping another show at the venue or with the artist, except for
+    # the shows that already did (see scheduling.py).
+    slot = db.deferred(db.Column(TSRANGE, db.Computed('tsrange(start_time, end_time)')))
+    legacy_overlap = db.Column(db.Boolean, nullable=False, server_default='false')
+
+    __table_args__ = (
+        db.Index('ix_Show_venue_id_start_time', 'venue_id', 'start_time'),
+        db.Index('ix_Show_artist_id_start_time', 'artist_id', 'start_time'),
+        db.Index('ix_Show_start_time_id', 'start_time', 'id'),
+    )
+
+
+class ShowRollover(db.Model):
+    # One row: the time the Venue/Artist show counters are split at. `flask
+    # fyyur rollover` moves it forward, moving the shows that started in
+    # between from the upcoming to the past counts.
+    __tablename__ = 'ShowRollover'
+
+    id = db.Column(db.Integer, primary_key=True)
+    rolled_at = db.Column(db.DateTime, nullable=False)
+
+
+# The VenueDirectory materialized view (migration 9c13e9c99f5f, see
+# directory.py), on its own MetaData so that migrations don't try to create
+# it as a table.
+venue_directory = db.Table(
+    'VenueDirectory', db.MetaData(),
+    db.Column('city', db.String(120)),
+    db.Column('state', db.String(120)),
+    db.Column('venue_id', db.Integer, primary_key=True),
+    db.Column('name', db.String),
+    db.Column('updated_at', db.DateTime),
+    db.Column('upcoming_shows_count', db.Integer),
+    db.Column('next_show_time', db.DateTime),
+    db.Column('rolled_at', db.DateTime),
+)
+
+
+class ImportCheckpoint(db.Model):
+    # Progress of a `flask fyyur import` run, committed together with each
+    # batch so an interrupted import resumes after the last loaded row.
+    __tablename__ = 'ImportCheckpoint'
+
+    name = db.Column(db.String, primary_key=True)
+    position = db.Column(db.Integer, nullable=False, default=0)
+    imported = db.Column(db.Integer, nullable=False, default=0)
+    rejected = db.Column(db.Integer, nullable=False, default=0)
+    finished = db.Column(db.Boolean, nullable=False, default=False)
+    updated_at = db.Column(db.DateTime, nullable=False, server_default=db.func.now(), onupdate=db.func.now())
+
+
+class Job(db.Model):
+    # A unit of background work for `flask fyyur worker` (see jobs.py).
+    # run_at is when a queued job is due, and for a running one when its
+    # worker's claim on it lapses.
+    __tablename__ = 'Job'
+
+    id = db.Column(db.BigInteger, primary_key=True)
+    kind = db.Column(db.String(60), nullable=False)
+    key = db.Column(db.String(200))
+    payload = db.Column(JSONB, nullable=False, server_default='{}')
+    status = db.Column(db.String(10), nullable=False, server_default='queued')
+    attempts = db.Column(db.Integer, nullable=False, server_default='0')
+    max_attempts = db.Column(db.Integer, nullable=False)
+    run_at = db.Column(db.DateTime, nullable=False, server_default=db.func.now())
+    worker = db.Column(db.String(120))
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, nullable=False, server_default=db.func.now())
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.CheckConstraint("status IN ('queued', 'running', 'done', 'failed')", name='Job_status'),
+        db.Index('ix_Job_due', 'run_at', 'id', postgresql_where=db.text("status IN ('queued', 'running')")),
+        db.Index('ux_Job_pending_key', 'kind', 'key', unique=True,
+                 postgresql_where=db.text("status = 'queued' AND attempts = 0")),
+    )
@@ -0,0 +1,144 @@
+import json
+import os
+import random
+import sys
+import time
+
+from flask import g, has_request_context, request
+from markupsafe import escape
+from sqlalchemy import event
+
+#----------------------------------------------------------------------------#
+# Per-request SQL profiling.
+#
+# Engine events time every statement. For a sampled request (a fraction
+# SQL_PROFILE_SAMPLE_RATE of them) the query count, total database time
+# and the slowest statements with the app code that issued them are
+# reported in a Server-Timing header, a JSON log line and, with
+# SQL_PROFILE_PANEL, a panel at the bottom of HTML pages. Statements slower
+# than SQL_SLOW_QUERY_MS are logged as warnings whether or not the request
+# was sampled.
+#----------------------------------------------------------------------------#
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def call_site():
+    # file:line of the innermost app frame on the stack (not a library,
+    # not this module).
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(ROOT) and filename != __file__ and 'site-packages' not in filename:
+            return '%s:%d in %s' % (os.path.relpath(filename, ROOT), frame.f_lineno, frame.f_code.co_name)
+        frame = frame.f_back
+    return None
+
+
+class RequestProfile(object):
+
+    def __init__(self, top):
+        self.top = top
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.seconds = 0.0
+        self.slowest = []
+
+    def record(self, seconds, statement):
+        self.queries += 1
+        self.seconds += seconds
+        if len(self.slowest) < self.top or seconds > self.slowest[-1]['seconds']:
+            self.slowest.append({'seconds': seconds, 'statement': statement, 'site': call_site()})
+            self.slowest.sort(key=lambda entry: entry['seconds'], reverse=True)
+            del self.slowest[self.top:]
+
+    def summary(self):
+        return {
+            'queries': self.queries,
+            'db_ms': round(self.seconds * 1000, 2),
+            'total_ms': round((time.perf_counter() - self.start) * 1000, 2),
+            'slowest': [{
+                'ms': round(entry['seconds'] * 1000, 2),
+                'statement': ' '.join(entry['statement'].split()),
+                'site': entry['site'],
+            } for entry in self.slowest],
+        }
+
+
+class SQLProfiler(object):
+
+    def init_app(self, app, engine):
+        self.sample_rate = app.config['SQL_PROFILE_SAMPLE_RATE']
+        self.slow_seconds = app.config['SQL_SLOW_QUERY_MS'] / 1000.0
+        self.top = app.config['SQL_PROFILE_TOP']
+        self.panel = app.config['SQL_PROFILE_PANEL']
+        self.logger = app.logger.getChild('sql')
+        self.watch(engine)
+        app.before_request(self.before_request)
+        app.after_request(self.after_request)
+        app.extensions['sql_profiler'] = self
+
+    def watch(self, engine):
+        # Also called for the sync_engine of asgi.py's async engine.
+        event.listen(engine, 'before_cursor_execute', self.before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self.after_cursor_execute)
+        event.listen(engine, 'handle_error', self.handle_error)
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - conn.info['query_start'].pop()
+        profile = g.get('sql_profile') if has_request_context() else None
+        if profile is not None:
+            profile.record(seconds, statement)
+        if seconds >= self.slow_seconds:
+            self.logger.warning('slow query %.1f ms at %s: %s', seconds * 1000, call_site(), ' '.join(statement.split()))
+
+    def handle_error(self, exception_context):
+        # A failed statement gets no after_cursor_execute.
+        if exception_context.execution_context is not None and exception_context.connection is not None:
+            starts = exception_context.connection.info.get('query_start')
+            if starts:
+                starts.pop()
+
+    def before_request(self):
+        if self.sample_rate >= 1 or random.random() < self.sample_rate:
+            g.sql_profile = RequestProfile(self.top)
+
+    def after_request(self, response):
+        profile = g.get('sql_profile')
+        if profile is None:
+            return response
+        fields = {'method': request.method, 'path': request.path, 'endpoint': request.endpoint,
+                  'status': response.status_code}
+        if response.is_streamed:
+            # Streamed bodies run their queries after this point, so only
+            # the log line is written, once the response is closed.
+            response.call_on_close(lambda: self.log(profile.summary(), fields))
+            return response
+        summary = profile.summary()
+        response.headers.add('Server-Timing', 'db;dur=%.2f;desc="%d queries"' % (summary['db_ms'], summary['queries']))
+        response.headers.add('Server-Timing', 'app;dur=%.2f' % summary['total_ms'])
+        self.log(summary, fields)
+        if self.panel and response.mimetype == 'text/html':
+            html = response.get_data(as_text=True)
+            if '</body>' in html:
+                response.set_data(html.replace('</body>', panel_html(summary) + '</body>', 1))
+        return response
+
+    def log(self, summary, fields):
+        self.logger.info(json.dumps(dict(summary, **fields)))
+
+
+def panel_html(summary):
+    rows = ''.join('<tr><td>%.2f ms</td><td>%s</td><td><code>%s</code></td></tr>' % (
+        entry['ms'], escape(entry['site'] or ''), escape(entry['statement'])) for entry in summary['slowest'])
+    return ('<div id="sql-profile" style="position:fixed;bottom:0;left:0;right:0;max-height:40%%;overflow:auto;'
+            'background:#fff;border-top:2px solid #c00;font-size:12px;z-index:10000;padding:6px">'
+            '<strong>%d queries, %.2f ms in the database, %.2f ms total</strong>'
+            '<table class="table table-condensed">%s</table></div>') % (
+        summary['queries'], summary['db_ms'], summary['total_ms'], rows)
+
+
+profiler = SQLProfiler()
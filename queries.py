@@ -0,0 +1,447 @@
+import base64
+import binascii
+from datetime import datetime
+from functools import lru_cache, wraps
+from itertools import groupby
+
+from flask import abort, current_app
+from sqlalchemy.dialects.postgresql import array
+
+from models import db, Venue, Artist, Show, ShowRollover, venue_directory
+from search import apply_search, trigram_available
+
+#----------------------------------------------------------------------------#
+# Queries.
+#
+# Page data for the views, built with a fixed number of queries per page.
+#
+# The page queries are generators decorated with query_steps: they yield
+# each select() and are sent back its result, so the same code runs on the
+# Flask-SQLAlchemy session when called and, through .steps, on the asyncio
+# session of asgi.py.
+#----------------------------------------------------------------------------#
+
+
+def query_steps(fn):
+    @wraps(fn)
+    def run(*args, **kwargs):
+        steps = fn(*args, **kwargs)
+        try:
+            statement = next(steps)
+            while True:
+                statement = steps.send(db.session.execute(statement))
+        except StopIteration as stop:
+            return stop.value
+    run.steps = fn
+    return run
+
+
+def encode_cursor(start_time, show_id):
+    # Opaque keyset position: the (start_time, id) of the last row served.
+    return base64.urlsafe_b64encode(('%s|%d' % (start_time.isoformat(), show_id)).encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        start_time, show_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(start_time), int(show_id)
+    except (ValueError, UnicodeError, binascii.Error):
+        abort(400)
+
+
+#  Genres
+#  ----------------------------------------------------------------
+
+def genre_filter(model, genres, match='all'):
+    # Rows listing every one of `genres` (@>) or, with match='any', at least
+    # one of them (&&). Both are answered from the GIN index on the array
+    # (migration c02059de0fbf).
+    genres = db.cast(array(list(genres)), model.genres.type)
+    return model.genres.op('@>' if match == 'all' else '&&')(genres)
+
+
+@query_steps
+def genre_counts(model, genres=(), match='all', search_term=None):
+    # Rows per genre among the rows matching the filters, most common
+    # first, in one aggregate.
+    query = db.select(db.func.unnest(model.genres).label('genre'))
+    if genres:
+        query = query.where(genre_filter(model, genres, match))
+    if search_term:
+        full_text = current_app.config['FULL_TEXT_SEARCH'] and trigram_available(db.engine)
+        query = apply_search(query, model, search_term, full_text=full_text).order_by(None)
+    genre = query.subquery().c.genre
+    count = db.func.count().label('count')
+    rows = (yield db.select(genre, count).group_by(genre).order_by(count.desc(), genre)).all()
+    return [{'genre': row.genre, 'count': row.count} for row in rows]
+
+
+#  Venues
+#  ----------------------------------------------------------------
+
+def upcoming_shows_count(model, foreign_key, now):
+    # The counter kept by the Show triggers, less the shows that have
+    # started since the last rollover. Those are only counted, from the
+    # (<fk>, start_time) index, for rows whose next show time has passed.
+    rolled_at = db.select(ShowRollover.rolled_at).where(ShowRollover.id == 1).scalar_subquery()
+    started = db.select(db.func.count(Show.id)).where(
+        foreign_key == model.id, Show.start_time > rolled_at, Show.start_time <= now
+    ).correlate(model).scalar_subquery()
+    return db.case((model.next_show_time <= now, model.upcoming_shows_count - started),
+                   else_=model.upcoming_shows_count)
+
+
+def directory_rows(now):
+    # The same from the VenueDirectory view, correcting its counters for the
+    # shows started since the rollover they were copied at.
+    directory = venue_directory.c
+    started = db.select(db.func.count(Show.id)).where(
+        Show.venue_id == directory.venue_id, Show.start_time > directory.rolled_at, Show.start_time <= now
+    ).correlate(venue_directory).scalar_subquery()
+    upcoming = db.case((directory.next_show_time <= now, directory.upcoming_shows_count - started),
+                       else_=directory.upcoming_shows_count)
+    return db.select(
+        directory.city, directory.state, directory.venue_id.label('id'), directory.name, directory.updated_at,
+        upcoming.label('num_upcoming_shows')
+    ).order_by(directory.city, directory.state, directory.venue_id)
+
+
+def venue_rows(now):
+    return db.select(
+        Venue.city, Venue.state, Venue.id, Venue.name, Venue.updated_at,
+        upcoming_shows_count(Venue, Show.venue_id, now).label('num_upcoming_shows')
+    ).order_by(Venue.city, Venue.state, Venue.id)
+
+
+@query_steps
+def venue_areas(genres=(), match='all'):
+    # Every venue (with the genres, when given) with its upcoming show
+    # count, ordered so that venues in the same city/state are adjacent and
+    # can be grouped here.
+    now = datetime.today()
+    if current_app.config['VENUE_DIRECTORY_VIEW']:
+        query = directory_rows(now)
+        if genres:
+            # The view has no genres; the venue ids come from Venue's index.
+            query = query.where(venue_directory.c.venue_id.in_(
+                db.select(Venue.id).where(genre_filter(Venue, genres, match))))
+    else:
+        query = venue_rows(now)
+        if genres:
+            query = query.where(genre_filter(Venue, genres, match))
+    venueLists = (yield query).all()
+    data = []
+    for (city, state), rows in groupby(venueLists, key=lambda row: (row.city, row.state)):
+        values = {}
+        values['city'] = city
+        values['state'] = state
+        rows = list(rows)
+        values['venues'] = [{
+            'id': row.id,
+            'name': row.name,
+            'num_upcoming_shows': row.num_upcoming_shows,
+        } for row in rows]
+        # Fragment cache version: changes when a venue in the area is
+        # edited, added or removed.
+        values['version'] = '%s:%d' % (max(row.updated_at for row in rows).isoformat(),
+                                       hash(tuple(row.id for row in rows)))
+        data.append(values)
+    return data
+
+
+@query_steps
+def search_results(model, foreign_key, search_term, limit=None, offset=0, genres=(), match='all'):
+    # Matching rows with their upcoming show counts and the total number of
+    # matches (a window count), all in one query.
+    max_limit = current_app.config['SEARCH_RESULTS_LIMIT']
+    limit = max(min(limit or max_limit, max_limit), 1)
+    offset = max(offset or 0, 0)
+    query = db.select(
+        model.id, model.name,
+        upcoming_shows_count(model, foreign_key, datetime.today()).label('num_upcoming_shows'),
+        db.func.count().over().label('total')
+    )
+    if genres:
+        query = query.where(genre_filter(model, genres, match))
+    full_text = current_app.config['FULL_TEXT_SEARCH'] and trigram_available(db.engine)
+    query = apply_search(query, model, search_term, full_text=full_text)
+    rows = (yield query.limit(limit).offset(offset)).all()
+    data = [{
+        'id': row.id,
+        'name': row.name,
+        'num_upcoming_shows': row.num_upcoming_shows,
+    } for row in rows]
+    response = {
+        "count": rows[0].total if rows else 0,
+        "offset": offset,
+        "limit": limit,
+    }
+    response["data"] = data
+    return response
+
+
+#  Venue and artist pages
+#  ----------------------------------------------------------------
+
+def show_counts(foreign_key, entity_id, now):
+    # (upcoming, past) counts, read from the (<fk>, start_time) index.
+    return db.select(
+        db.func.count(Show.id).filter(Show.start_time >= now),
+        db.func.count(Show.id).filter(Show.start_time < now)
+    ).where(foreign_key == entity_id)
+
+
+def show_order(query, now, upcoming, after=None):
+    # Upcoming shows (soonest first) or past shows (most recent first),
+    # continuing after the (start_time, id) `after` when one is given.
+    if upcoming:
+        query = query.filter(Show.start_time >= now).order_by(Show.start_time, Show.id)
+        if after is not None:
+            query = query.filter(db.tuple_(Show.start_time, Show.id) > db.tuple_(*after))
+    else:
+        query = query.filter(Show.start_time < now).order_by(Show.start_time.desc(), Show.id.desc())
+        if after is not None:
+            query = query.filter(db.tuple_(Show.start_time, Show.id) < db.tuple_(*after))
+    return query
+
+
+def shows_page(query, now, upcoming, cursor):
+    # One page of upcoming or past shows, continuing after `cursor` when one
+    # is given. Runs as part of the page's steps, with `yield from`.
+    page_size = current_app.config['DETAIL_SHOWS_PAGE_SIZE']
+    query = show_order(query, now, upcoming, decode_cursor(cursor) if cursor else None)
+    rows = (yield query.limit(page_size + 1)).all()
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_cursor(rows[-1].start_time, rows[-1].id)
+    return rows, next_cursor
+
+
+@query_steps
+def venue_detail(venue_id, upcoming_cursor=None, past_cursor=None):
+    venuList = (yield db.select(Venue).where(Venue.id == venue_id)).scalar_one_or_none()
+    if venuList is None:
+        return None
+    now = datetime.today()
+    upcoming_count, past_count = (yield show_counts(Show.venue_id, venue_id, now)).one()
+    query = db.select(Show.id, Show.start_time, Artist.id.label('artist_id'), Artist.name.label('artist_name'),
+                      Artist.image_link.label('artist_image_link')).join(Artist).where(Show.venue_id == venue_id)
+    upcomingShows, upcoming_cursor = yield from shows_page(query, now, True, upcoming_cursor)
+    pastShows, past_cursor = yield from shows_page(query, now, False, past_cursor)
+    data = {
+        "id": venuList.id,
+        "name": venuList.name,
+        "genres": venuList.genres,
+        "address": venuList.address,
+        "city": venuList.city,
+        "state": venuList.state,
+        "phone": venuList.phone,
+        "website": venuList.website,
+        "facebook_link": venuList.facebook_link,
+        "seeking_talent": venuList.seeking_talent,
+        "seeking_description": venuList.seeking_description,
+        "image_link": venuList.image_link,
+        "past_shows_count": past_count,
+        "upcoming_shows_count": upcoming_count,
+        "past_shows_cursor": past_cursor,
+        "upcoming_shows_cursor": upcoming_cursor,
+    }
+    data["past_shows"] = [{
+        'artist_id': show.artist_id,
+        'artist_name': show.artist_name,
+        'artist_image_link': show.artist_image_link,
+        'start_time': show.start_time,
+    } for show in pastShows]
+    data["upcoming_shows"] = [{
+        'artist_id': show.artist_id,
+        'artist_name': show.artist_name,
+        'artist_image_link': show.artist_image_link,
+        'start_time': show.start_time,
+    } for show in upcomingShows]
+    return data
+
+
+@query_steps
+def artist_detail(artist_id, upcoming_cursor=None, past_cursor=None):
+    artistList = (yield db.select(Artist).where(Artist.id == artist_id)).scalar_one_or_none()
+    if artistList is None:
+        return None
+    now = datetime.today()
+    upcoming_count, past_count = (yield show_counts(Show.artist_id, artist_id, now)).one()
+    query = db.select(Show.id, Show.start_time, Venue.id.label('venue_id'), Venue.name.label('venue_name'),
+                      Venue.image_link.label('venue_image_link')).join(Venue).where(Show.artist_id == artist_id)
+    upcomingShows, upcoming_cursor = yield from shows_page(query, now, True, upcoming_cursor)
+    pastShows, past_cursor = yield from shows_page(query, now, False, past_cursor)
+    data = {
+        "id": artistList.id,
+        "name": artistList.name,
+        "genres": artistList.genres,
+        "city": artistList.city,
+        "state": artistList.state,
+        "phone": artistList.phone,
+        "website": artistList.website,
+        "facebook_link": artistList.facebook_link,
+        "seeking_venue": artistList.seeking_venue,
+        "seeking_description": artistList.seeking_description,
+        "image_link": artistList.image_link,
+        "past_shows_count": past_count,
+        "upcoming_shows_count": upcoming_count,
+        "past_shows_cursor": past_cursor,
+        "upcoming_shows_cursor": upcoming_cursor,
+    }
+    data["past_shows"] = [{
+        'venue_id': show.venue_id,
+        'venue_name': show.venue_name,
+        'venue_image_link': show.venue_image_link,
+        'start_time': show.start_time,
+    } for show in pastShows]
+    data["upcoming_shows"] = [{
+        'venue_id': show.venue_id,
+        'venue_name': show.venue_name,
+        'venue_image_link': show.venue_image_link,
+        'start_time': show.start_time,
+    } for show in upcomingShows]
+    return data
+
+
+# Venue pages list the artists playing there and artist pages list the
+# venues, so a venue or artist change also invalidates the pages that
+# show it.
+
+def artist_cache_keys(venue_id):
+    artist_ids = db.session.query(Show.artist_id).filter(Show.venue_id == venue_id).distinct()
+    return ['artist:%d' % artist_id for artist_id, in artist_ids]
+
+
+def venue_cache_keys(artist_id):
+    venue_ids = db.session.query(Show.venue_id).filter(Show.artist_id == artist_id).distinct()
+    return ['venue:%d' % venue_id for venue_id, in venue_ids]
+
+
+#  Shows
+#  ----------------------------------------------------------------
+
+def show_listing(upcoming=False, date_from=None, date_to=None):
+    # Shows in (start_time, id) order with the columns a show tile needs.
+    query = db.select(Show.id, Show.start_time, Show.updated_at, Venue.id.label('venue_id'), Venue.name.label('venue_name'),
+        Venue.updated_at.label('venue_updated_at'), Artist.id.label('artist_id'), Artist.name.label('artist_name'),
+        Artist.image_link.label('artist_image_link'), Artist.updated_at.label('artist_updated_at')).join(Venue).join(Artist)
+    if upcoming:
+        query = query.filter(Show.start_time > datetime.today())
+    if date_from is not None:
+        query = query.filter(Show.start_time >= date_from)
+    if date_to is not None:
+        query = query.filter(Show.start_time < date_to)
+    return query.order_by(Show.start_time, Show.id)
+
+
+@query_steps
+def listing_page(query, cursor, page_size):
+    if cursor:
+        query = query.filter(db.tuple_(Show.start_time, Show.id) > db.tuple_(*decode_cursor(cursor)))
+    rows = (yield query.limit(page_size + 1)).all()
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_cursor(rows[-1].start_time, rows[-1].id)
+    return rows, next_cursor
+
+
+def show_tile(show):
+    showList = {}
+    showList['id'] = show.id
+    showList['version'] = '%s:%s:%s' % (show.updated_at.isoformat(), show.artist_updated_at.isoformat(),
+                                         show.venue_updated_at.isoformat())
+    showList['venue_id'] = show.venue_id
+    showList['venue_name'] = show.venue_name
+    showList['artist_id'] = show.artist_id
+    showList['artist_name'] = show.artist_name
+    showList['artist_image_link'] = show.artist_image_link
+    showList['start_time'] = show.start_time
+    return showList
+
+
+#  Artists
+#  ----------------------------------------------------------------
+
+@query_steps
+def artist_list(genres=(), match='all'):
+    query = db.select(Artist.id, Artist.name)
+    if genres:
+        query = query.where(genre_filter(Artist, genres, match))
+    return (yield query.order_by(Artist.id)).all()
+
+
+#  Versions
+#  ----------------------------------------------------------------
+#
+# Cheap summaries of the rows behind a response, used as its ETag. Every
+# write bumps updated_at (migration f3fef88d77a1), including the Show
+# triggers' updates of the venue and artist counters, and deletes change
+# the counts. Upcoming counts also change as shows start: the rollover time
+# and the number of shows started since then cover that.
+
+def listing_version(*models):
+    now = datetime.today()
+    columns = []
+    for model in models:
+        columns.append(db.session.query(db.func.max(model.updated_at)).scalar_subquery())
+        columns.append(db.session.query(db.func.count(model.id)).scalar_subquery())
+    rolled_at = db.session.query(ShowRollover.rolled_at).filter(ShowRollover.id == 1).scalar_subquery()
+    columns.append(rolled_at)
+    columns.append(db.session.query(db.func.count(Show.id)).filter(
+        Show.start_time > rolled_at, Show.start_time <= now).scalar_subquery())
+    return tuple(db.session.query(*columns).one())
+
+
+def venue_areas_version():
+    if not current_app.config['VENUE_DIRECTORY_VIEW']:
+        return listing_version(Venue)
+    # The view's rows change only when it is refreshed, whatever happened
+    # to Venue since.
+    directory = venue_directory.c
+    rolled_at = db.session.query(db.func.max(directory.rolled_at)).scalar_subquery()
+    return tuple(db.session.query(
+        db.session.query(db.func.max(directory.updated_at)).scalar_subquery(),
+        db.session.query(db.func.count()).select_from(venue_directory).scalar_subquery(),
+        rolled_at,
+        db.session.query(db.func.count(Show.id)).filter(
+            Show.start_time > rolled_at, Show.start_time <= datetime.today()).scalar_subquery(),
+    ).one())
+
+
+@lru_cache(maxsize=None)
+def detail_version_query(model, related, foreign_key, related_key, upcoming_cursor=False, past_cursor=False):
+    # The version of :entity_id's page as of :now; foreign_key and
+    # related_key name Show's columns. The show counter triggers bump the
+    # row's updated_at whenever one of its shows is added, removed or moved,
+    # and the start of its next show changes when a show moves from upcoming
+    # to past. The related rows are read only for the :page_size shows
+    # listed, after :upcoming_start/:upcoming_id and :past_start/:past_id
+    # with cursors, so the cost doesn't grow with the show history.
+    foreign_key, related_key = getattr(Show, foreign_key), getattr(Show, related_key)
+    entity_id, now = db.bindparam('entity_id'), db.bindparam('now', type_=db.DateTime)
+    next_show = db.select(db.func.min(Show.start_time)).where(
+        foreign_key == entity_id, Show.start_time >= now).scalar_subquery()
+    shows = db.select(Show.id, related_key).where(foreign_key == entity_id)
+    pages = []
+    for name, cursor in (('upcoming', upcoming_cursor), ('past', past_cursor)):
+        after = (db.bindparam(name + '_start', type_=db.DateTime), db.bindparam(name + '_id')) if cursor else None
+        page = show_order(shows, now, name == 'upcoming', after).limit(db.bindparam('page_size')).subquery()
+        pages.append(db.select(db.func.max(related.updated_at)).where(
+            related.id.in_(db.select(page.c[related_key.key]))).scalar_subquery())
+    return db.select(model.updated_at, next_show, *pages).where(model.id == entity_id)
+
+
+def detail_version(model, foreign_key, related, related_key, entity_id, upcoming_cursor=None, past_cursor=None):
+    # None when the row doesn't exist.
+    params = {'entity_id': entity_id, 'now': datetime.today(),
+              'page_size': current_app.config['DETAIL_SHOWS_PAGE_SIZE']}
+    for name, cursor in (('upcoming', upcoming_cursor), ('past', past_cursor)):
+        if cursor:
+            params[name + '_start'], params[name + '_id'] = decode_cursor(cursor)
+    query = detail_version_query(model, related, foreign_key.key, related_key.key,
+                                 bool(upcoming_cursor), bool(past_cursor))
+    row = db.session.execute(query, params).one_or_none()
+    return tuple(row) if row is not None else None
@@ -0,0 +1,197 @@
+from datetime import datetime, time, timedelta
+from functools import lru_cache
+
+from flask import current_app
+from sqlalchemy import exc, update
+from sqlalchemy.dialects.postgresql import TSMULTIRANGE, aggregate_order_by, array
+
+from models import db, Venue, Artist, Show
+
+#----------------------------------------------------------------------------#
+# Show scheduling.
+#
+# A show books its venue and its artist for [start_time, end_time), kept in
+# the generated Show.slot. Two GiST exclusion constraints (migration
+# ba5eb47f7102) refuse a show whose slot overlaps another one's at the same
+# venue or with the same artist, however the row is written. Plain GiST
+# can't compare integers for equality without the btree_gist extension, so
+# the constraints compare each id as the one-point range [id, id]; the
+# queries here use the same expressions to reach their indexes.
+#
+# Shows that already overlapped when the constraints were added are marked
+# legacy_overlap and left out of them. The conflict query still reports
+# them, through a small index of their own.
+#----------------------------------------------------------------------------#
+
+# Length of a show given no end time; the migration's trigger uses the same.
+DEFAULT_LENGTH = timedelta(hours=2)
+
+# SQLSTATE of a row refused by an exclusion constraint.
+EXCLUSION_VIOLATION = '23P01'
+
+
+def id_point(value):
+    # [value, value]. The bounds are a literal rather than a parameter so
+    # that the expression matches the indexed one.
+    return db.func.int4range(value, value, db.literal_column("'[]'"))
+
+
+@lru_cache(maxsize=None)
+def conflicts_query(venue=True, artist=True, exclude=False):
+    # Shows at the venue and/or with the artist whose slot overlaps
+    # [:start_time, :end_time), one branch per partial index. A show that
+    # clashes on both counts comes back once for each. The names are joined
+    # once, outside the branches, which keeps the planning time down.
+    # Building the statement costs more than running it, so there is one
+    # per shape, with bind parameters.
+    slot = db.func.tsrange(db.bindparam('start_time'), db.bindparam('end_time'))
+    parts = []
+    for clash, foreign_key, wanted in (('venue', Show.venue_id, venue), ('artist', Show.artist_id, artist)):
+        if not wanted:
+            continue
+        for legacy in (db.not_(Show.legacy_overlap), Show.legacy_overlap):
+            query = db.select(db.literal(clash).label('clash'), Show.id, Show.start_time, Show.end_time,
+                              Show.venue_id, Show.artist_id).where(
+                id_point(foreign_key) == id_point(db.bindparam(clash + '_id')), Show.slot.op('&&')(slot), legacy)
+            if exclude:
+                query = query.where(Show.id != db.bindparam('exclude_id'))
+            parts.append(query)
+    shows = db.union_all(*parts).subquery()
+    return db.select(
+        shows.c.clash, shows.c.id, shows.c.start_time, shows.c.end_time,
+        shows.c.venue_id, Venue.name.label('venue_name'), shows.c.artist_id, Artist.name.label('artist_name')
+    ).join(Venue, Venue.id == shows.c.venue_id).join(Artist, Artist.id == shows.c.artist_id)
+
+
+def find_conflicts(venue_id, artist_id, start_time, end_time=None, exclude_id=None):
+    if end_time is None:
+        end_time = start_time + DEFAULT_LENGTH
+    if venue_id is None and artist_id is None:
+        return []
+    query = conflicts_query(venue_id is not None, artist_id is not None, exclude_id is not None)
+    rows = db.session.execute(query, {
+        'venue_id': venue_id, 'artist_id': artist_id, 'start_time': start_time, 'end_time': end_time,
+        'exclude_id': exclude_id,
+    }).all()
+    return [{
+        'clash': row.clash,
+        'show_id': row.id,
+        'start_time': row.start_time,
+        'end_time': row.end_time,
+        'venue_id': row.venue_id,
+        'venue_name': row.venue_name,
+        'artist_id': row.artist_id,
+        'artist_name': row.artist_name,
+    } for row in sorted(rows, key=lambda row: (row.start_time, row.id, row.clash))]
+
+
+def is_exclusion_violation(error):
+    # For a DBAPIError from psycopg2 (pgcode) or psycopg 3 (sqlstate).
+    orig = getattr(error, 'orig', error)
+    return (getattr(orig, 'pgcode', None) or getattr(orig, 'sqlstate', None)) == EXCLUSION_VIOLATION
+
+
+#  Availability
+#  ----------------------------------------------------------------
+#
+# A venue can be booked from BOOKING_HOURS[0] to BOOKING_HOURS[1] o'clock
+# each day. Its free slots over a date window are those hours, as one
+# multirange, minus the slots of its shows; both are worked out in the
+# database (range_agg and multirange arithmetic need PostgreSQL 14).
+
+@lru_cache(maxsize=None)
+def availability_query(city=False, state=False, genre=False):
+    # One row per venue with a free slot of at least :length between
+    # :first_day and :last_day, after :now, with the starts and ends of its
+    # free slots in order. The shows in the window are read once, from the
+    # slot index (migration 7048f87d72e6) without visiting the table, and
+    # hash joined to the venues.
+    opens, closes = db.bindparam('opens', type_=db.Interval), db.bindparam('closes', type_=db.Interval)
+    days = db.func.generate_series(db.bindparam('first_day', type_=db.DateTime),
+                                   db.bindparam('last_day', type_=db.DateTime),
+                                   db.literal_column("interval '1 day'")).table_valued('day', name='days').render_derived()
+    after_now = db.func.tsrange(db.bindparam('now', type_=db.DateTime), None)
+    hours = db.select(db.func.range_agg(db.func.tsrange(days.c.day + opens, days.c.day + closes).op('*')(after_now))) \
+        .select_from(days).scalar_subquery()
+    span = db.func.tsrange(db.bindparam('first_day') + opens, db.bindparam('last_day') + closes)
+    venues = []
+    if city:
+        venues.append(Venue.city == db.bindparam('city'))
+    if state:
+        venues.append(Venue.state == db.bindparam('state'))
+    if genre:
+        venues.append(Venue.genres.op('@>')(db.cast(array([db.bindparam('genre')]), Venue.genres.type)))
+    booked = db.select(Show.venue_id, db.func.range_agg(Show.slot).label('slots')).where(Show.slot.op('&&')(span))
+    if venues:
+        booked = booked.where(Show.venue_id.in_(db.select(Venue.id).where(*venues)))
+    booked = booked.group_by(Show.venue_id).subquery()
+    empty = db.cast(db.literal('{}'), TSMULTIRANGE)
+    free = db.func.unnest(hours.op('-')(db.func.coalesce(booked.c.slots, empty))).label('slot')
+    query = db.select(Venue.id, Venue.name, Venue.city, Venue.state, Venue.genres, free) \
+        .outerjoin(booked, booked.c.venue_id == Venue.id).where(*venues)
+    slots = query.subquery()
+    start, end = db.func.lower(slots.c.slot), db.func.upper(slots.c.slot)
+    venue = (slots.c.id, slots.c.name, slots.c.city, slots.c.state, slots.c.genres)
+    return db.select(
+        *venue,
+        db.func.array_agg(aggregate_order_by(start, start)).label('starts'),
+        db.func.array_agg(aggregate_order_by(end, start)).label('ends'),
+    ).where(end - start >= db.bindparam('length', type_=db.Interval)).group_by(*venue) \
+        .order_by(slots.c.name, slots.c.id).limit(db.bindparam('limit')).offset(db.bindparam('offset'))
+
+
+def availability(first_day, last_day, city=None, state=None, genre=None, length=DEFAULT_LENGTH, limit=None,
+                 offset=0):
+    # Venues with a slot of at least `length` free between first_day and
+    # last_day (dates), and their free slots.
+    opens, closes = current_app.config['BOOKING_HOURS']
+    max_limit = current_app.config['AVAILABILITY_RESULTS_LIMIT']
+    limit = max(min(limit or max_limit, max_limit), 1)
+    offset = max(offset or 0, 0)
+    query = availability_query(city is not None, state is not None, genre is not None)
+    rows = db.session.execute(query, {
+        'first_day': datetime.combine(first_day, time()), 'last_day': datetime.combine(last_day, time()),
+        'opens': timedelta(hours=opens), 'closes': timedelta(hours=closes), 'now': datetime.today(),
+        'city': city, 'state': state, 'genre': genre, 'length': length,
+        'limit': limit, 'offset': offset,
+    }).all()
+    return [{
+        'venue_id': row.id,
+        'venue_name': row.name,
+        'city': row.city,
+        'state': row.state,
+        'genres': row.genres,
+        'free': [{'start': start, 'end': end} for start, end in zip(row.starts, row.ends)],
+    } for row in rows]
+
+
+#  Shows left out of the constraints
+#  ----------------------------------------------------------------
+
+def legacy_overlaps(limit=None):
+    # (show, conflicts) for the legacy_overlap shows, soonest first.
+    shows = Show.query.filter(Show.legacy_overlap).order_by(Show.start_time, Show.id).limit(limit).all()
+    return [(show, find_conflicts(show.venue_id, show.artist_id, show.start_time, show.end_time, exclude_id=show.id))
+            for show in shows]
+
+
+def recheck_legacy(batch_size=500):
+    # Puts each legacy show back under the constraints, unless it still
+    # overlaps a show that is. Returns (cleared, remaining). Each savepoint
+    # holds on to its locks until the transaction ends, so the work is
+    # committed in batches.
+    show_ids = [show_id for show_id, in db.session.query(Show.id).filter(Show.legacy_overlap)
+                .order_by(Show.start_time, Show.id)]
+    cleared = 0
+    for number, show_id in enumerate(show_ids, 1):
+        if number % batch_size == 0:
+            db.session.commit()
+        try:
+            with db.session.begin_nested():
+                db.session.execute(update(Show).where(Show.id == show_id).values(legacy_overlap=False))
+            cleared += 1
+        except exc.IntegrityError as e:
+            if not is_exclusion_violation(e):
+                raise
+    db.session.commit()
+    return cleared, len(show_ids) - cleared
@@ -0,0 +1,42 @@
+import re
+from functools import lru_cache
+
+from sqlalchemy import func, or_, text
+
+#----------------------------------------------------------------------------#
+# Venue/Artist name search.
+#
+# With pg_trgm installed (see migration b99a6c45c3d3) a search matches the
+# weighted name/city/genres tsvector by word prefix, or the name by substring
+# through the trigram index, and ranks the matches. Without it the search is
+# the plain ILIKE substring match ordered by id.
+#----------------------------------------------------------------------------#
+
+
+@lru_cache(maxsize=None)
+def trigram_available(engine):
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")).scalar() is not None
+
+
+def prefix_tsquery(search_term):
+    # "blue no" -> "blue:* & no:*", so partially typed words still match.
+    words = re.findall(r'\w+', search_term.lower())
+    return ' & '.join(word + ':*' for word in words)
+
+
+def apply_search(query, model, search_term, full_text=True):
+    # Works on a Query or a select(); pass full_text only when
+    # trigram_available().
+    name_match = model.name.ilike('%' + search_term + '%')
+    if not full_text:
+        return query.filter(name_match).order_by(model.id)
+
+    rank = func.similarity(model.name, search_term)
+    conditions = [name_match]
+    tsquery = prefix_tsquery(search_term)
+    if tsquery:
+        tsquery = func.to_tsquery('simple', tsquery)
+        conditions.append(model.search_vector.op('@@')(tsquery))
+        rank = rank + func.ts_rank(model.search_vector, tsquery)
+    return query.filter(or_(*conditions)).order_by(rank.desc(), model.id)
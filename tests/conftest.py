@@ -0,0 +1,105 @@
+"""Fixtures for the tests that need PostgreSQL.
+
+    TEST_DATABASE_URL=postgresql://localhost/fyyur_test python -m pytest
+
+The database is migrated to head and its venues, artists and shows are
+replaced by a seeded catalogue, so point TEST_DATABASE_URL at one kept for
+the tests. Without it those tests are skipped.
+"""
+import os
+
+import pytest
+
+import config
+
+TEST_DATABASE_URL = os.environ.get('TEST_DATABASE_URL')
+MIGRATIONS = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'migrations')
+
+# Enough shows that the planner prefers the indexes to reading all of Show.
+CATALOGUE = {'venue_count': 1000, 'city_count': 25, 'artist_count': 2000, 'show_count': 20000}
+
+
+def load_catalogue(**catalogue):
+    # Replaces the venues, artists and shows with a benchmarks.seed catalogue.
+    from benchmarks.seed import seed
+    from directory import refresh_directory
+    from models import db
+
+    db.session.execute(db.text('TRUNCATE "Show", "Venue", "Artist" RESTART IDENTITY CASCADE'))
+    seed(**catalogue)
+    db.session.execute(db.text('ANALYZE "Venue", "Artist", "Show"'))
+    db.session.commit()
+    refresh_directory(wait=True)
+
+
+# Columns for the venues and artists tests add of their own.
+NEW_ENTITY = {
+    'Venue': {
+        'name': 'Test Venue', 'city': 'Austin', 'state': 'TX', 'address': '1 Test St', 'phone': '5125550100',
+        'genres': ['Jazz'], 'image_link': 'https://images.example.com/test.jpg',
+        'facebook_link': 'https://www.facebook.com/test',
+    },
+    'Artist': {
+        'name': 'Test Artist', 'city': 'Austin', 'state': 'TX', 'phone': '5125550100', 'genres': ['Jazz'],
+        'image_link': 'https://images.example.com/test.jpg',
+    },
+}
+
+
+def settings():
+    # config.py against the test database, without caches, so every request
+    # issues the queries it would on a cold cache.
+    settings = type('TestConfig', (), {name: getattr(config, name) for name in dir(config) if name.isupper()})
+    settings.TESTING = True
+    settings.SQLALCHEMY_DATABASE_URI = TEST_DATABASE_URL
+    settings.CACHE_TTL = 0
+    settings.FRAGMENT_CACHE_ENABLED = False
+    settings.LOG_FILE = None
+    return settings
+
+
+@pytest.fixture(scope='session')
+def app():
+    if not TEST_DATABASE_URL:
+        pytest.skip('TEST_DATABASE_URL is not set')
+    from flask_migrate import Migrate, upgrade
+
+    from app import create_app
+    from models import db
+
+    app = create_app(settings())
+    Migrate(app, db, directory=MIGRATIONS)
+    with app.app_context():
+        upgrade()
+        load_catalogue(**CATALOGUE)
+        db.session.remove()
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def add_entity(app):
+    # add_entity(Venue, name=...) commits a new venue or artist and returns
+    # its id; they are deleted with their shows after the test.
+    from models import db, Show
+
+    added = []
+
+    def add(model, **columns):
+        entity = model(**dict(NEW_ENTITY[model.__name__], **columns))
+        db.session.add(entity)
+        db.session.commit()
+        added.append((model, entity.id))
+        return entity.id
+
+    yield add
+    with app.app_context():
+        for model, entity_id in reversed(added):
+            foreign_key = Show.venue_id if model.__name__ == 'Venue' else Show.artist_id
+            db.session.query(Show).filter(foreign_key == entity_id).delete(synchronize_session=False)
+            db.session.query(model).filter(model.id == entity_id).delete(synchronize_session=False)
+        db.session.commit()
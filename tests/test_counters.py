@@ -0,0 +1,75 @@
+"""The Show triggers keep the venue and artist counters exact, rollover
+moves started shows into the past, and check-counters repairs drift."""
+import time
+from datetime import datetime, timedelta
+
+from counters import check_counters, rollover
+from models import db, Venue, Artist, Show
+
+NO_MISMATCHES = {'venues': [], 'artists': []}
+
+
+def counters(model, entity_id):
+    # (upcoming, past, next show time) as stored.
+    return db.session.query(model.upcoming_shows_count, model.past_shows_count, model.next_show_time).filter(
+        model.id == entity_id).one()
+
+
+def test_triggers(app, add_entity):
+    with app.app_context():
+        rollover()
+        now = datetime.today().replace(microsecond=0)
+        venue_id, other_venue_id = add_entity(Venue), add_entity(Venue, name='Other Test Venue')
+        artist_id = add_entity(Artist)
+        soon, later, earlier = now + timedelta(days=1), now + timedelta(days=3), now - timedelta(days=3)
+        shows = [Show(venue_id=venue_id, artist_id=artist_id, start_time=start) for start in (soon, later, earlier)]
+        db.session.add_all(shows)
+        db.session.commit()
+        assert counters(Venue, venue_id) == (2, 1, soon)
+        assert counters(Artist, artist_id) == (2, 1, soon)
+
+        # Into the past, and to another venue.
+        shows[0].start_time = now - timedelta(days=1)
+        shows[1].venue_id = other_venue_id
+        db.session.commit()
+        assert counters(Venue, venue_id) == (0, 2, None)
+        assert counters(Venue, other_venue_id) == (1, 0, later)
+        assert counters(Artist, artist_id) == (1, 2, later)
+
+        db.session.delete(shows[2])
+        db.session.commit()
+        assert counters(Venue, venue_id) == (0, 1, None)
+        assert counters(Artist, artist_id) == (1, 1, later)
+        assert check_counters() == NO_MISMATCHES
+
+
+def test_rollover(app, add_entity):
+    with app.app_context():
+        rollover()
+        venue_id, artist_id = add_entity(Venue), add_entity(Artist)
+        start = datetime.today() + timedelta(seconds=1)
+        db.session.add(Show(venue_id=venue_id, artist_id=artist_id, start_time=start))
+        db.session.commit()
+        assert counters(Venue, venue_id) == (1, 0, start)
+
+        time.sleep(1.5)
+        assert rollover()['venues'] >= 1
+        assert counters(Venue, venue_id) == (0, 1, None)
+        assert counters(Artist, artist_id) == (0, 1, None)
+        assert check_counters() == NO_MISMATCHES
+
+
+def test_check_counters_repairs_drift(app, add_entity):
+    with app.app_context():
+        venue_id, artist_id = add_entity(Venue), add_entity(Artist)
+        start = datetime.today().replace(microsecond=0) + timedelta(days=2)
+        db.session.add(Show(venue_id=venue_id, artist_id=artist_id, start_time=start))
+        db.session.commit()
+        db.session.query(Venue).filter(Venue.id == venue_id).update(
+            {Venue.upcoming_shows_count: 5}, synchronize_session=False)
+        db.session.commit()
+
+        assert check_counters() == {'venues': [(venue_id, (5, 0, start), (1, 0, start))], 'artists': []}
+        check_counters(fix=True)
+        assert check_counters() == NO_MISMATCHES
+        assert counters(Venue, venue_id) == (1, 0, start)
@@ -0,0 +1,51 @@
+"""Venues are geocoded from the gazetteer, and the nearby searches find
+exactly the venues in range, nearest first, across the antimeridian too."""
+import pytest
+
+import geo
+from models import db, Venue
+
+
+def test_locate():
+    assert geo.locate('Saint Louis', 'mo') == geo.locate('St. Louis', 'MO') == (38.627, -90.1994)
+    assert geo.locate('Atlantis', 'TX') is None
+
+
+def test_geocode_venues(app, add_entity):
+    with app.app_context():
+        venue_id = add_entity(Venue)
+        placed_id = add_entity(Venue, name='Placed Test Venue', latitude=30.3, longitude=-97.7)
+        nowhere_id = add_entity(Venue, name='Nowhere Test Venue', city='Atlantis')
+        geocoded, missing = geo.geocode_venues()
+        assert geocoded >= 1 and missing[('Atlantis', 'TX')] == 1
+        assert db.session.query(Venue.latitude, Venue.longitude).filter(Venue.id == venue_id).one() \
+            == geo.locate('Austin', 'TX')
+        assert db.session.query(Venue.latitude, Venue.longitude).filter(Venue.id == placed_id).one() == (30.3, -97.7)
+        assert db.session.query(Venue.latitude).filter(Venue.id == nowhere_id).scalar() is None
+
+
+@pytest.fixture
+def pacific_venues(app, add_entity):
+    # Around (0, 180), far from the seeded venues: two either side of the
+    # antimeridian, about 11 km apart, one 60 km away and one 1500 km.
+    with app.app_context():
+        return [add_entity(Venue, name='Pacific Venue %d' % number, latitude=latitude, longitude=longitude)
+                for number, (latitude, longitude) in enumerate([
+                    (0.0, 179.95), (0.0, -179.95), (0.5, 179.7), (10.0, 175.0)], 1)]
+
+
+def test_venues_within(app, pacific_venues):
+    with app.app_context():
+        within = [venue['venue_id'] for venue in geo.venues_within(0.0, 179.99, 20)]
+        assert within == pacific_venues[:2]
+        within = [venue['venue_id'] for venue in geo.venues_within(0.0, -179.99, 100)]
+        assert within == [pacific_venues[1], pacific_venues[0], pacific_venues[2]]
+
+
+def test_nearest_venues(app, client, pacific_venues):
+    response = client.get('/api/v1/venues/nearby?lat=0&lng=179.99&limit=4')
+    assert response.status_code == 200
+    data = response.get_json()['data']
+    assert [venue['venue_id'] for venue in data] == pacific_venues
+    assert data[0]['distance_km'] == pytest.approx(4.45, abs=0.01)
+    assert client.get('/api/v1/venues/nearby?lat=91&lng=0').status_code == 400
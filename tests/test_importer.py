@@ -0,0 +1,87 @@
+"""`flask fyyur import` reports the rows it rejects, and an interrupted
+import resumes after its last committed batch."""
+import json
+
+import pytest
+
+import importer
+from models import db, Artist, ImportCheckpoint
+
+
+class Interrupted(Exception):
+    pass
+
+
+def artist(number, **fields):
+    row = {
+        'name': 'Imported Artist %d' % number, 'city': 'Austin', 'state': 'TX', 'phone': '5125550100',
+        'genres': ['Jazz', 'Blues'], 'image_link': 'https://images.example.com/imported/%d.jpg' % number,
+        'facebook_link': 'https://www.facebook.com/imported%d' % number,
+        'website': 'https://imported%d.example.com' % number,
+    }
+    row.update(fields)
+    return row
+
+
+def imported():
+    return [name for name, in db.session.query(Artist.name).filter(Artist.name.like('Imported %')).order_by(Artist.id)]
+
+
+@pytest.fixture
+def rows_file(app, tmp_path):
+    path = tmp_path / 'artists.jsonl'
+
+    def write(rows):
+        path.write_text(''.join((row if isinstance(row, str) else json.dumps(row)) + '\n' for row in rows))
+        return str(path)
+
+    yield write
+    with app.app_context():
+        db.session.query(Artist).filter(Artist.name.like('Imported %')).delete(synchronize_session=False)
+        db.session.query(ImportCheckpoint).delete()
+        db.session.commit()
+
+
+def test_rejected_rows(app, rows_file):
+    path = rows_file([
+        artist(1),
+        artist(2, phone='555-0100'),
+        'not json',
+        # Passes the form but not the column's 120 characters, so only the
+        # database refuses it, and the batch is retried row by row.
+        artist(4, facebook_link='https://www.facebook.com/' + 'x' * 120),
+        artist(5),
+    ])
+    errors = {}
+    with app.app_context():
+        checkpoint = importer.run_import('artists', path, on_error=errors.__setitem__)
+        assert (checkpoint.position, checkpoint.imported, checkpoint.rejected) == (5, 2, 3)
+        assert imported() == ['Imported Artist 1', 'Imported Artist 5']
+    assert sorted(errors) == [2, 3, 4]
+    assert errors[2] == {'phone': ['Invalid phone number.']}
+    assert errors[3] == {'row': ['Not a JSON object.']}
+    assert 'too long' in errors[4]['row'][0]
+
+
+def test_resume(app, rows_file, monkeypatch):
+    path = rows_file([artist(number) for number in range(1, 8)])
+    validate = importer.validate
+    batches = []
+
+    def interrupted(kind, rows):
+        batches.append(rows)
+        if len(batches) == 2:
+            raise Interrupted
+        return validate(kind, rows)
+
+    with app.app_context():
+        monkeypatch.setattr(importer, 'validate', interrupted)
+        with pytest.raises(Interrupted):
+            importer.run_import('artists', path, batch_size=3)
+        db.session.rollback()
+        assert imported() == ['Imported Artist %d' % number for number in range(1, 4)]
+
+        monkeypatch.setattr(importer, 'validate', validate)
+        checkpoint = importer.run_import('artists', path, batch_size=3)
+        assert (checkpoint.position, checkpoint.imported, checkpoint.finished) == (7, 7, True)
+        assert imported() == ['Imported Artist %d' % number for number in range(1, 8)]
@@ -0,0 +1,160 @@
+"""Each queued job runs once however many workers poll, failures are retried
+until they run out of attempts, and a job whose claim lapsed is taken over."""
+import threading
+from collections import Counter
+
+import pytest
+
+import jobs
+from models import db, Job
+
+
+@pytest.fixture
+def queue(app, monkeypatch):
+    # An empty Job table, no scheduled jobs, retries due at once, and
+    # test_* handlers that record the payloads they were run with.
+    monkeypatch.setitem(app.config, 'JOB_SCHEDULE', {})
+    monkeypatch.setitem(app.config, 'JOB_RETRY_DELAY', 0)
+    monkeypatch.setitem(app.config, 'JOB_MAX_ATTEMPTS', 2)
+    runs = []
+    lock = threading.Lock()
+
+    def record(**payload):
+        with lock:
+            runs.append(payload)
+
+    def fail(**payload):
+        record(**payload)
+        raise RuntimeError('test failure')
+
+    monkeypatch.setitem(jobs.HANDLERS, 'test_record', record)
+    monkeypatch.setitem(jobs.HANDLERS, 'test_fail', fail)
+    with app.app_context():
+        db.session.query(Job).delete()
+        db.session.commit()
+    yield runs
+    with app.app_context():
+        db.session.query(Job).delete()
+        db.session.commit()
+
+
+def job_states():
+    return [(job.kind, job.status, job.attempts) for job in db.session.query(Job).order_by(Job.id)]
+
+
+def test_each_job_runs_once(app, queue):
+    with app.app_context():
+        for number in range(200):
+            jobs.enqueue('test_record', {'number': number})
+        db.session.commit()
+
+    done = []
+
+    def worker():
+        with app.app_context():
+            done.append(jobs.work(burst=True))
+
+    workers = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+
+    assert sum(done) == 200
+    assert Counter(run['number'] for run in queue) == Counter(range(200))
+    with app.app_context():
+        assert set(job_states()) == {('test_record', 'done', 1)}
+
+
+def test_keyed_jobs_queue_once(app, queue):
+    with app.app_context():
+        for _ in range(3):
+            jobs.enqueue('test_record', key='once')
+            db.session.commit()
+        assert jobs.work(burst=True) == 1
+        # Queued again once the last one has run.
+        jobs.enqueue('test_record', key='once')
+        db.session.commit()
+        assert job_states() == [('test_record', 'done', 1), ('test_record', 'queued', 0)]
+
+
+def test_retries_then_fails(app, queue):
+    with app.app_context():
+        jobs.enqueue('test_fail', max_attempts=3)
+        db.session.commit()
+        assert jobs.work(burst=True) == 3
+        job = db.session.query(Job).one()
+        assert (job.status, job.attempts) == ('failed', 3)
+        assert 'RuntimeError: test failure' in job.last_error
+
+        # Retried with JOB_MAX_ATTEMPTS more.
+        assert jobs.retry_failed() == 1
+        assert job_states() == [('test_fail', 'queued', 3)]
+        assert jobs.work(burst=True) == 2
+        assert job_states() == [('test_fail', 'failed', 5)]
+    assert len(queue) == 5
+
+
+def test_lapsed_claim_is_taken_over(app, queue):
+    with app.app_context():
+        jobs.enqueue('test_record', max_attempts=2)
+        db.session.commit()
+        # A worker claims the job and dies; its claim lapses.
+        assert jobs.claim('dead-worker') is not None
+        db.session.query(Job).update({Job.run_at: db.func.now() - db.text("interval '1 second'")},
+                                     synchronize_session=False)
+        db.session.commit()
+
+        assert jobs.work(burst=True) == 1
+        job = db.session.query(Job).one()
+        assert (job.status, job.attempts) == ('done', 2)
+        assert job.worker != 'dead-worker'
+    assert len(queue) == 1
+
+
+def test_gives_up_on_a_job_whose_claims_keep_lapsing(app, queue):
+    with app.app_context():
+        jobs.enqueue('test_record', max_attempts=1)
+        db.session.commit()
+        assert jobs.claim('dead-worker') is not None
+        db.session.query(Job).update({Job.run_at: db.func.now() - db.text("interval '1 second'")},
+                                     synchronize_session=False)
+        db.session.commit()
+
+        assert jobs.work(burst=True) == 1
+        job = db.session.query(Job).one()
+        assert (job.status, job.attempts) == ('failed', 2)
+        assert 'never finished' in job.last_error
+    assert queue == []
+
+
+def test_late_outcome_of_a_lapsed_claim_is_dropped(app, queue):
+    with app.app_context():
+        jobs.enqueue('test_record')
+        db.session.commit()
+        late = jobs.claim('slow-worker')
+        db.session.query(Job).update({Job.run_at: db.func.now() - db.text("interval '1 second'")},
+                                     synchronize_session=False)
+        db.session.commit()
+        assert jobs.work(burst=True) == 1
+
+        # The first worker finally fails; the run that took over stands.
+        assert not jobs.finish(late, 'failed', 'too late')
+        assert job_states() == [('test_record', 'done', 2)]
+
+
+def test_metrics_job_gauges(app, queue):
+    from conftest import settings
+    from app import create_app
+
+    queued = settings()
+    queued.JOB_QUEUE = True
+    queued_app = create_app(queued)
+    with queued_app.app_context():
+        jobs.enqueue('test_record')
+        db.session.commit()
+        client = queued_app.test_client()
+        body = client.get('/metrics').get_data(as_text=True)
+        assert 'fyyur_jobs{kind="test_record",status="queued"} 1.0' in body
+        # The scrape's statement_timeout stays on its own connection.
+        assert db.session.execute(db.text('SHOW statement_timeout')).scalar() != '2s'
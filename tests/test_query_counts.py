@@ -0,0 +1,68 @@
+"""Pages issue a fixed number of statements however many rows they show."""
+import pytest
+from sqlalchemy import event
+
+from conftest import CATALOGUE, load_catalogue
+from models import db, Venue, Artist, Show
+
+# Statements per page: /venues reads the venue directory and the genre
+# facets; a detail page reads its row, its show counts and one page each
+# of upcoming and past shows.
+PAGE_QUERIES = {
+    'venues': 2,
+    'venue': 4,
+    'artist': 4,
+}
+
+SMALL_CATALOGUE = {'venue_count': 20, 'city_count': 5, 'artist_count': 40, 'show_count': 200}
+
+
+def busiest_and_quietest(model, foreign_key):
+    # The ids with the most shows and with the fewest, possibly none.
+    shows = db.select(db.func.count(Show.id)).where(foreign_key == model.id).scalar_subquery()
+    busiest = db.session.query(model.id).order_by(shows.desc(), model.id).limit(1).scalar()
+    quietest = db.session.query(model.id).order_by(shows, model.id).limit(1).scalar()
+    assert db.session.query(Show).filter(foreign_key == busiest).count() > 50
+    return busiest, quietest
+
+
+def statements(app, client, path):
+    # Statements issued by a GET of path, after one to warm up.
+    response = client.get(path)
+    assert response.status_code == 200
+    issued = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        issued.append(statement)
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', count)
+        try:
+            response = client.get(path)
+            assert response.status_code == 200
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', count)
+    return len(issued)
+
+
+def test_venues_page(app, client):
+    # The same count for 20 venues and for 1000: no query per area or venue.
+    counts = []
+    for catalogue in (SMALL_CATALOGUE, CATALOGUE):
+        with app.app_context():
+            load_catalogue(**catalogue)
+        counts.append(statements(app, client, '/venues'))
+    assert counts == [PAGE_QUERIES['venues']] * 2
+
+
+@pytest.mark.parametrize('page, model, foreign_key', [
+    ('venue', Venue, Show.venue_id),
+    ('artist', Artist, Show.artist_id),
+])
+def test_detail_pages(app, client, page, model, foreign_key):
+    with app.app_context():
+        ids = busiest_and_quietest(model, foreign_key)
+        db.session.remove()
+    for entity_id in ids:
+        path = '/%ss/%d' % (page, entity_id)
+        assert statements(app, client, path) == PAGE_QUERIES[page], path
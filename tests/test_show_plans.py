@@ -0,0 +1,57 @@
+"""/shows and the venue and artist pages read Show through its indexes.
+
+Each page is rendered once to capture the statements it issues; those that
+read Show are then EXPLAINed with the same parameters, and a sequential
+scan of Show fails the test.
+"""
+import pytest
+from sqlalchemy import event
+
+from models import db, Venue, Artist, Show
+
+PAGES = ['/shows', '/shows?upcoming=1']
+
+
+def busiest(model, foreign_key):
+    shows = db.select(db.func.count(Show.id)).where(foreign_key == model.id).scalar_subquery()
+    return db.session.query(model.id).order_by(shows.desc(), model.id).limit(1).scalar()
+
+
+def captured_statements(app, client, path):
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if '"Show"' in statement:
+            statements.append((statement, parameters))
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', capture)
+        try:
+            response = client.get(path)
+            assert response.status_code == 200
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', capture)
+    return statements
+
+
+def plans(app, statements):
+    with app.app_context():
+        with db.engine.connect() as conn:
+            for statement, parameters in statements:
+                yield statement, '\n'.join(row[0] for row in conn.exec_driver_sql('EXPLAIN ' + statement, parameters))
+
+
+@pytest.fixture(scope='module')
+def pages(app):
+    with app.app_context():
+        venue_id, artist_id = busiest(Venue, Show.venue_id), busiest(Artist, Show.artist_id)
+        db.session.remove()
+    return PAGES + ['/venues/%d' % venue_id, '/artists/%d' % artist_id]
+
+
+def test_no_seq_scan_on_show(app, client, pages):
+    for path in pages:
+        statements = captured_statements(app, client, path)
+        assert statements, path
+        for statement, plan in plans(app, statements):
+            assert 'Seq Scan on "Show"' not in plan, '%s\n%s\n%s' % (path, statement, plan)
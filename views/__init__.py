@@ -0,0 +1,25 @@
+from flask import abort, request
+
+#----------------------------------------------------------------------------#
+# Controllers.
+#----------------------------------------------------------------------------#
+
+
+def register_blueprints(app):
+    from views import main, venues, artists, shows, api
+    app.register_blueprint(main.bp)
+    app.register_blueprint(venues.bp)
+    app.register_blueprint(artists.bp)
+    app.register_blueprint(shows.bp)
+    app.register_blueprint(api.bp)
+
+
+def genre_filters():
+    # The genre filters of a listing or search, from the query string or
+    # the form: the genres asked for (genre=, repeated) and whether a row
+    # needs all of them (match=all, the default) or any.
+    genres = tuple(genre for genre in request.values.getlist('genre') if genre)
+    match = request.values.get('match', 'all')
+    if match not in ('all', 'any'):
+        abort(400, 'match must be all or any.')
+    return genres, match
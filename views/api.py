@@ -0,0 +1,277 @@
+import hashlib
+import json
+from datetime import date, datetime, timedelta
+
+from flask import Blueprint, Response, current_app, request, abort, stream_with_context
+
+from cache import detail_cache
+from models import Venue, Artist, Show
+import geo
+import queries
+import scheduling
+from views import genre_filters
+from views.shows import listing_filters
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+bp = Blueprint('api', __name__, url_prefix='/api/v1')
+
+
+#----------------------------------------------------------------------------#
+# JSON API.
+#
+# Each response carries a weak ETag computed from a version query (see
+# queries.listing_version/detail_version), which is checked against
+# If-None-Match before the body is built, so polling an unchanged resource
+# costs one small query and an empty 304.
+#----------------------------------------------------------------------------#
+
+
+def dumps(data):
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(',', ':'), default=datetime.isoformat)
+
+
+def version_tag(version):
+    return hashlib.sha1(repr(version).encode()).hexdigest()[:20]
+
+
+def conditional(version, build):
+    etag = version_tag(version)
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        response = Response(dumps(build()), mimetype='application/json')
+    response.set_etag(etag, weak=True)
+    # Clients may keep the response but must revalidate it on every use.
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+@bp.errorhandler(400)
+@bp.errorhandler(404)
+def api_error(error):
+    return Response(dumps({'error': error.description}), status=error.code, mimetype='application/json')
+
+
+#  Venues
+#  ----------------------------------------------------------------
+
+@bp.route('/venues')
+def venues():
+    genres, match = genre_filters()
+
+    def build():
+        return {'data': [{
+            'city': area['city'],
+            'state': area['state'],
+            'venues': area['venues'],
+        } for area in queries.venue_areas(genres, match)]}
+    return conditional(queries.venue_areas_version(), build)
+
+
+@bp.route('/venues/genres')
+def venue_genres():
+    return genre_facets(Venue)
+
+
+@bp.route('/venues/nearby')
+def venues_nearby():
+    # The venues nearest to lat, lng, or given a radius in km, the ones
+    # within it, nearest first.
+    latitude = request.args.get('lat', type=float)
+    longitude = request.args.get('lng', type=float)
+    if latitude is None or longitude is None:
+        abort(400, 'Give lat and lng.')
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        abort(400, 'lat must be between -90 and 90, and lng between -180 and 180.')
+    radius = request.args.get('radius', type=float)
+    if radius is not None and not radius > 0:
+        abort(400, 'radius must be a positive number of km.')
+    limit = request.args.get('limit', type=int)
+    if radius is None:
+        data = geo.nearest_venues(latitude, longitude, limit)
+    else:
+        data = geo.venues_within(latitude, longitude, radius, limit)
+    return Response(dumps({'data': data}), mimetype='application/json', headers={'Cache-Control': 'no-store'})
+
+
+@bp.route('/venues/<int:venue_id>')
+def venue(venue_id):
+    upcoming_cursor = request.args.get('upcoming_cursor')
+    past_cursor = request.args.get('past_cursor')
+    version = queries.detail_version(Venue, Show.venue_id, Artist, Show.artist_id, venue_id, upcoming_cursor, past_cursor)
+    if version is None:
+        abort(404)
+
+    def build():
+        if upcoming_cursor or past_cursor:
+            data = queries.venue_detail(venue_id, upcoming_cursor, past_cursor)
+        else:
+            # Keyed by version: a copy cached before a write, here or in
+            # another worker, is never served under the new ETag.
+            data = detail_cache.get_or_build('venue:%d:%s' % (venue_id, version_tag(version)),
+                                             lambda: queries.venue_detail(venue_id))
+        if data is None:
+            abort(404)
+        return data
+    return conditional(version, build)
+
+
+#  Artists
+#  ----------------------------------------------------------------
+
+@bp.route('/artists')
+def artists():
+    genres, match = genre_filters()
+
+    def build():
+        return {'data': [{'id': row.id, 'name': row.name} for row in queries.artist_list(genres, match)]}
+    return conditional(queries.listing_version(Artist), build)
+
+
+@bp.route('/artists/genres')
+def artist_genres():
+    return genre_facets(Artist)
+
+
+def genre_facets(model):
+    # Rows per genre among the rows that match the other filters: the
+    # genre filters, and q for a search.
+    genres, match = genre_filters()
+    search_term = request.args.get('q')
+
+    def build():
+        return {'data': queries.genre_counts(model, genres, match, search_term=search_term)}
+    return conditional(queries.listing_version(model), build)
+
+
+@bp.route('/artists/<int:artist_id>')
+def artist(artist_id):
+    upcoming_cursor = request.args.get('upcoming_cursor')
+    past_cursor = request.args.get('past_cursor')
+    version = queries.detail_version(Artist, Show.artist_id, Venue, Show.venue_id, artist_id, upcoming_cursor, past_cursor)
+    if version is None:
+        abort(404)
+
+    def build():
+        if upcoming_cursor or past_cursor:
+            data = queries.artist_detail(artist_id, upcoming_cursor, past_cursor)
+        else:
+            data = detail_cache.get_or_build('artist:%d:%s' % (artist_id, version_tag(version)),
+                                             lambda: queries.artist_detail(artist_id))
+        if data is None:
+            abort(404)
+        return data
+    return conditional(version, build)
+
+
+#  Shows
+#  ----------------------------------------------------------------
+
+@bp.route('/shows')
+def shows():
+    filters, date_from, date_to = listing_filters()
+
+    def build():
+        query = queries.show_listing(upcoming='upcoming' in filters, date_from=date_from, date_to=date_to)
+        rows, next_cursor = queries.listing_page(query, request.args.get('cursor'), current_app.config['SHOWS_PAGE_SIZE'])
+        return {
+            'data': [{
+                'id': row.id,
+                'start_time': row.start_time,
+                'venue_id': row.venue_id,
+                'venue_name': row.venue_name,
+                'artist_id': row.artist_id,
+                'artist_name': row.artist_name,
+                'artist_image_link': row.artist_image_link,
+            } for row in rows],
+            'next_cursor': next_cursor,
+        }
+    return conditional(queries.listing_version(Show, Venue, Artist), build)
+
+
+#  Search
+#  ----------------------------------------------------------------
+
+@bp.route('/search/venues')
+def search_venues():
+    return search(Venue, Show.venue_id)
+
+
+@bp.route('/search/artists')
+def search_artists():
+    return search(Artist, Show.artist_id)
+
+
+def search(model, foreign_key):
+    search_term = request.args.get('q', '')
+    genres, match = genre_filters()
+
+    def build():
+        return queries.search_results(model, foreign_key, search_term, limit=request.args.get('limit', type=int),
+                                      offset=request.args.get('offset', 0, type=int), genres=genres, match=match)
+    return conditional(queries.listing_version(model), build)
+
+
+#  Scheduling
+#  ----------------------------------------------------------------
+
+@bp.route('/conflicts')
+def conflicts():
+    # The shows that a show at venue_id with artist_id from start to end
+    # (default: two hours later) would clash with. Either id may be left
+    # out; exclude skips a show being moved.
+    venue_id = request.args.get('venue_id', type=int)
+    artist_id = request.args.get('artist_id', type=int)
+    start = request.args.get('start', type=datetime.fromisoformat)
+    end = request.args.get('end', type=datetime.fromisoformat)
+    if start is None or (venue_id is None and artist_id is None):
+        abort(400, 'Give start and a venue_id or an artist_id.')
+    if end is not None and end <= start:
+        abort(400, 'end must be after start.')
+    data = scheduling.find_conflicts(venue_id, artist_id, start, end, exclude_id=request.args.get('exclude', type=int))
+    return Response(dumps({'data': data}), mimetype='application/json', headers={'Cache-Control': 'no-store'})
+
+
+@bp.route('/availability')
+def availability():
+    # Venues with a free slot of at least `length` minutes (default: a
+    # show's default length) between from and to, or on date, and those
+    # slots. city, state and genre narrow the venues.
+    date_from = request.args.get('from', type=date.fromisoformat) or request.args.get('date', type=date.fromisoformat)
+    date_to = request.args.get('to', type=date.fromisoformat) or date_from
+    if date_from is None:
+        abort(400, 'Give date, or from and to.')
+    if date_to < date_from:
+        abort(400, 'to must not be before from.')
+    if (date_to - date_from).days >= current_app.config['AVAILABILITY_MAX_DAYS']:
+        abort(400, 'Ask for %d days at most.' % current_app.config['AVAILABILITY_MAX_DAYS'])
+    length = request.args.get('length', type=int)
+    if length is not None and length <= 0:
+        abort(400, 'length must be a positive number of minutes.')
+    data = scheduling.availability(
+        date_from, date_to, city=request.args.get('city'), state=request.args.get('state'),
+        genre=request.args.get('genre'),
+        length=timedelta(minutes=length) if length is not None else scheduling.DEFAULT_LENGTH,
+        limit=request.args.get('limit', type=int), offset=request.args.get('offset', 0, type=int))
+    return Response(dumps({'data': data}), mimetype='application/json', headers={'Cache-Control': 'no-store'})
+
+
+#  Export
+#  ----------------------------------------------------------------
+
+@bp.route('/export/<kind>.<fmt>')
+def export(kind, fmt):
+    # The whole table, streamed in chunks from a server-side cursor.
+    from exporter import EXPORTS, CHUNKS
+    if kind not in EXPORTS or fmt not in CHUNKS:
+        abort(404)
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    chunks = CHUNKS[fmt](kind, current_app.config['EXPORT_BATCH_SIZE'])
+    return Response(stream_with_context(chunks), mimetype=mimetype,
+                    headers={'Content-Disposition': 'attachment; filename=%s.%s' % (kind, fmt)})
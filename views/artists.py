@@ -0,0 +1,157 @@
+from flask import Blueprint, current_app, render_template, request, flash, redirect, url_for, abort
+
+from cache import detail_cache
+from models import db, Artist, Show
+import queries
+from views import genre_filters
+
+bp = Blueprint('artists', __name__)
+
+
+#  Artists
+#  ----------------------------------------------------------------
+
+@bp.route('/artists')
+def artists():
+    genres, match = genre_filters()
+    return render_template('pages/artists.html', artists=queries.artist_list(genres, match),
+                           facets=queries.genre_counts(Artist, genres, match), genres=genres, match=match)
+
+
+@bp.route('/artists/search', methods=['POST'])
+def search_artists():
+    search_artist = request.form.get('search_term', '')
+    genres, match = genre_filters()
+    response = queries.search_results(Artist, Show.artist_id, search_artist, limit=request.values.get('limit', type=int),
+                                      offset=request.values.get('offset', 0, type=int), genres=genres, match=match)
+    return render_template('pages/search_artists.html', results=response, search_term=search_artist, genres=genres,
+                           match=match)
+
+
+@bp.route('/artists/<int:artist_id>')
+def show_artist(artist_id):
+    upcoming_cursor = request.args.get('upcoming_cursor')
+    past_cursor = request.args.get('past_cursor')
+    if upcoming_cursor or past_cursor:
+        data = queries.artist_detail(artist_id, upcoming_cursor, past_cursor)
+    else:
+        data = detail_cache.get_or_build('artist:%d' % artist_id, lambda: queries.artist_detail(artist_id))
+    if data is None:
+        abort(404)
+    return render_template('pages/show_artist.html', artist=data)
+
+#  Update
+#  ----------------------------------------------------------------
+
+
+@bp.route('/artists/<int:artist_id>/edit', methods=['GET'])
+def edit_artist(artist_id):
+    from forms import ArtistForm
+    try:
+        form = ArtistForm()
+        artistList = Artist.query.filter_by(id=artist_id).one_or_none()
+        if artistList is None:
+            abort(404)
+        artist = {
+            "id": artistList.id,
+            "name": artistList.name
+        }
+        form.name.data = artistList.name
+        form.genres.data = artistList.genres
+        form.city.data = artistList.city
+        form.state.data = artistList.state
+        form.phone.data = artistList.phone
+        form.website.data = artistList.website
+        form.facebook_link.data = artistList.facebook_link
+        form.seeking_venue.data = artistList.seeking_venue
+        form.seeking_description.data = artistList.seeking_description
+        form.image_link.data = artistList.image_link
+    except:
+        abort(404)
+    return render_template('forms/edit_artist.html', form=form, artist=artist)
+
+
+@bp.route('/artists/<int:artist_id>/edit', methods=['POST'])
+def edit_artist_submission(artist_id):
+    from forms import ArtistForm
+    error=False
+    try:
+        ArtistForm().validate_phone(ArtistForm().phone)
+        ArtistForm().validate_genres(ArtistForm().genres)
+        seeking_venue_exist = request.form.get('seeking_venue', None)
+        if seeking_venue_exist is None:
+          seeking_venue = False
+        else:
+          seeking_venue = True
+        artist = Artist.query.get(artist_id)
+        artist.name = request.form['name']
+        artist.city = request.form['city']
+        artist.state = request.form['state']
+        artist.phone = request.form['phone']
+        artist.genres = request.form.getlist('genres')
+        artist.seeking_venue = seeking_venue
+        artist.seeking_description = request.form['seeking_description'] 
+        artist.image_link = request.form['image_link']
+        artist.website = request.form['website']
+        artist.facebook_link = request.form['facebook_link']
+        stale_keys = ['artist:%d' % artist_id] + queries.venue_cache_keys(artist_id)
+        db.session.commit()
+    except Exception as e:
+        error=True
+        db.session.rollback()
+        current_app.logger.exception('editing artist %d failed', artist_id)
+        flash('An error occurred. Artist ' + request.form['name'] + ' could not be edited due to ' + str(e))
+    finally:
+        db.session.close()
+    if not error:
+        detail_cache.invalidate(*stale_keys)
+        flash('Artist ' + request.form['name'] + ' was successfully edited!')
+    return redirect(url_for('artists.show_artist', artist_id=artist_id))
+
+
+#  Create Artist
+#  ----------------------------------------------------------------
+
+
+@bp.route('/artists/create', methods=['GET'])
+def create_artist_form():
+    from forms import ArtistForm
+    form = ArtistForm()
+    return render_template('forms/new_artist.html', form=form)
+
+
+@bp.route('/artists/create', methods=['POST'])
+def create_artist_submission():
+    from forms import ArtistForm
+    error=False
+    try:
+        name = request.form['name']
+        ArtistForm().validate_phone(ArtistForm().phone)
+        ArtistForm().validate_genres(ArtistForm().genres)
+        city = request.form['city']
+        state= request.form['state']
+        phone = request.form['phone']
+        genres = request.form.getlist('genres')
+        seeking_venue_exist = request.form.get('seeking_venue', None)
+        if seeking_venue_exist is None:
+          seeking_venue = False
+        else:
+          seeking_venue = True
+        seeking_description = request.form['seeking_description'] 
+        image_link = request.form['image_link']
+        website = request.form['website']
+        facebook_link = request.form['facebook_link']
+        artist = Artist(name=name, city=city, state=state, phone=phone, genres=genres, image_link=image_link,
+        facebook_link=facebook_link, seeking_description=seeking_description, seeking_venue=seeking_venue, website=website )
+        db.session.add(artist)
+        db.session.commit()
+    except Exception as e:
+        error=True
+        db.session.rollback()
+        current_app.logger.exception('creating artist failed')
+        flash('An error occurred. Artist ' + name + ' could not be listed due to ' + str(e))
+    finally:
+        db.session.close()
+    if not error:
+        flash('Artist ' + name + ' was successfully listed!')
+    return render_template('pages/home.html')
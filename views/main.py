@@ -0,0 +1,50 @@
+from flask import Blueprint, abort, current_app, render_template, jsonify
+
+import dbpool
+from cache import detail_cache
+from models import db
+
+bp = Blueprint('main', __name__)
+
+
+@bp.route('/')
+def index():
+    return render_template('pages/home.html')
+
+
+@bp.route('/cache/stats')
+def cache_stats():
+    stats = {'detail': detail_cache.stats()}
+    if current_app.jinja_env.fragment_cache is not None:
+        stats['fragments'] = current_app.jinja_env.fragment_cache.stats()
+    return jsonify(stats)
+
+
+@bp.route('/pool/stats')
+def pool_stats():
+    return jsonify(dbpool.metrics.snapshot(db.engine.pool))
+
+
+@bp.route('/jobs/stats')
+def job_stats():
+    import jobs
+    return jsonify({'queue': jobs.queue_depth()})
+
+
+@bp.route('/metrics')
+def prometheus_metrics():
+    recorder = current_app.extensions.get('metrics')
+    if recorder is None:
+        abort(404)
+    body, content_type = recorder.render()
+    return body, 200, {'Content-Type': content_type}
+
+
+@bp.app_errorhandler(404)
+def not_found_error(error):
+    return render_template('errors/404.html'), 404
+
+
+@bp.app_errorhandler(500)
+def server_error(error):
+    return render_template('errors/500.html'), 500
@@ -0,0 +1,123 @@
+from datetime import datetime
+
+from flask import Blueprint, Response, current_app, render_template, stream_template, request, flash
+from sqlalchemy.exc import IntegrityError
+
+from cache import detail_cache
+from directory import directory_refresher
+from models import db, Venue, Artist, Show
+import queries
+import scheduling
+
+bp = Blueprint('shows', __name__)
+
+
+#  Shows
+#  ----------------------------------------------------------------
+
+def listing_filters():
+    # The listing filters in the query string: the raw values to carry over
+    # into pagination links, and the parsed dates.
+    filters = {}
+    if request.args.get('upcoming'):
+        filters['upcoming'] = '1'
+    date_from = request.args.get('from', type=datetime.fromisoformat)
+    if date_from is not None:
+        filters['from'] = request.args['from']
+    date_to = request.args.get('to', type=datetime.fromisoformat)
+    if date_to is not None:
+        filters['to'] = request.args['to']
+    return filters, date_from, date_to
+
+
+@bp.route('/shows')
+def shows():
+    filters, date_from, date_to = listing_filters()
+    query = queries.show_listing(upcoming='upcoming' in filters, date_from=date_from, date_to=date_to)
+
+    if request.args.get('stream'):
+        # Every matching show, fetched in batches through a server-side cursor
+        # and rendered as it arrives, so memory use doesn't grow with the table.
+        batch_size = current_app.config['SHOWS_STREAM_BATCH_SIZE']
+
+        def tiles():
+            # Runs as the body is sent, after the view's session has closed.
+            for row in db.session.execute(query.execution_options(yield_per=batch_size)):
+                yield queries.show_tile(row)
+        return Response(stream_template('pages/shows.html', shows=tiles(), filters=filters))
+
+    rows, next_cursor = queries.listing_page(query, request.args.get('cursor'), current_app.config['SHOWS_PAGE_SIZE'])
+    data = [queries.show_tile(row) for row in rows]
+    return render_template('pages/shows.html', shows=data, filters=filters, next_cursor=next_cursor)
+
+
+@bp.route('/shows/create')
+def create_shows():
+    from forms import ShowForm
+    # renders form. do not touch.
+    form = ShowForm()
+    return render_template('forms/new_show.html', form=form)
+
+
+@bp.route('/shows/create', methods=['POST'])
+def create_show_submission():
+    from forms import ShowForm
+    error=False
+    conflicts = []
+    # The times are parsed by the form's fields; the rest of the form isn't
+    # validated here, and the page carries no CSRF token.
+    form = ShowForm(meta={'csrf': False})
+    times_valid = form.start_time.validate(form) and form.end_time.validate(form, [ShowForm.validate_end_time])
+    try:
+        if not times_valid:
+          raise 
+        artist = Artist.query.filter_by(id = request.form['artist_id']).one_or_none()
+        if artist is None:
+          raise 
+        venue = Venue.query.filter_by(id = request.form['venue_id']).one_or_none()
+        if venue is None:
+          raise 
+        artist_id = artist.id
+        venue_id = venue.id
+        start_time = form.start_time.data
+        end_time = form.end_time.data or start_time + scheduling.DEFAULT_LENGTH
+        # The constraints would refuse most clashes too, but not one with a
+        # show that predates them, and this can say which shows clash.
+        conflicts = scheduling.find_conflicts(venue_id, artist_id, start_time, end_time)
+        if conflicts:
+          raise 
+        show = Show(artist_id=artist_id, venue_id=venue_id, start_time=start_time, end_time=end_time)
+        db.session.add(show)
+        db.session.commit()
+    except IntegrityError as e:
+        error=True
+        db.session.rollback()
+        if scheduling.is_exclusion_violation(e):
+          # Another show was booked between the check and the insert.
+          conflicts = scheduling.find_conflicts(venue_id, artist_id, start_time, end_time)
+        else:
+          current_app.logger.exception('creating show failed')
+    except:
+        error=True
+        db.session.rollback()
+        if times_valid and not conflicts:
+          current_app.logger.exception('creating show failed')
+    finally:
+        db.session.close()
+    if not times_valid:
+        flash('Show could not be listed: ' + '; '.join(
+            # DataRequired replaces a parse error with its own message.
+            '%s: %s' % (field.name, ' '.join(field.process_errors or field.errors))
+            for field in (form.start_time, form.end_time) if field.errors))
+    elif conflicts:
+        flash('Show could not be listed: ' + '; '.join(
+            'the %s %s is booked from %s to %s' % (conflict['clash'], conflict[conflict['clash'] + '_name'],
+                                                    conflict['start_time'], conflict['end_time'])
+            for conflict in conflicts[:3]))
+    elif error:
+        flash('An error occurred. Show could not be listed. Check if the provided Venue ID and Artist ID is valid')
+    else:
+        detail_cache.invalidate('venue:%d' % venue_id, 'artist:%d' % artist_id)
+        directory_refresher.request_refresh()
+        flash('Show was successfully listed!')
+    return render_template('pages/home.html')
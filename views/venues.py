@@ -0,0 +1,191 @@
+from flask import Blueprint, current_app, render_template, request, flash, redirect, url_for, abort
+
+from cache import detail_cache
+from directory import directory_refresher
+from models import db, Venue, Show
+import geo
+import queries
+from views import genre_filters
+
+bp = Blueprint('venues', __name__)
+
+
+#  Venues
+#  ----------------------------------------------------------------
+
+@bp.route('/venues')
+def venues():
+    genres, match = genre_filters()
+    return render_template('pages/venues.html', areas=queries.venue_areas(genres, match),
+                           facets=queries.genre_counts(Venue, genres, match), genres=genres, match=match)
+
+
+@bp.route('/venues/search', methods=['POST'])
+def search_venues():
+    search_venue = request.form.get('search_term', '')
+    genres, match = genre_filters()
+    response = queries.search_results(Venue, Show.venue_id, search_venue, limit=request.values.get('limit', type=int),
+                                      offset=request.values.get('offset', 0, type=int), genres=genres, match=match)
+    return render_template('pages/search_venues.html', results=response, search_term=search_venue, genres=genres,
+                           match=match)
+
+
+@bp.route('/venues/<int:venue_id>')
+def show_venue(venue_id):
+    upcoming_cursor = request.args.get('upcoming_cursor')
+    past_cursor = request.args.get('past_cursor')
+    if upcoming_cursor or past_cursor:
+        data = queries.venue_detail(venue_id, upcoming_cursor, past_cursor)
+    else:
+        data = detail_cache.get_or_build('venue:%d' % venue_id, lambda: queries.venue_detail(venue_id))
+    if data is None:
+        abort(404)
+    return render_template('pages/show_venue.html', venue=data)
+
+#  Create Venue
+#  ----------------------------------------------------------------
+
+
+@bp.route('/venues/create', methods=['GET'])
+def create_venue_form():
+    from forms import VenueForm
+    form = VenueForm()
+    return render_template('forms/new_venue.html', form=form)
+
+
+@bp.route('/venues/create', methods=['POST'])
+def create_venue_submission():
+    from forms import VenueForm
+    error=False
+    try:
+        name = request.form['name']
+        VenueForm().validate_phone(VenueForm().phone)
+        VenueForm().validate_genres(VenueForm().genres)
+        city = request.form['city']
+        state= request.form['state']
+        address= request.form['address']
+        phone = request.form['phone']
+        genres = request.form.getlist('genres')
+        seeking_talent_exist = request.form.get('seeking_talent', None)
+        if seeking_talent_exist is None:
+          seeking_talent = False
+        else:
+          seeking_talent = True
+        seeking_description = request.form['seeking_description'] 
+        image_link = request.form['image_link']
+        website = request.form['website']
+        facebook_link = request.form['facebook_link']
+        venue = Venue(name=name, city=city, state=state, phone=phone, address=address, genres=genres, image_link=image_link,
+        facebook_link=facebook_link, seeking_description=seeking_description, seeking_talent=seeking_talent, website=website )
+        venue.latitude, venue.longitude = geo.locate(city, state) or (None, None)
+        db.session.add(venue)
+        db.session.commit()
+    except Exception as e:
+        error=True
+        db.session.rollback()
+        current_app.logger.exception('creating venue failed')
+        flash('An error occurred. Venue ' + name + ' could not be listed due to ' + str(e))
+    finally:
+        db.session.close()
+    if not error:
+        directory_refresher.request_refresh()
+        flash('Venue ' + name + ' was successfully listed!')
+    return render_template('pages/home.html')
+
+
+@bp.route('/venues/<venue_id>', methods=['DELETE'])
+def delete_venue(venue_id):
+    error=False
+    try:
+        venuList = Venue.query.filter(Venue.id == venue_id).one_or_none()
+        if venuList is None:
+            abort(404)
+        stale_keys = ['venue:%d' % venuList.id] + queries.artist_cache_keys(venuList.id)
+        Show.query.filter_by(venue_id=venue_id).delete()
+        Venue.query.filter_by(id=venue_id).delete()
+        db.session.commit()
+    except Exception as e:
+        error=True
+        db.session.rollback()
+        current_app.logger.exception('deleting venue %s failed', venue_id)
+        flash('An error occurred. Venue with ID '+ venue_id +' could not be deleted.')
+    finally:
+        db.session.close()
+    if not error:
+        detail_cache.invalidate(*stale_keys)
+        directory_refresher.request_refresh()
+        flash('Venue with ID '+ venue_id +' is successfully deleted!')
+    return redirect(url_for('main.index'))
+
+#  Update
+#  ----------------------------------------------------------------
+
+
+@bp.route('/venues/<int:venue_id>/edit', methods=['GET'])
+def edit_venue(venue_id):
+    from forms import VenueForm
+    try:
+        form = VenueForm()
+        venueList = Venue.query.filter_by(id=venue_id).one_or_none()
+        if venueList is None:
+            abort(404)
+        venue = {
+            "id": venueList.id,
+            "name": venueList.name
+        }
+        form.name.data = venueList.name
+        form.genres.data = venueList.genres
+        form.address.data = venueList.address
+        form.city.data = venueList.city
+        form.state.data = venueList.state
+        form.phone.data = venueList.phone
+        form.website.data = venueList.website
+        form.facebook_link.data = venueList.facebook_link
+        form.seeking_description.data = venueList.seeking_description
+        form.seeking_talent.data = venueList.seeking_talent
+        form.image_link.data = venueList.image_link
+    except:
+        abort(404)
+    return render_template('forms/edit_venue.html', form=form, venue=venue)
+
+
+@bp.route('/venues/<int:venue_id>/edit', methods=['POST'])
+def edit_venue_submission(venue_id):
+    from forms import VenueForm
+    error=False
+    try:
+        VenueForm().validate_phone(VenueForm().phone)
+        VenueForm().validate_genres(VenueForm().genres)
+        seeking_talent_exist = request.form.get('seeking_talent', None)
+        if seeking_talent_exist is None:
+          seeking_talent = False
+        else:
+          seeking_talent = True
+        venue = Venue.query.get(venue_id)
+        if (venue.city, venue.state) != (request.form['city'], request.form['state']):
+            venue.latitude, venue.longitude = geo.locate(request.form['city'], request.form['state']) or (None, None)
+        venue.name = request.form['name']
+        venue.city = request.form['city']
+        venue.address = request.form['address']
+        venue.state = request.form['state']
+        venue.phone = request.form['phone']
+        venue.genres = request.form.getlist('genres')
+        venue.seeking_talent = seeking_talent
+        venue.seeking_description = request.form['seeking_description'] 
+        venue.image_link = request.form['image_link']
+        venue.website = request.form['website']
+        venue.facebook_link = request.form['facebook_link']
+        stale_keys = ['venue:%d' % venue_id] + queries.artist_cache_keys(venue_id)
+        db.session.commit()
+    except Exception as e:
+        error=True
+        db.session.rollback()
+        current_app.logger.exception('editing venue %d failed', venue_id)
+        flash('An error occurred. Venue ' + request.form['name'] + ' could not be edited due to ' + str(e))
+    finally:
+        db.session.close()
+    if not error:
+        detail_cache.invalidate(*stale_keys)
+        directory_refresher.request_refresh()
+        flash('Venue ' + request.form['name'] + ' was successfully edited!')
+    return redirect(url_for('venues.show_venue', venue_id=venue_id))